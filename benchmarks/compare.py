@@ -0,0 +1,44 @@
+# Compares two result files of run.py and lists the cases that got slower
+# (or faster) by more than a factor, e.g.
+#   python benchmarks/compare.py before.json after.json --threshold 1.2
+# Exits with status 1 if any case got slower.
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        report = json.load(f)
+    return report, {(r["family"], r["n"], r["index"]): r.get("seconds") for r in report["results"]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=1.25, help="factor above which a change is reported (default: 1.25)")
+    parser.add_argument("--min-seconds", type=float, default=1e-3, help="ignore cases faster than this in both files")
+    args = parser.parse_args(argv)
+    old_report, old = load(args.old)
+    new_report, new = load(args.new)
+    print(f"old: {old_report['commit']} ({old_report['time']})")
+    print(f"new: {new_report['commit']} ({new_report['time']})")
+    changes = []
+    for key in sorted(old.keys() & new.keys()):
+        a, b = old[key], new[key]
+        if a is None or b is None or max(a, b) < args.min_seconds:
+            continue
+        ratio = b / a
+        if ratio > args.threshold or ratio < 1 / args.threshold:
+            changes.append((ratio, key, a, b))
+    changes.sort(reverse=True)
+    for ratio, (family, n, index_name), a, b in changes:
+        print(f"{ratio:7.2f}x  {family:12} {n:>8} {index_name:28} {a:.4g}s -> {b:.4g}s")
+    if not changes:
+        print("no changes")
+    sys.exit(1 if any(ratio > args.threshold for ratio, *_ in changes) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+# Times every index on generated trees of several families and sizes and
+# writes the results as JSON, e.g.
+#   python benchmarks/run.py -o before.json
+#   python benchmarks/run.py -o after.json --sizes 100,1000,10000,100000,1000000
+#   python benchmarks/compare.py before.json after.json
+import argparse
+import json
+import os
+import platform
+import signal
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from treeshapy.compact_tree import CompactTree
+from treeshapy.simulation import simulate
+from treeshapy.treeshapy import TreeShape, INDICES, bounds
+
+FAMILIES = ["caterpillar", "balanced", "yule", "pda", "polytomy"]
+
+# mean number of children of the inner nodes of polytomy trees
+POLYTOMY_DEGREE = 50
+
+
+def caterpillar(n, rng):
+    # inner node i (i < n - 1) has the leaf n - 1 + i and the inner node i + 1
+    # as children, the last inner node has two leaves
+    parent = np.empty(2 * n - 1, dtype=np.int64)
+    parent[0] = -1
+    parent[1:n - 1] = np.arange(n - 2)
+    parent[n - 1:2 * n - 2] = np.arange(n - 1)
+    parent[2 * n - 2] = n - 2
+    return parent
+
+
+def balanced(n, rng):
+    # heap layout, the children of k are 2k + 1 and 2k + 2
+    parent = (np.arange(2 * n - 1) - 1) // 2
+    parent[0] = -1
+    return parent
+
+
+def polytomy(n, rng):
+    # m random inner nodes, every one of them gets two leaves and the
+    # remaining leaves are attached uniformly at random
+    m = max(1, n // POLYTOMY_DEGREE)
+    inner = np.full(m, -1, dtype=np.int64)
+    inner[1:] = [rng.integers(0, j) for j in range(1, m)]
+    leaves = np.concatenate([np.repeat(np.arange(m), 2), rng.integers(0, m, n - 2 * m)])
+    return np.concatenate([inner, leaves])
+
+
+def generate(family, n, seed=0):
+    rng = np.random.default_rng(seed)
+    if family in ["yule", "pda"]:
+        return next(simulate(family, n, 1, seed))
+    return CompactTree.from_parents(globals()[family](n, rng))
+
+
+class Timeout(Exception):
+    pass
+
+
+def alarm(signum, frame):
+    raise Timeout()
+
+
+def defined_indices(tree, mode):
+    # the indices with a value for the tree, e.g. the Furnas rank is not
+    # defined in ARBITRARY mode
+    tb = TreeShape(tree, mode)
+    tb.prepare(INDICES)
+    defined = []
+    for index_name in INDICES:
+        try:
+            tb.absolute(index_name)
+            defined.append(index_name)
+        except ValueError:
+            pass
+    return defined
+
+
+def run_once(tree, mode, index_name, defined):
+    # all_absolute and all_relative only time the defined indices
+    bounds.cache_clear()
+    start = time.perf_counter()
+    tb = TreeShape(tree, mode)
+    if index_name in ["all_absolute", "all_relative"]:
+        tb.compute(defined)
+        if index_name == "all_relative":
+            for name in defined:
+                try:
+                    tb.relative(name)
+                except ValueError:
+                    pass
+    else:
+        tb.prepare([index_name])
+        tb.absolute(index_name)
+    return time.perf_counter() - start
+
+
+def time_index(tree, mode, index_name, defined, repeat, max_seconds):
+    # best of repeat runs, a single run for slow cases. The first run is not
+    # timed, it imports the index module and fills global tables.
+    times = [run_once(tree, mode, index_name, defined)]
+    if times[0] < max_seconds:
+        times = [run_once(tree, mode, index_name, defined)]
+    while len(times) < repeat and sum(times) < 1:
+        times.append(run_once(tree, mode, index_name, defined))
+    return min(times)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Time all tree shape indices on generated trees.")
+    parser.add_argument("-o", "--output", default="benchmark.json", help="output file (default: benchmark.json)")
+    parser.add_argument("--sizes", default="100,1000,10000", help="comma separated numbers of leaves")
+    parser.add_argument("--families", default=",".join(FAMILIES), help="comma separated tree families")
+    parser.add_argument("-i", "--indices", help="comma separated index names (default: all, plus all_absolute and all_relative)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, the fastest one is reported")
+    parser.add_argument("--max-seconds", type=float, default=10, help="larger trees of a family are skipped for an index once it takes longer")
+    parser.add_argument("--timeout", type=float, default=120, help="cases are aborted after this many seconds (Unix only)")
+    args = parser.parse_args(argv)
+    args.sizes = [int(n) for n in args.sizes.split(",")]
+    args.families = args.families.split(",")
+    for family in args.families:
+        if family not in FAMILIES:
+            parser.error(f"Unknown family: {family}")
+    if args.indices is None:
+        args.indices = INDICES + ["all_absolute", "all_relative"]
+    else:
+        args.indices = args.indices.split(",")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # a result store would turn the timings into lookups
+    os.environ.pop("TREESHAPY_STORE", None)
+    timeouts = hasattr(signal, "SIGALRM")
+    if timeouts:
+        signal.signal(signal.SIGALRM, alarm)
+    results = []
+    for family in args.families:
+        mode = "ARBITRARY" if family == "polytomy" else "BINARY"
+        too_slow = set()
+        for n in sorted(args.sizes):
+            tree = generate(family, n)
+            defined = None
+            for index_name in args.indices:
+                result = {"family": family, "n": n, "index": index_name, "mode": mode}
+                if index_name in too_slow:
+                    result["skipped"] = True
+                else:
+                    if timeouts:
+                        signal.setitimer(signal.ITIMER_REAL, args.timeout)
+                    try:
+                        if defined is None and index_name in ["all_absolute", "all_relative"]:
+                            defined = defined_indices(tree, mode)
+                        result["seconds"] = time_index(tree, mode, index_name, defined, args.repeat, args.max_seconds)
+                        if result["seconds"] > args.max_seconds:
+                            too_slow.add(index_name)
+                    except ValueError as e:
+                        # not defined for the mode or tree, nothing to time
+                        result["undefined"] = str(e)
+                    except ArithmeticError as e:
+                        result["error"] = str(e)
+                    except Timeout:
+                        result["timeout"] = args.timeout
+                        too_slow.add(index_name)
+                    finally:
+                        if timeouts:
+                            signal.setitimer(signal.ITIMER_REAL, 0)
+                results.append(result)
+                print(family, n, index_name, result.get("seconds", "-"), file=sys.stderr)
+    report = {"commit": git_commit(),
+              "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "python": platform.python_version(),
+              "numpy": np.__version__,
+              "machine": platform.machine(),
+              "results": results}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,12 @@ from setuptools import setup
 setup(
     name='treeshapy',
     version='0.0.1',
-    install_requires=['numpy', 'ete3'],
+    install_requires=['numpy'],
+    extras_require={'ete3': ['ete3'], 'numba': ['numba']},
     packages=find_packages('.'),
     package_dir={'': '.'},
-    package_data={'treeshapy' :['treeshapy/resources/*']},
+    entry_points={'console_scripts': ['treeshapy=treeshapy.cli:main',
+                                      'treeshapy-tables=treeshapy.shape_tables:main']},
     url='https://github.com/luisevonderwiese/treeshapy',
     license='GNU',
     author='Luise Häuser',
@@ -63,7 +63,9 @@ class TestMetrics(unittest.TestCase):
         "mean_I_w" : 1,
         "total_I_w" : 3,
         "colijn_plazotta_rank" : 68,
+        "colijn_plazotta_rank_log2" : math.log2(68),
         "furnas_rank" : 1,
+        "furnas_rank_log2" : math.log2(1),
         "rooted_quartet_index" : 0,
         "treeness" : 0.4,
         "stemminess" : 62 / 315}
@@ -121,7 +123,9 @@ class TestMetrics(unittest.TestCase):
         "total_I_w" : 1.65,
         "rooted_quartet_index" : 3,
         "colijn_plazotta_rank" : 30,
+        "colijn_plazotta_rank_log2" : math.log2(30),
         "furnas_rank" : 2,
+        "furnas_rank_log2" : math.log2(2),
         "treeness" : 0.4,
         "stemminess" : 29/126}
 
@@ -178,7 +182,9 @@ class TestMetrics(unittest.TestCase):
         "total_I_w" : 10 / 11,
         "rooted_quartet_index" : 9,
         "colijn_plazotta_rank" : 17,
+        "colijn_plazotta_rank_log2" : math.log2(17),
         "furnas_rank" : 3,
+        "furnas_rank_log2" : math.log2(3),
         "treeness" : 0.4,
         "stemminess" : 44/180}
 
@@ -235,7 +241,9 @@ class TestMetrics(unittest.TestCase):
         "total_I_w" : 28 / 19,
         "rooted_quartet_index" : 18,
         "colijn_plazotta_rank" : 13,
+        "colijn_plazotta_rank_log2" : math.log2(13),
         "furnas_rank" : 4,
+        "furnas_rank_log2" : math.log2(4),
         "treeness" : 0.4,
         "stemminess" : 106/420}
 
@@ -292,7 +300,9 @@ class TestMetrics(unittest.TestCase):
         "total_I_w" : 5 / 14,
         "rooted_quartet_index" : 21,
         "colijn_plazotta_rank" : 9,
+        "colijn_plazotta_rank_log2" : math.log2(9),
         "furnas_rank" : 5,
+        "furnas_rank_log2" : math.log2(5),
         "treeness" : 0.4,
         "stemminess" : 8 / 28}
 
@@ -349,7 +359,9 @@ class TestMetrics(unittest.TestCase):
         "total_I_w" : 0,
         "rooted_quartet_index" : 27,
         "colijn_plazotta_rank" : 7,
+        "colijn_plazotta_rank_log2" : math.log2(7),
         "furnas_rank" : 6,
+        "furnas_rank_log2" : math.log2(6),
         "treeness" : 0.4,
         "stemminess" : 16 / 60}
 
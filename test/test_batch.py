@@ -0,0 +1,79 @@
+from ete3 import Tree
+import os
+import unittest
+import numpy as np
+
+from treeshapy import evaluate_many
+from treeshapy.compact_tree import CompactTree
+from treeshapy.simulation import simulate
+from treeshapy.treeshapy import TreeShape, INDICES
+
+
+class TestBatch(unittest.TestCase):
+    test_tree_dir = "../test_data"
+    test_tree_names = ["fischer1", "fischer2", "fischer3", "fischer4", "fischer5", "fischer6", "mini1"]
+    index_names = INDICES
+
+    def trees(self):
+        trees = []
+        for test_tree_name in self.test_tree_names:
+            with open(os.path.join(self.test_tree_dir, test_tree_name  +".tree")) as f:
+                trees.append(f.read())
+        trees += ["A;", "(A,B,C);", "((A,B,C,D),(E,F),G);"]
+        trees.append(Tree("((A,B),(C,(D,E)));"))
+        trees.append(CompactTree.from_newick("(((A,B),C),D);"))
+        return trees
+
+    def expected(self, trees, mode):
+        res = np.full((len(trees), len(self.index_names)), np.nan)
+        for i, tree in enumerate(trees):
+            tb = TreeShape(tree, mode)
+            for j, index_name in enumerate(self.index_names):
+                try:
+                    res[i, j] = tb.absolute(index_name)
+                except (ValueError, ArithmeticError):
+                    pass
+        return res
+
+    def test_serial(self):
+        trees = self.trees()
+        res = evaluate_many(trees, self.index_names, workers=1)
+        self.assertEqual(res.shape, (len(trees), len(self.index_names)))
+        self.assertTrue(np.allclose(res, self.expected(trees, "ARBITRARY"), equal_nan=True))
+
+    def test_parallel(self):
+        trees = self.trees()
+        expected = self.expected(trees, "ARBITRARY")
+        for chunksize in [None, 1, 4]:
+            res = evaluate_many(trees, self.index_names, workers=2, chunksize=chunksize)
+            self.assertTrue(np.allclose(res, expected, equal_nan=True))
+        binary = [tree for tree in trees[:6]]
+        res = evaluate_many(binary, ["sackin_index", "colless_index"], mode="BINARY", workers=2)
+        self.assertEqual(res[:, 0].tolist(), [TreeShape(tree, "BINARY").absolute("sackin_index") for tree in binary])
+
+    def test_large_ranks(self):
+        # exact ranks beyond the float range are written as their log2
+        caterpillar = "(" * 14 + "A,B)" + ",A)" * 13 + ";"
+        tb = TreeShape(caterpillar, "BINARY")
+        self.assertGreater(tb.absolute("colijn_plazotta_rank"), 1 << 1024)
+        res = evaluate_many([caterpillar, "((A,B),C);"], ["colijn_plazotta_rank", "colijn_plazotta_rank_log2", "sackin_index"], mode="BINARY", workers=1)
+        self.assertAlmostEqual(res[0, 0], tb.absolute("colijn_plazotta_rank_log2"))
+        self.assertEqual(res[0, 1], tb.absolute("colijn_plazotta_rank_log2"))
+        self.assertEqual(res[0, 2], 119)
+        self.assertTrue(np.allclose(res[1], [3, np.log2(3), 5]))
+
+    def test_log2_ranks(self):
+        trees = ["((A,B),(C,(D,E)));", "(((A,B),C),(D,E));", next(simulate("yule", 900, seed=1))]
+        res = evaluate_many(trees, ["furnas_rank", "furnas_rank_log2"], mode="BINARY", workers=1)
+        self.assertTrue(np.allclose(res[:2, 1], np.log2(res[:2, 0])))
+        self.assertTrue(np.isnan(res[2, 0])) # beyond the exact ranks
+        self.assertTrue(np.isfinite(res[2, 1]))
+        self.assertEqual(res[2, 1], TreeShape(trees[2], "BINARY").absolute("furnas_rank_log2"))
+
+    def test_unknown_index(self):
+        with self.assertRaises(ValueError):
+            evaluate_many(["(A,B);"], ["no_such_index"], workers=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
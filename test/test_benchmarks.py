@@ -0,0 +1,37 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+
+class TestBenchmarks(unittest.TestCase):
+    benchmark_dir = "../benchmarks"
+
+    def run_script(self, name, *args):
+        return subprocess.run([sys.executable, os.path.join(self.benchmark_dir, name), *args], capture_output=True, text=True)
+
+    def test_run_and_compare(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "benchmark.json")
+            run = self.run_script("run.py", "-o", output, "--sizes", "100", "--families", "yule,polytomy",
+                                  "-i", "sackin_index,colless_index,all_absolute,all_relative", "--repeat", "1")
+            self.assertEqual(run.returncode, 0, run.stderr)
+            with open(output) as f:
+                results = {(r["family"], r["index"]): r for r in json.load(f)["results"]}
+            self.assertEqual(len(results), 8)
+            for result in results.values():
+                self.assertNotIn("error", result)
+            # the Colless index is not defined for polytomies, all other cases are timed
+            self.assertIn("undefined", results[("polytomy", "colless_index")])
+            for key, result in results.items():
+                if key != ("polytomy", "colless_index"):
+                    self.assertGreater(result["seconds"], 0)
+            compare = self.run_script("compare.py", output, output)
+            self.assertEqual(compare.returncode, 0, compare.stderr)
+            self.assertIn("no changes", compare.stdout)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import contextlib
+import gzip
+import io
+import json
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from treeshapy.cli import main, number
+from treeshapy.treeshapy import TreeShape
+
+
+class TestCli(unittest.TestCase):
+    newicks = ["((A,B),C);", "(((A,B),C),D);", "((A,B),(C,D));", "((A,(B,C)),(D,E));", "(A,(B,(C,(D,E))));"]
+    index_names = ["sackin_index", "colless_index", "average_leaf_depth"]
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.newick_path = os.path.join(self.tmp.name, "trees.nwk.gz")
+        with gzip.open(self.newick_path, "wt") as f:
+            f.write("\n".join(self.newicks) + "\n")
+        self.nexus_path = os.path.join(self.tmp.name, "trees.nex")
+        with open(self.nexus_path, "w") as f:
+            f.write("#NEXUS\nbegin trees;\n\ttranslate\n\t\t1 A,\n\t\t2 B;\n")
+            for i, newick in enumerate(self.newicks):
+                f.write(f"\ttree STATE_{i} = [&R] {newick}\n")
+            f.write("end;\n")
+        self.expected = np.array([[TreeShape(newick, "BINARY").absolute(index_name) for index_name in self.index_names] for newick in self.newicks])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_cli(self, *args):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            main(list(args))
+        return out.getvalue()
+
+    def test_csv(self):
+        lines = self.run_cli(self.newick_path, "-i", "sackin_index,colless_index", "-i", "average_leaf_depth", "--mode", "BINARY").splitlines()
+        self.assertEqual(lines[0], "file,tree,sackin_index,colless_index,average_leaf_depth")
+        self.assertEqual(len(lines), len(self.newicks) + 1)
+        values = np.array([[float(v) for v in line.split(",")[2:]] for line in lines[1:]])
+        self.assertTrue(np.allclose(values, self.expected))
+
+    def test_jsonl_nexus(self):
+        output = os.path.join(self.tmp.name, "out.jsonl")
+        main([self.nexus_path, "-i", ",".join(self.index_names), "-o", output, "--burnin", "0.2", "--thin", "2"])
+        with open(output) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([record["tree"] for record in records], [0, 1])
+        self.assertEqual([record["sackin_index"] for record in records], self.expected[[1, 3], 0].tolist())
+
+    def test_npy(self):
+        output = os.path.join(self.tmp.name, "out.npy")
+        main([self.newick_path, self.nexus_path, "-i", ",".join(self.index_names), "-o", output, "--mode", "BINARY", "--workers", "2"])
+        values = np.load(output)
+        self.assertEqual(values.shape, (2 * len(self.newicks), len(self.index_names)))
+        self.assertTrue(np.allclose(values, np.concatenate([self.expected, self.expected])))
+
+    def test_number(self):
+        self.assertEqual(repr(number(np.float64(12))), "12")
+        self.assertEqual(repr(number(np.float64(2.5))), "2.5")
+        self.assertEqual(repr(number(np.float64(1e300))), "1e+300")
+        self.assertEqual(repr(number(np.float64(2 ** 53))), "9007199254740992.0")
+
+    def test_relative(self):
+        output = os.path.join(self.tmp.name, "out.npy")
+        main([self.newick_path, "-i", "sackin_index", "-o", output, "--mode", "BINARY", "--kind", "relative"])
+        values = np.load(output)
+        self.assertTrue(np.isnan(values[0, 0])) # minimum equals maximum for three leaves
+        self.assertTrue(np.allclose(values[1:, 0], [TreeShape(newick, "BINARY").relative("sackin_index") for newick in self.newicks[1:]]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+from ete3 import Tree
+import os
+import unittest
+import numpy as np
+
+from treeshapy.compact_tree import CompactTree, as_compact_tree
+from treeshapy.treeshapy import TreeShape, INDICES
+
+
+class TestCompactTree(unittest.TestCase):
+    test_tree_dir = "../test_data"
+    test_tree_names = ["fischer1", "fischer2", "fischer3", "fischer4", "fischer5", "fischer6"]
+
+    def test_from_ete3(self):
+        tree = CompactTree.from_ete3(Tree("(((A:1,B:2):3,C:4):5,(D:6,E:7):8);"))
+        self.assertEqual(len(tree), 5)
+        self.assertEqual(tree.num_nodes, 9)
+        self.assertEqual(tree.parent.tolist(), [-1, 0, 1, 2, 2, 1, 0, 6, 6])
+        self.assertEqual(tree.dist[1:].tolist(), [5, 3, 1, 2, 4, 8, 6, 7])
+        self.assertEqual(tree.child_list(0).tolist(), [1, 6])
+        self.assertEqual(tree.leaves.tolist(), [3, 4, 5, 7, 8])
+        self.assertEqual(tree.postorder.tolist(), [3, 4, 2, 5, 1, 7, 8, 6, 0])
+
+    def test_from_parents(self):
+        # ((D,E),(C,(A,B))) with an arbitrary node numbering
+        parent = [4, 4, 8, 8, 5, -1, 5, 6, 6]
+        dist = [6, 7, 1, 2, 8, 0, 5, 4, 3]
+        tree = CompactTree.from_parents(parent, dist)
+        self.assertEqual(tree.parent.tolist(), [-1, 0, 1, 1, 0, 4, 4, 6, 6])
+        self.assertEqual(tree.outdegree.tolist(), [2, 2, 0, 0, 2, 0, 2, 0, 0])
+        self.assertEqual(tree.dist.tolist(), [0, 8, 6, 7, 5, 4, 3, 1, 2])
+        with self.assertRaises(ValueError):
+            CompactTree.from_parents([-1, 0, -1])
+        with self.assertRaises(ValueError):
+            CompactTree.from_parents([-1, 2, 1])
+
+    def test_orders(self):
+        for test_tree_name in self.test_tree_names:
+            tree = as_compact_tree(Tree(os.path.join(self.test_tree_dir, test_tree_name  +".tree")))
+            self.assertTrue(np.all(tree.parent[1:] < np.arange(1, tree.num_nodes)))
+            position = np.empty(tree.num_nodes, dtype=np.int64)
+            position[tree.postorder] = np.arange(tree.num_nodes)
+            self.assertTrue(np.all(position[tree.parent[1:]] > position[1:]))
+
+    def test_input_types(self):
+        newick = "(((A,B),C),(D,(E,F)));"
+        reference = TreeShape(Tree(newick), "BINARY")
+        compact = CompactTree.from_newick(newick)
+        for tree in [newick, compact, compact.parent.tolist()]:
+            tb = TreeShape(tree, "BINARY")
+            for index_name in INDICES:
+                self.assertAlmostEqual(tb.absolute(index_name), reference.absolute(index_name))
+
+    def test_inputs_untouched(self):
+        compact = CompactTree.from_newick("(((A,B),C),(D,(E,F)));")
+        tb = TreeShape(compact, "BINARY")
+        tb.all_absolute()
+        self.assertEqual(compact.features, {})
+        self.assertIsNot(tb.tree, compact)
+        ete_tree = Tree("(((A,B),C),(D,(E,F)));")
+        tb = TreeShape(ete_tree, "BINARY")
+        tb.all_absolute()
+        for node in ete_tree.traverse():
+            self.assertEqual(node.features, {"name", "dist", "support"})
+
+    def test_invalidate(self):
+        ete_tree = Tree("((A,B),C);")
+        tb = TreeShape(ete_tree, "BINARY")
+        self.assertEqual(tb.absolute("sackin_index"), 5)
+        (ete_tree & "C").populate(2)
+        self.assertEqual(tb.absolute("sackin_index"), 5) # cached
+        tb.invalidate()
+        self.assertEqual(tb.n, 4)
+        self.assertEqual(tb.absolute("sackin_index"), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
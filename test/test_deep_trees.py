@@ -0,0 +1,76 @@
+from ete3 import Tree
+import math
+import time
+import unittest
+import numpy as np
+
+import treeshapy.util as util
+from treeshapy.compact_tree import CompactTree
+from treeshapy.simulation import simulate
+from treeshapy.treeshapy import TreeShape
+
+
+def caterpillar(n):
+    # inner node i has inner node i + 1 and leaf n - 1 + i as children
+    parent = np.empty(2 * n - 1, dtype=np.int64)
+    parent[:n - 1] = np.arange(-1, n - 2)
+    parent[n - 1:2 * n - 2] = np.arange(n - 1)
+    parent[2 * n - 2] = n - 2
+    return CompactTree.from_parents(parent)
+
+
+class TestDeepTrees(unittest.TestCase):
+    n = 10 ** 6
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tb = TreeShape(caterpillar(cls.n), "BINARY")
+
+    def test_depths(self):
+        n = self.n
+        self.assertEqual(self.tb.absolute("maximum_depth"), n - 1)
+        self.assertEqual(self.tb.absolute("sackin_index"), (n - 1) * (n + 2) // 2)
+        self.assertEqual(self.tb.absolute("diameter"), n)
+
+    def test_probs(self):
+        self.assertAlmostEqual(self.tb.absolute("B_2_index"), 2)
+
+    def test_balance(self):
+        n = self.n
+        self.assertEqual(self.tb.absolute("colless_index"), (n - 1) * (n - 2) // 2)
+        self.assertEqual(self.tb.absolute("symmetry_nodes_index"), n - 2)
+        self.assertEqual(self.tb.absolute("ladder_length"), n - 2)
+        self.assertAlmostEqual(self.tb.relative("colless_index"), 1)
+
+    def test_ranks(self):
+        with self.assertRaisesRegex(ValueError, "colijn_plazotta_rank_log2"):
+            self.tb.absolute("colijn_plazotta_rank")
+        # the log2 of the rank doubles with every level
+        self.assertTrue(math.isinf(self.tb.absolute("colijn_plazotta_rank_log2")))
+        with self.assertRaisesRegex(ValueError, "2\\^1024 shapes"):
+            self.tb.absolute("furnas_rank")
+        self.assertEqual(self.tb.absolute("furnas_rank_log2"), 0) # caterpillars have rank 1
+
+    def test_all_indices(self):
+        tree = next(simulate("yule", 10 ** 4, seed=1))
+        start = time.perf_counter()
+        values = TreeShape(tree, "BINARY").all_absolute()
+        relative = TreeShape(tree, "BINARY").all_relative()
+        self.assertLess(time.perf_counter() - start, 30)
+        self.assertTrue(math.isnan(values["furnas_rank"]))
+        self.assertTrue(math.isnan(relative["furnas_rank"]))
+        self.assertTrue(0 < values["furnas_rank_log2"] < util.log2_we(10 ** 4))
+        self.assertTrue(0 < relative["furnas_rank_log2"] < 1)
+        self.assertEqual(values["sackin_index"], TreeShape(tree, "BINARY").absolute("sackin_index"))
+
+    def test_ete3(self):
+        n = 10 ** 4
+        newick = "(" * (n - 1) + "A,B)" + ",A)" * (n - 2) + ";"
+        for tree in [Tree(newick), newick]:
+            tb = TreeShape(tree, "BINARY")
+            self.assertEqual(tb.absolute("sackin_index"), (n - 1) * (n + 2) // 2)
+            self.assertEqual(tb.absolute("symmetry_nodes_index"), n - 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
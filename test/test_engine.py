@@ -0,0 +1,76 @@
+from ete3 import Tree
+import os
+import unittest
+import numpy as np
+
+import treeshapy.engine as engine
+import treeshapy.util as util
+from treeshapy.compact_tree import CompactTree
+from treeshapy.treeshapy import TreeShape, INDICES
+
+
+class TestEngine(unittest.TestCase):
+    test_tree_dir = "../test_data"
+    test_tree_names = ["fischer1", "fischer2", "fischer3", "fischer4", "fischer5", "fischer6", "mini1"]
+    arbitrary_trees = ["A;", "(A,B,C);", "((A,B,C,D),(E,F),G);", "(((A:1,B:2,C:0.5):2,D:1):1,(E,(F,G,H):3):4,I:2);"]
+
+    def trees(self):
+        for test_tree_name in self.test_tree_names:
+            yield Tree(os.path.join(self.test_tree_dir, test_tree_name  +".tree"))
+        for newick in self.arbitrary_trees:
+            yield Tree(newick)
+
+    def test_features(self):
+        for ete_tree in self.trees():
+            fused = CompactTree.from_ete3(ete_tree)
+            engine.precompute(fused)
+            single = CompactTree.from_ete3(ete_tree)
+            self.assertTrue(np.array_equal(fused.features["clade_size"], util.clade_sizes(single)))
+            self.assertTrue(np.array_equal(fused.features["depth"], util.depths(single)))
+            self.assertTrue(np.array_equal(fused.features["height"], util.heights(single)))
+            self.assertTrue(np.array_equal(fused.features["second_height"], util.second_heights(single)))
+            self.assertTrue(np.array_equal(fused.features["nodes_below"], util.nodes_below(single)))
+            self.assertTrue(np.array_equal(fused.features["farness"], util.farness(single)))
+            self.assertTrue(np.array_equal(fused.features["bcent"], util.bcent(single)))
+            self.assertTrue(np.allclose(fused.features["prob"], util.probs(single)))
+            self.assertTrue(np.allclose(fused.features["sum_below"], util.sum_below(single)))
+            if util.is_bifurcating(single):
+                self.assertTrue(np.array_equal(fused.features["ladder_length"], util.ladder_lengths(single)))
+            else:
+                self.assertNotIn("ladder_length", fused.features)
+
+    def test_indices(self):
+        for ete_tree in self.trees():
+            modes = ["BINARY", "ARBITRARY"] if util.is_bifurcating(CompactTree.from_ete3(ete_tree)) else ["ARBITRARY"]
+            for mode in modes:
+                fused = TreeShape(ete_tree, mode)
+                engine.precompute(fused.tree)
+                single = TreeShape(ete_tree, mode)
+                for index_name in INDICES:
+                    try:
+                        expected = single.absolute(index_name)
+                    except (ValueError, ZeroDivisionError) as e:
+                        with self.assertRaises(type(e)):
+                            fused.absolute(index_name)
+                        continue
+                    self.assertAlmostEqual(fused.absolute(index_name), expected)
+
+    def test_scheduler(self):
+        newick = "(((A,B),C),(D,(E,F)));"
+        tb = TreeShape(newick, "BINARY")
+        res = tb.compute(["sackin_index", "colless_index", "wiener_index"])
+        self.assertEqual(set(tb.tree.features), {"nodes_below", "depth", "clade_size"})
+        reference = TreeShape(Tree(newick), "BINARY")
+        for index_name, value in res.items():
+            self.assertAlmostEqual(value, reference.absolute(index_name))
+        tb.compute(["diameter", "B_2_index"])
+        self.assertEqual(set(tb.tree.features), {"nodes_below", "depth", "clade_size", "height", "second_height", "prob"})
+        tb = TreeShape(newick, "BINARY")
+        tb.compute(["symmetry_nodes_index", "cherry_index"])
+        self.assertEqual(set(tb.tree.features), {"shape_id"})
+        for index_name in INDICES:
+            self.assertTrue(engine.closure(tb.index(index_name).requires) <= set(engine.FEATURES))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import treeshapy
+
+
+class TestImport(unittest.TestCase):
+    # modules that dominate the startup time of short-lived worker and CLI
+    # processes, none of them is needed for "import treeshapy"
+    heavy = ["numpy", "numba", "ete3", "pkg_resources"]
+
+    def loaded(self, code):
+        # the heavy and the index modules loaded after running code
+        code = f"import sys; {code}; print(*sorted(m for m in sys.modules if m.split('.')[0] in {self.heavy!r} or m.endswith('_indices')))"
+        return self.run_python(code).split()
+
+    def run_python(self, code):
+        env = dict(os.environ)
+        root = os.path.dirname(os.path.dirname(os.path.abspath(treeshapy.__file__)))
+        env["PYTHONPATH"] = os.pathsep.join([root] + [p for p in [env.get("PYTHONPATH")] if p])
+        return subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True).stdout
+
+    def test_lazy_modules(self):
+        self.assertEqual(self.loaded("import treeshapy"), [])
+        # the first value only needs numpy and the module of its index
+        loaded = self.loaded("import treeshapy; treeshapy.TreeShape('((A,B),C);', 'BINARY').absolute('sackin_index')")
+        self.assertEqual([m for m in loaded if m.split(".")[0] != "numpy"], ["treeshapy.depth_indices"])
+        loaded = self.loaded("import treeshapy.treeshapy as ts; ts.TreeShape('((A,B),(C,(D,E)));', 'BINARY').all_relative()")
+        self.assertEqual([m for m in loaded if m.split(".")[0] in ["numba", "ete3", "pkg_resources"]], [])
+
+    def test_exports(self):
+        self.assertIn("evaluate_many", dir(treeshapy))
+        self.assertEqual(len(treeshapy.INDICES), 57)
+        with self.assertRaises(AttributeError):
+            treeshapy.no_such_name
+
+
+if __name__ == '__main__':
+    unittest.main()
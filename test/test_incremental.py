@@ -0,0 +1,93 @@
+import random
+import unittest
+
+from treeshapy.compact_tree import CompactTree
+from treeshapy.incremental import IncrementalTree, MAINTAINED
+from treeshapy.treeshapy import TreeShape
+
+
+def random_parents(n, rng):
+    parent = [-1]
+    leaves = [0]
+    while len(leaves) < n:
+        i = rng.randrange(len(leaves))
+        v = leaves[i]
+        parent += [v, v]
+        leaves[i] = len(parent) - 2
+        leaves.append(len(parent) - 1)
+    return parent
+
+
+class TestIncremental(unittest.TestCase):
+
+    def assertMatches(self, it):
+        tb = TreeShape(it.to_compact_tree(), "BINARY")
+        for index_name in MAINTAINED:
+            self.assertEqual(it.absolute(index_name), tb.absolute(index_name), index_name)
+        self.assertEqual(it.n, tb.n)
+
+    def alive(self, it):
+        return [v for v in range(len(it.parent)) if it.parent[v] != -2]
+
+    def random_move(self, it, rng):
+        nodes = self.alive(it)
+        move = rng.choice(["spr", "nni", "prune", "graft"])
+        if move == "spr":
+            s = rng.choice(nodes)
+            t = rng.choice(nodes)
+            if s == it.root or t == it.parent[s] or it.in_subtree(t, s):
+                with self.assertRaises(ValueError):
+                    it.spr(s, t)
+            else:
+                it.spr(s, t)
+        elif move == "nni":
+            inner = [v for v in nodes if it.children[v] and v != it.root]
+            if inner:
+                v = rng.choice(inner)
+                it.nni(v, rng.choice(it.children[v]))
+        elif move == "prune":
+            leaves = [v for v in nodes if not it.children[v]]
+            if len(leaves) > 2:
+                it.prune_leaf(rng.choice(leaves))
+        else:
+            it.graft_leaf(rng.choice(nodes))
+
+    def test_moves(self):
+        rng = random.Random(1)
+        compact = CompactTree.from_parents(random_parents(60, rng))
+        it = IncrementalTree(compact)
+        self.assertMatches(it)
+        for _ in range(300):
+            self.random_move(it, rng)
+            self.assertMatches(it)
+
+    def test_rollback(self):
+        rng = random.Random(2)
+        compact = CompactTree.from_parents(random_parents(40, rng))
+        it = IncrementalTree(compact)
+        before = dict(it.values)
+        for _ in range(50):
+            self.random_move(it, rng)
+        it.rollback()
+        self.assertEqual(it.values, before)
+        self.assertEqual(it.to_compact_tree().parent.tolist(), compact.parent.tolist())
+        it.graft_leaf(it.root)
+        it.commit()
+        after = dict(it.values)
+        it.rollback()
+        self.assertEqual(it.values, after)
+
+    def test_depth(self):
+        it = IncrementalTree("(((A,B),C),D);")
+        self.assertEqual([it.depth(v) for v in range(7)], [0, 1, 2, 3, 3, 2, 1])
+        it.nni(1, 5)
+        self.assertEqual(it.depth(2), 2)
+        self.assertEqual(it.clade_size(1), 3)
+        with self.assertRaises(ValueError):
+            it.absolute("wiener_index")
+        with self.assertRaises(ValueError):
+            IncrementalTree("(A,B,C);")
+
+
+if __name__ == '__main__':
+    unittest.main()
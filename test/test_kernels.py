@@ -0,0 +1,105 @@
+import os
+import subprocess
+import sys
+import unittest
+import numpy as np
+
+import treeshapy.engine as engine
+import treeshapy.kernels as kernels
+import treeshapy.util as util
+from treeshapy.batch import evaluate_row
+from treeshapy.compact_tree import CompactTree
+from treeshapy.simulation import simulate
+from treeshapy.treeshapy import TreeShape, INDICES
+
+
+class TestKernels(unittest.TestCase):
+    newicks = ["A;", "(A,B);", "(((A,B),(C,D)),((E,(F,G)),((H,I),J)));", "((A,B,C,D),(E,F),G);",
+               "(((A:1,B:2,C:0.5):2,D:1):1,(E,(F,G,H):3):4,I:2);", "(" * 29 + "A,B)" + ",A)" * 28 + ";"]
+
+    def setUp(self):
+        self.backend = kernels.get_backend()
+        kernels.set_backend("numpy")
+
+    def tearDown(self):
+        kernels.set_backend(self.backend)
+
+    def trees(self):
+        for newick in self.newicks:
+            yield CompactTree.from_newick(newick)
+        yield from simulate("yule", 40, 3, seed=1)
+        yield from simulate("pda", 300, 2, seed=2)
+
+    def test_backends(self):
+        with self.assertRaises(ValueError):
+            kernels.set_backend("cuda")
+        kernels.set_backend("auto")
+        self.assertFalse(kernels.enabled(CompactTree.from_newick(self.newicks[2])))
+        big = next(simulate("yule", kernels.AUTO_MIN_NODES, seed=3))
+        self.assertEqual(kernels.enabled(big), kernels.available())
+        if not kernels.available():
+            with self.assertRaises(ImportError):
+                kernels.set_backend("numba")
+            self.assertEqual(kernels.get_backend(), "numpy")
+
+    def test_environment(self):
+        # numba missing (a None entry in sys.modules fails its import)
+        code = "import sys; sys.modules['numba'] = None; import treeshapy, treeshapy.kernels as k; print(k.get_backend(), k.available())"
+        env = dict(os.environ, TREESHAPY_BACKEND="numba", PYTHONPATH=os.path.abspath(".."))
+        res = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env)
+        self.assertEqual(res.returncode, 0, res.stderr)
+        self.assertEqual(res.stdout.split(), ["auto", "False"])
+        self.assertIn("The numba backend requires numba, using the auto backend", res.stderr)
+
+    def test_python_kernels(self):
+        # the kernels as plain Python functions against the reference path
+        for tree in self.trees():
+            binary = util.is_bifurcating(tree)
+            engine.precompute(tree)
+            f = tree.features
+            nb, h, h2, sb, ll = kernels.postorder.py_func(tree.parent, tree.child_ptr, tree.children, tree.dist, True, True, binary)
+            self.assertTrue(np.array_equal(nb, f["nodes_below"]))
+            self.assertTrue(np.array_equal(h, f["height"]))
+            self.assertTrue(np.array_equal(h2, f["second_height"]))
+            self.assertTrue(np.allclose(sb, f["sum_below"]))
+            if not binary:
+                continue
+            self.assertTrue(np.array_equal(ll, f["ladder_length"]))
+            n = len(tree)
+            if util.we(n) < 1 << 61:
+                w = np.array(util.extend_we(n)[:n + 1], dtype=np.int64)
+                ranks = kernels.furnas_ranks.py_func(f["clade_size"], tree.child_ptr, tree.children, util.furnas_table(n), w)
+                self.assertEqual(ranks.tolist(), util.furnas_ranks(tree))
+            ranks, exact = kernels.colijn_plazotta_ranks.py_func(tree.child_ptr, tree.children)
+            if exact:
+                self.assertEqual(ranks.tolist(), util.colijn_plazotta_ranks(tree))
+            else:
+                self.assertGreater(util.colijn_plazotta_log2_ranks(tree)[0], 61)
+            log2_ranks = kernels.colijn_plazotta_log2_ranks.py_func(tree.child_ptr, tree.children)
+            self.assertTrue(np.allclose(log2_ranks, util.colijn_plazotta_log2_ranks(tree)))
+
+    def values(self, tree, mode, backend):
+        kernels.set_backend(backend)
+        prepared = evaluate_row(tree, INDICES, mode)
+        # without prepare, the features are computed on demand
+        lazy = np.full(len(INDICES), np.nan)
+        for j, index_name in enumerate(INDICES):
+            try:
+                lazy[j] = TreeShape(tree, mode).absolute(index_name)
+            except (ValueError, ArithmeticError):
+                pass
+        return np.concatenate([prepared, lazy])
+
+    @unittest.skipIf(not kernels.available(), "numba is not installed")
+    def test_numba(self):
+        # all index values on both backends
+        for tree in self.trees():
+            modes = ["ARBITRARY"] + (["BINARY"] if util.is_bifurcating(tree) else [])
+            for mode in modes:
+                expected = self.values(tree, mode, "numpy")
+                values = self.values(tree, mode, "numba")
+                self.assertTrue(np.allclose(values, expected, rtol=1e-12, equal_nan=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import math
+import os
+import tempfile
+import time
+import unittest
+import numpy as np
+
+import treeshapy.moments as moments
+import treeshapy.util as util
+from treeshapy.batch import evaluate_many
+from treeshapy.compact_tree import CompactTree
+from treeshapy.treeshapy import TreeShape
+
+
+class TestMoments(unittest.TestCase):
+    def setUp(self):
+        moments.tables.clear()
+
+    def tearDown(self):
+        moments.tables.clear()
+        moments.set_cache_dir(None)
+
+    def shape_probability(self, tree, beta):
+        # product over the inner nodes of the split probability, unordered
+        # splits of distinct subtrees occur in both orders
+        log_g = lambda k: math.lgamma(beta + k + 1) - math.lgamma(k + 1)
+        cs = util.clade_sizes(tree)
+        ids = util.shape_ids(tree)
+        c0, c1 = util.child_pairs(tree)
+        p = 1
+        for v, a, b in zip(tree.inner_nodes, c0, c1):
+            m = cs[v]
+            q = [math.exp(log_g(i) + log_g(m - i)) for i in range(1, m)]
+            p *= q[cs[a] - 1] / sum(q) * (1 if ids[a] == ids[b] else 2)
+        return p
+
+    def test_exhaustive(self):
+        for model, beta in [("yule", 0), ("pda", -1.5)]:
+            for n in range(2, 10):
+                trees = [CompactTree.from_furnas_rank(n, rank) for rank in range(1, util.we(n) + 1)]
+                p = np.array([self.shape_probability(tree, beta) for tree in trees])
+                self.assertAlmostEqual(p.sum(), 1)
+                for index_name in ["sackin_index", "total_path_length", "colless_index", "total_cophenetic_index", "cherry_index", "s_shape",
+                                   "stairs1", "stairs2", "total_I", "total_I_prime"]:
+                    values = np.array([float(TreeShape(tree, "BINARY").absolute(index_name)) for tree in trees])
+                    mean = p @ values
+                    var = p @ (values - mean) ** 2
+                    m, v = moments.moments(index_name, n, model)
+                    self.assertAlmostEqual(m, mean)
+                    self.assertAlmostEqual(v, var)
+
+    def test_yule_sackin(self):
+        # closed forms by Kirkpatrick and Slatkin
+        n = 50
+        h1 = sum(1 / k for k in range(1, n + 1))
+        h2 = sum(1 / k ** 2 for k in range(1, n + 1))
+        mean, var = moments.moments("sackin_index", n)
+        self.assertAlmostEqual(mean, 2 * n * (h1 - 1))
+        self.assertAlmostEqual(var, 7 * n * n - 4 * n * n * h2 - 2 * n * h1 - n)
+
+    def test_linear(self):
+        # convolutions against the recurrence
+        for model, beta in [("yule", 0), ("pda", -1.5)]:
+            for index_name in ["sackin_index", "total_internal_path_length", "colless_index"]:
+                instance = TreeShape.index_instance(index_name)
+                E, V = moments.linear_moments(instance.split_coefficients, beta, 1000)
+                table = moments.recurrence(instance.split_term, None, beta, np.full((0, 3), np.nan), 1000)
+                self.assertTrue(np.allclose(E, table[:, 0], rtol=1e-10))
+                self.assertTrue(np.allclose(V, table[:, 1], rtol=1e-10))
+
+    def test_large(self):
+        # closed forms for the Sackin index under the Yule model (see above)
+        # and under the PDA model (Mir, Rossello and Rotger 2013)
+        n = 100000
+        start = time.perf_counter()
+        k = np.arange(1, n + 1)
+        h1 = np.sum(1 / k)
+        h2 = np.sum(1 / k ** 2)
+        mean, var = moments.moments("sackin_index", n)
+        self.assertAlmostEqual(mean / (2 * n * (h1 - 1)), 1, 12)
+        self.assertAlmostEqual(var / (7 * n * n - 4 * n * n * h2 - 2 * n * h1 - n), 1, 9)
+        r = math.exp(-np.sum(np.log1p(-1 / (2 * k[:-1])))) # (2n - 2)!! / (2n - 3)!!
+        mean, var = moments.moments("sackin_index", n, "pda")
+        self.assertAlmostEqual(mean / (n * r - n), 1, 12)
+        self.assertAlmostEqual(var / (10 * n ** 3 / 3 - n * n - n / 3 - (n * n + n) * r / 2 - n * n * r * r), 1, 9)
+        for model in ["yule", "pda"]:
+            mean, var = moments.moments("colless_index", n, model)
+            self.assertTrue(0 < mean and 0 < var)
+        self.assertLess(time.perf_counter() - start, 20)
+        with self.assertRaises(ValueError):
+            moments.moments("stairs2", moments.MAX_RECURRENCE_LEAVES + 1)
+
+    def test_standardized(self):
+        newick = "((((A,B),C),D),((E,F),(G,H)));"
+        tb = TreeShape(newick, "BINARY")
+        mean, var = moments.moments("sackin_index", 8, "pda")
+        self.assertAlmostEqual(tb.standardized("sackin_index", "pda"), (tb.absolute("sackin_index") - mean) / math.sqrt(var))
+        self.assertTrue(math.isfinite(tb.standardized("stairs2")))
+        res = evaluate_many([newick], ["sackin_index", "stairs2"], "BINARY", workers=1, kind="standardized")
+        self.assertTrue(np.allclose(res[0], [tb.standardized("sackin_index"), tb.standardized("stairs2")]))
+        with self.assertRaises(ValueError):
+            TreeShape("((A,B),C);", "BINARY").standardized("colless_index") # only one shape
+        with self.assertRaises(ValueError):
+            TreeShape(newick, "ARBITRARY").standardized("sackin_index")
+        with self.assertRaises(ValueError):
+            tb.standardized("B_1_index") # no exact moments
+        self.assertIn("stairs2", moments.exact_indices())
+        self.assertNotIn("B_1_index", moments.exact_indices())
+        self.assertTrue(np.isnan(evaluate_many([newick], ["B_1_index"], "BINARY", workers=1, kind="standardized")[0, 0]))
+
+    def test_cache_dir(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            moments.set_cache_dir(tmp)
+            expected = [moments.moments("stairs1", 12), moments.moments("colless_index", 30)]
+            self.assertEqual(sorted(os.listdir(tmp)), ["moments_yule_colless_index.npy", "moments_yule_stairs1.npy"])
+            moments.tables.clear()
+            self.assertEqual([moments.moments("stairs1", 12), moments.moments("colless_index", 30)], expected)
+            # rows simulated by older versions are recomputed
+            table = np.full((13, 3), [1.0, 1.0, 2000])
+            np.save(os.path.join(tmp, "moments_yule_stairs2.npy"), table)
+            moments.tables.clear()
+            moments.moments("stairs2", 12)
+            self.assertTrue((moments.tables[("yule", "stairs2")][:, 2] == 0).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+from ete3 import Tree
+import os
+import unittest
+import numpy as np
+
+from treeshapy.compact_tree import CompactTree
+from treeshapy.newick import parse_newick
+
+
+class TestNewick(unittest.TestCase):
+    test_tree_dir = "../test_data"
+    test_tree_names = ["fischer1", "fischer2", "fischer3", "fischer4", "fischer5", "fischer6", "mini1"]
+
+    def assertSameTree(self, newick):
+        parent, dist = parse_newick(newick)
+        reference = CompactTree.from_ete3(Tree(newick, format=1))
+        self.assertEqual(parent.tolist(), reference.parent.tolist())
+        self.assertTrue(np.allclose(dist, reference.dist))
+
+    def test_like_ete3(self):
+        for test_tree_name in self.test_tree_names:
+            with open(os.path.join(self.test_tree_dir, test_tree_name  +".tree")) as f:
+                self.assertSameTree(f.read())
+        for newick in ["A;", "A:3;", "(A,B,C);", "((A:1,B:2)0.9:3,C:4)root:0.5;", " ( ( A , B ) ,\n C ) ;",
+                       "((A,B):2,C:1e-3);", "(((A:1,B:2,C:0.5):2,D:1):1,(E,(F,G,H):3):4,I:2);"]:
+            self.assertSameTree(newick)
+
+    def test_labels(self):
+        parent, dist = parse_newick("(('A,(x':1,B [comment, (x)]:2):3,C);")
+        self.assertEqual(parent.tolist(), [-1, 0, 1, 1, 0])
+        self.assertEqual(dist.tolist(), [0, 3, 1, 2, 1])
+        parent, dist = parse_newick("((,),);")
+        self.assertEqual(parent.tolist(), [-1, 0, 1, 1, 0])
+        parent, dist = parse_newick(b"((A,B)[&&NHX:x=1]:2,C:1e-3);(D,E);")
+        self.assertEqual(parent.tolist(), [-1, 0, 1, 1, 0])
+        self.assertEqual(dist.tolist(), [0, 2, 1, 1, 1e-3])
+
+    def test_invalid(self):
+        for newick in ["((A,B);", "(A,B));", "(A,B),(C,D);", "((A,B):x,C);", "(:1(A,B));"]:
+            with self.assertRaises(ValueError):
+                parse_newick(newick)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import json
+import os
+import tempfile
+import unittest
+import numpy as np
+
+import treeshapy.profiling as profiling
+from treeshapy.batch import evaluate_many
+from treeshapy.cli import main
+from treeshapy.store import open_store
+from treeshapy.treeshapy import TreeShape, bounds
+
+
+class TestProfiling(unittest.TestCase):
+    newicks = ["((A,B),C);", "(((A,B),C),D);", "((A,B),(C,D));", "((A,(B,C)),(D,E));", "(A,(B,(C,(D,E))));"]
+
+    def tearDown(self):
+        profiling.disable()
+
+    def test_tree_shape(self):
+        bounds.cache_clear()
+        tb = TreeShape("((A,(B,C)),(D,E));", "BINARY", profile=True)
+        tb.prepare(["sackin_index", "mean_bcent"])
+        tb.relative("sackin_index")
+        tb.absolute("mean_bcent")
+        tb.absolute("rooted_quartet_index") # not prepared
+        stats = tb.profile.to_dict()
+        self.assertEqual(set(stats["spans"]["index"]), {"sackin_index", "mean_bcent", "rooted_quartet_index"})
+        self.assertEqual(stats["spans"]["index"]["sackin_index"]["calls"], 1)
+        self.assertIn("postorder_sweep", stats["spans"]["precompute"])
+        self.assertEqual(stats["spans"]["precompute"]["bcent"]["calls"], 1)
+        self.assertEqual(stats["counters"]["feature"]["bcent"], {"hits": 0, "misses": 1})
+        self.assertEqual(stats["counters"]["feature"]["clade_size"], {"hits": 0, "misses": 1})
+        self.assertEqual(stats["counters"]["bounds"]["sackin_index"], {"hits": 0, "misses": 1})
+        tb.prepare(["sackin_index", "average_leaf_depth"]) # sackin_index is cached
+        tb.relative("sackin_index")
+        stats = tb.profile.to_dict()
+        self.assertEqual(stats["counters"]["feature"]["depth"], {"hits": 1, "misses": 1})
+        self.assertEqual(stats["counters"]["bounds"]["sackin_index"], {"hits": 1, "misses": 1})
+        self.assertEqual(stats["spans"]["index"]["sackin_index"]["calls"], 1)
+        self.assertIsNone(TreeShape("((A,B),C);", "BINARY").profile)
+
+    def test_store(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "results.sqlite")
+            try:
+                profile = profiling.Profile()
+                for _ in range(2):
+                    TreeShape("((A,B),C);", "BINARY", path, profile).compute(["sackin_index"])
+                self.assertEqual(profile.to_dict()["counters"]["store"]["sackin_index"], {"hits": 1, "misses": 1})
+            finally:
+                open_store(path).close()
+
+    def test_active(self):
+        profile = profiling.enable()
+        values = evaluate_many(self.newicks, ["sackin_index", "colless_index"], "BINARY", workers=1)
+        self.assertIs(profiling.disable(), profile)
+        self.assertIsNone(profiling.active)
+        self.assertEqual(profile.to_dict()["spans"]["index"]["colless_index"]["calls"], len(self.newicks))
+        self.assertEqual(profile.to_dict()["spans"]["tree"]["load"]["calls"], len(self.newicks))
+        self.assertTrue(np.array_equal(values, evaluate_many(self.newicks, ["sackin_index", "colless_index"], "BINARY", workers=1)))
+        self.assertEqual(profile.to_dict()["spans"]["index"]["colless_index"]["calls"], len(self.newicks))
+
+    def test_workers(self):
+        profile = profiling.Profile()
+        evaluate_many(self.newicks, ["sackin_index"], "BINARY", workers=2, chunksize=1, profile=profile)
+        self.assertEqual(profile.to_dict()["spans"]["index"]["sackin_index"]["calls"], len(self.newicks))
+        self.assertEqual(sum(event[:2] == ("index", "sackin_index") for event in profile.events), len(self.newicks))
+        self.assertNotIn(os.getpid(), {event[4] for event in profile.events})
+
+    def test_chrome_trace(self):
+        profile = profiling.Profile(max_events=3)
+        for newick in self.newicks:
+            TreeShape(newick, "BINARY", profile=profile).absolute("sackin_index")
+        other = profiling.Profile()
+        TreeShape("((A,B),C);", "BINARY", profile=other).absolute("colless_index")
+        profile.merge(other)
+        trace = profile.chrome_trace()
+        self.assertEqual(len(trace["traceEvents"]), 3)
+        event = trace["traceEvents"][0]
+        self.assertEqual(event["ph"], "X")
+        self.assertEqual((event["cat"], event["name"]), ("tree", "load"))
+        self.assertGreaterEqual(event["dur"], 0)
+        self.assertEqual(trace["otherData"]["spans"]["index"]["sackin_index"]["calls"], len(self.newicks))
+        self.assertEqual(trace["otherData"]["spans"]["index"]["colless_index"]["calls"], 1)
+        self.assertEqual(trace["otherData"]["dropped_events"], 2 * len(self.newicks) + 2 - 3)
+        with tempfile.TemporaryDirectory() as tmp:
+            trees = os.path.join(tmp, "trees.nwk")
+            with open(trees, "w") as f:
+                f.write("\n".join(self.newicks) + "\n")
+            path = os.path.join(tmp, "trace.json")
+            main([trees, "-i", "sackin_index", "-o", os.path.join(tmp, "out.csv"), "--profile", path])
+            with open(path) as f:
+                trace = json.load(f)
+            self.assertEqual(trace["otherData"]["spans"]["index"]["sackin_index"]["calls"], len(self.newicks))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import bz2
+import gzip
+import lzma
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+
+import treeshapy.reader as reader
+from treeshapy import iter_trees, iter_indices
+from treeshapy.treeshapy import TreeShape
+
+
+class TestReader(unittest.TestCase):
+    newicks = ["((A,B),C);", "(((A,B),C),D);", "((A,B),(C,D));", "(A,B);", "((A,(B,C)),(D,E));",
+               "(A,(B,(C,(D,E))));", "((A,B),(C,(D,E)));", "(((A,B),(C,D)),E);", "(A,(B,C));", "((A,B),C,D);"]
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        text = "".join(newick + "\n" for newick in self.newicks).encode()
+        self.paths = []
+        for name, opener in [("trees.nwk", open), ("trees.nwk.gz", gzip.open), ("trees.bz2", bz2.open), ("trees", lzma.open)]:
+            path = os.path.join(self.tmp.name, name)
+            with opener(path, "wb") as f:
+                f.write(text)
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_iter_trees(self):
+        for path in self.paths:
+            sizes = [len(tree) for tree in iter_trees(path)]
+            self.assertEqual(sizes, [3, 4, 4, 2, 5, 5, 5, 5, 3, 4])
+
+    def test_burnin_thin(self):
+        path = self.paths[1]
+        self.assertEqual([len(tree) for tree in iter_trees(path, burnin=0.25)], [4, 2, 5, 5, 5, 5, 3, 4])
+        self.assertEqual([len(tree) for tree in iter_trees(path, thin=3)], [3, 2, 5, 4])
+        self.assertEqual([len(tree) for tree in iter_trees(path, burnin=0.5, thin=2)], [5, 5, 4])
+        with self.assertRaises(ValueError):
+            list(iter_trees(path, burnin=1))
+
+    def test_iter_indices(self):
+        rows = list(iter_indices(self.paths[2], ["sackin_index", "cherry_index"], "ARBITRARY"))
+        self.assertEqual(len(rows), len(self.newicks))
+        for row, newick in zip(rows, self.newicks):
+            tb = TreeShape(newick, "ARBITRARY")
+            self.assertEqual(row[0], tb.absolute("sackin_index"))
+            self.assertEqual(row[1], tb.absolute("cherry_index"))
+        rows = list(iter_indices(self.paths[0], ["sackin_index"], "BINARY", thin=2))
+        expected = [TreeShape(newick, "BINARY").absolute("sackin_index") for newick in self.newicks[::2]]
+        self.assertTrue(np.array_equal(np.array(rows)[:, 0], expected))
+
+    def test_beast(self):
+        # '=' in header comments, ';' in quoted labels and comments
+        path = os.path.join(self.tmp.name, "beast.trees.gz")
+        with gzip.open(path, "wt") as f:
+            f.write("#NEXUS\n\nBegin taxa;\n\tDimensions ntax=3;\n\tTaxlabels\n\t\t'A;1'\n\t\tB\n\t\tC\n\t\t;\nEnd;\n"
+                    "Begin trees;\n\tTranslate\n\t\t1 'A;1',\n\t\t2 B,\n\t\t3 C\n\t\t;\n"
+                    "tree STATE_0 [&lnP=-3.7,posterior=-3.7] = [&R] ((1:[&rate=0.5]1.0,2:1.0):[&rate=1.0;x]0.5,3:2.0);\n"
+                    "tree 'STATE 1' = [&R] (1:1.0,(2:1.0,3:1.0):0.5);\n"
+                    "tree STATE_2 [&lnP=-4.1] [&joint=-2] = ((('A;1':1,B:1):1,C:1):1,'D''s':1);\n"
+                    "End;\n")
+        expected = [TreeShape(newick, "BINARY").absolute("sackin_index") for newick in ["((A,B),C);", "(A,(B,C));", "(((A,B),C),D);"]]
+        for block_size in [reader.BLOCK_SIZE, 7]:
+            with mock.patch.object(reader, "BLOCK_SIZE", block_size):
+                rows = list(iter_indices(path, ["sackin_index"], "BINARY"))
+            self.assertEqual(np.array(rows)[:, 0].tolist(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import math
+import tempfile
+import unittest
+import numpy as np
+
+import treeshapy.util as util
+from treeshapy.compact_tree import CompactTree
+from treeshapy.shape_tables import ShapeTable, build_shape_tables
+from treeshapy.treeshapy import TreeShape, INDICES
+
+
+class TestShapeTables(unittest.TestCase):
+    max_n = 8
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        build_shape_tables(cls.tmp.name, cls.max_n, workers=1)
+        cls.table = ShapeTable(cls.tmp.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_values(self):
+        n = 7
+        tree = CompactTree.from_furnas_rank(n, 5)
+        tb = TreeShape(tree, "BINARY")
+        self.assertEqual(self.table.values("sackin_index", n)[4], tb.absolute("sackin_index"))
+        row = self.table.row("((((A,B),C),D),(E,(F,G)));")
+        self.assertEqual(len(row), len(INDICES))
+        self.assertEqual(row[INDICES.index("colless_index")], 1 + 2 + 1 + 1)
+        with self.assertRaisesRegex(ValueError, "binary"):
+            self.table.row("((A,B,C),D);")
+        for model in ["yule", "pda"]:
+            self.assertAlmostEqual(self.table.probabilities(n, model).sum(), 1)
+        # 1/3 balanced shapes with four leaves under Yule, 1/5 under PDA
+        self.assertAlmostEqual(self.table.probabilities(4, "yule")[util.furnas_ranks(CompactTree.from_newick("((A,B),(C,D));"))[0] - 1], 1 / 3)
+        self.assertAlmostEqual(self.table.probabilities(4, "pda")[1], 1 / 5)
+
+    def test_bounds(self):
+        for n in range(2, self.max_n + 1):
+            for index_name in ["sackin_index", "colless_index", "total_cophenetic_index"]:
+                tb = TreeShape(CompactTree.from_furnas_rank(n, 1), "BINARY")
+                min_v, max_v = tb.index(index_name).minimum(n, n - 1, "BINARY"), tb.index(index_name).maximum(n, n - 1, "BINARY")
+                self.assertEqual(self.table.minimum(index_name, n), min_v)
+                self.assertEqual(self.table.maximum(index_name, n), max_v)
+        self.assertTrue(math.isnan(self.table.maximum("mean_I", 3)))
+
+    def test_p_values(self):
+        n = self.max_n
+        values = self.table.values("colless_index", n)
+        for model in ["yule", "pda"]:
+            p = self.table.probabilities(n, model)
+            for x in [0, 2.5, 3, 10, values.max()]:
+                self.assertAlmostEqual(self.table.cdf("colless_index", n, x, model), p[values <= x].sum())
+                self.assertAlmostEqual(self.table.sf("colless_index", n, x, model), p[values >= x].sum())
+        self.assertEqual(self.table.cdf("colless_index", n, -1), 0)
+        with self.assertRaises(ValueError):
+            self.table.values("sackin_index", self.max_n + 1)
+
+    def test_resume(self):
+        build_shape_tables(self.tmp.name, self.max_n + 1, workers=1)
+        table = ShapeTable(self.tmp.name)
+        self.assertEqual(table.max_n, self.max_n + 1)
+        self.assertTrue(np.array_equal(table.values("sackin_index", 5), self.table.values("sackin_index", 5)))
+
+
+if __name__ == '__main__':
+    unittest.main()
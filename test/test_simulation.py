@@ -0,0 +1,57 @@
+import math
+import unittest
+import numpy as np
+
+import treeshapy.util as util
+from treeshapy import simulate, evaluate_many
+from treeshapy.simulation import simulate_indices
+
+
+class TestSimulation(unittest.TestCase):
+    def balanced_fraction(self, trees):
+        # the only shapes with 4 leaves are the balanced one and the caterpillar
+        return np.mean([util.clade_sizes(tree)[1] == 2 for tree in trees])
+
+    def expected_balanced(self, beta):
+        log_g = lambda k: math.lgamma(beta + k + 1) - math.lgamma(k + 1)
+        q = [math.exp(log_g(i) + log_g(4 - i)) for i in range(1, 4)]
+        return q[1] / sum(q)
+
+    def test_trees(self):
+        for model in ["yule", "pda"]:
+            for n in [1, 2, 7, 100]:
+                trees = list(simulate(model, n, 20, seed=1))
+                self.assertEqual(len(trees), 20)
+                for tree in trees:
+                    self.assertEqual(len(tree), n)
+                    self.assertEqual(tree.num_nodes, 2 * n - 1)
+                    self.assertTrue(util.is_bifurcating(tree))
+        a = [tree.parent.tolist() for tree in simulate("pda", 50, 10, seed=3)]
+        b = [tree.parent.tolist() for tree in simulate("pda", 50, 10, seed=3)]
+        self.assertEqual(a, b)
+        with self.assertRaises(ValueError):
+            next(simulate("beta", 5, beta=-2))
+        with self.assertRaises(ValueError):
+            next(simulate("coalescent", 5))
+
+    def test_distribution(self):
+        size = 20000
+        for model, beta in [("yule", 0), ("pda", -1.5), ("beta", -1.9), ("beta", -0.5), ("beta", 3)]:
+            p = self.expected_balanced(beta)
+            frac = self.balanced_fraction(simulate(model, 4, size, seed=2, beta=beta))
+            self.assertLess(abs(frac - p), 4 * math.sqrt(p * (1 - p) / size))
+        # expected Sackin index under Yule
+        n = 20
+        values = simulate_indices("yule", n, 4000, ["sackin_index"], seed=4, workers=1)[:, 0]
+        expected = 2 * n * sum(1 / k for k in range(2, n + 1))
+        self.assertLess(abs(values.mean() - expected), 4 * values.std() / math.sqrt(len(values)))
+
+    def test_indices(self):
+        index_names = ["sackin_index", "colless_index", "cherry_index"]
+        res = simulate_indices("pda", 30, 50, index_names, seed=5, workers=1, batch_size=16)
+        expected = evaluate_many(simulate("pda", 30, 50, seed=5), index_names, "BINARY", workers=1)
+        self.assertTrue(np.array_equal(res, expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
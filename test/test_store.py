@@ -0,0 +1,95 @@
+import math
+import os
+import sqlite3
+import tempfile
+import unittest
+import numpy as np
+
+import treeshapy.util as util
+from treeshapy.batch import evaluate_many
+from treeshapy.compact_tree import CompactTree
+from treeshapy.store import open_store
+from treeshapy.treeshapy import TreeShape, INDICES
+
+
+class TestStore(unittest.TestCase):
+    newick = "(((A:1,B:2):1,C:1):0.5,(D:1,E:3):2);"
+    mirrored = "((E:3,D:1):2,(C:1,(B:2,A:1):1):0.5);"
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "results.sqlite")
+
+    def tearDown(self):
+        open_store(self.path).close()
+        self.tmp.cleanup()
+
+    def rows(self):
+        open_store(self.path).flush()
+        with sqlite3.connect(self.path) as connection:
+            return connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def test_digest(self):
+        tree = CompactTree.from_newick(self.newick)
+        mirrored = CompactTree.from_newick(self.mirrored)
+        self.assertEqual(util.canonical_digest(tree), util.canonical_digest(mirrored))
+        self.assertEqual(util.canonical_digest(tree, True), util.canonical_digest(mirrored, True))
+        self.assertNotEqual(util.canonical_digest(tree), util.canonical_digest(CompactTree.from_newick("((A,B),C,(D,E));")))
+        other_lengths = CompactTree.from_newick(self.newick.replace("E:3", "E:4"))
+        self.assertEqual(util.canonical_digest(tree), util.canonical_digest(other_lengths))
+        self.assertNotEqual(util.canonical_digest(tree, True), util.canonical_digest(other_lengths, True))
+
+    def test_tree_shape(self):
+        expected = TreeShape(self.newick, "BINARY").all_absolute()
+        TreeShape(self.newick, "BINARY", self.path).all_absolute()
+        self.assertEqual(self.rows(), len(INDICES))
+        # same shape, values come from the store and no features are computed
+        tb = TreeShape(self.mirrored, "BINARY", self.path)
+        values = tb.all_absolute()
+        self.assertEqual(tb.tree.features, {})
+        for index_name in INDICES:
+            if not (isinstance(expected[index_name], float) and math.isnan(expected[index_name])):
+                self.assertEqual(values[index_name], expected[index_name])
+        # different branch lengths, only the branch length indices are computed
+        tb = TreeShape(self.newick.replace("E:3", "E:4"), "BINARY", self.path)
+        tb.compute(INDICES)
+        self.assertNotIn("clade_size", tb.tree.features)
+        self.assertIn("sum_below", tb.tree.features)
+        self.assertEqual(self.rows(), len(INDICES) + 2)
+        # stored values are used as they are
+        store = open_store(self.path)
+        tree = CompactTree.from_newick("((A,B),C);")
+        store.put(util.canonical_digest(tree), b"", "BINARY", "sackin_index", 42)
+        self.assertEqual(TreeShape(tree, "BINARY", store).absolute("sackin_index"), 42)
+
+    def test_values(self):
+        n = 12 # a rank of a few hundred bits
+        caterpillar = "(" * (n - 1) + "A,B)" + ",A)" * (n - 2) + ";"
+        tb = TreeShape(caterpillar, "BINARY", self.path)
+        rank = tb.absolute("colijn_plazotta_rank")
+        tb.compute(["colijn_plazotta_rank"])
+        self.assertEqual(TreeShape(caterpillar, "BINARY", self.path).absolute("colijn_plazotta_rank"), rank)
+        store = open_store(self.path)
+        store.put(b"x", b"", "BINARY", "mean_I", float("nan"))
+        self.assertTrue(math.isnan(store.get(b"x", b"", "BINARY")["mean_I"]))
+
+    def test_batch(self):
+        trees = [self.newick, self.mirrored, "((A,B),(C,D));", "(A,(B,(C,D)));", "(A,B,C);"]
+        expected = evaluate_many(trees, workers=1)
+        for workers in [1, 2]:
+            res = evaluate_many(trees, workers=workers, store=self.path)
+            # the mirrored tree gets the stored stemminess of the first one,
+            # which may differ in the last bit
+            self.assertTrue(np.allclose(res, expected, equal_nan=True))
+        num_rows = self.rows()
+        os.environ["TREESHAPY_STORE"] = self.path
+        try:
+            res = evaluate_many(trees, workers=2)
+        finally:
+            del os.environ["TREESHAPY_STORE"]
+        self.assertTrue(np.allclose(res, expected, equal_nan=True))
+        self.assertEqual(self.rows(), num_rows)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+from ete3 import Tree
+import itertools
+import math
+import unittest
+
+import treeshapy.util as util
+from treeshapy.compact_tree import CompactTree
+from treeshapy.simulation import simulate
+from treeshapy.treeshapy import bounds
+
+
+class TestUtil(unittest.TestCase):
+
+    def test_shape_ids(self):
+        tree = CompactTree.from_newick("(((A,B),(C,D)),((E,(F,G)),((H,I),J)));")
+        ids = util.shape_ids(tree)
+        # preorder: 0 root, 1 ((A,B),(C,D)), 2 (A,B), 5 (C,D), 8 right subtree, 9 (E,(F,G)), 11 (F,G), 14 ((H,I),J), 15 (H,I)
+        self.assertEqual(ids[2], ids[5])
+        self.assertEqual(ids[2], ids[11])
+        self.assertEqual(ids[9], ids[14])
+        self.assertNotEqual(ids[1], ids[9])
+        self.assertNotEqual(ids[0], ids[8])
+        self.assertTrue(util.isomorphic(tree, 9, 14))
+        self.assertFalse(util.isomorphic(tree, 1, 8))
+
+    def test_shared_shape_ids(self):
+        classes = {}
+        newicks = ["((A,(B,C)),(D,E,(F,G)));", "(((G,F),E,D),((C,B),A));", "((A,(B,C)),(D,(E,F,G)));"]
+        roots = [util.compute_shape_ids(CompactTree.from_ete3(Tree(newick)), classes)[0] for newick in newicks]
+        self.assertEqual(roots[0], roots[1])
+        self.assertNotEqual(roots[0], roots[2])
+
+    def test_bound_helpers(self):
+        for n in range(1, 200):
+            self.assertEqual(util.floor_log2(n), math.floor(math.log2(n)))
+            self.assertEqual(util.ceil_log2(n), math.ceil(math.log2(n)))
+            self.assertEqual(util.popcount_sum(n), sum(bin(i).count("1") for i in range(n)))
+            s = 0
+            for j in range(1, math.ceil(math.log2(n))):
+                x = n / 2 ** j
+                s += 2 ** j * min(math.ceil(x) - x, x - math.floor(x))
+            self.assertEqual(util.balanced_colless(n), s)
+
+    def test_bounds(self):
+        n = 10 ** 6
+        self.assertEqual(bounds("total_cophenetic_index", n, n - 1, "BINARY")[0], n * (n - 1) // 2 - util.popcount_sum(n))
+        self.assertAlmostEqual(bounds("s_shape", 20, 19, "BINARY")[1], math.log2(math.factorial(19)))
+        self.assertIs(bounds("colless_index", n, n - 1, "BINARY"), bounds("colless_index", n, n - 1, "BINARY"))
+
+    def test_rooted_quartet_index(self):
+        # brute force: the clusters a quartet induces determine its shape
+        q = {(): 4, (2, 2): 3, (3,): 2, (2,): 1, (2, 3): 0}
+        for newick in ["(((A,B),C),(D,(E,F)));", "((A,B,C,D),(E,F),G);", "(((A,B,C),D,(E,F)),(G,H),I);", "(A,B,C,D,E);"]:
+            tree = CompactTree.from_newick(newick)
+            leaves = tree.leaves.tolist()
+            clusters = [set(v for v in leaves if u in self.ancestors(tree, v)) for u in tree.inner_nodes.tolist()]
+            expected = 0
+            for quartet in itertools.combinations(leaves, 4):
+                induced = set(frozenset(c & set(quartet)) for c in clusters)
+                expected += q[tuple(sorted(len(c) for c in induced if len(c) in (2, 3)))]
+            self.assertEqual(util.precompute_rqi(tree), expected)
+
+    def test_furnas(self):
+        for n in range(1, 12):
+            ranks = [util.furnas_ranks(CompactTree.from_furnas_rank(n, rank))[0] for rank in range(1, util.we(n) + 1)]
+            self.assertEqual(ranks, list(range(1, util.we(n) + 1)))
+        # subtrees of equal size are ordered by rank
+        newicks = ["(((A,B),(C,D)),(((E,F),G),H));", "((((E,F),G),H),((A,B),(C,D)));"]
+        ranks = [util.furnas_ranks(CompactTree.from_newick(newick))[0] for newick in newicks]
+        self.assertEqual(ranks[0], ranks[1])
+        tree = CompactTree.from_furnas_rank(200, util.we(200) // 3)
+        self.assertEqual(util.furnas_ranks(tree)[0], util.we(200) // 3)
+        with self.assertRaises(ValueError):
+            util.furnas_unrank(5, 4)
+        with self.assertRaises(OverflowError):
+            util.furnas_ranks(CompactTree.from_newick("(" * 999 + "A,B)" + ",A)" * 998 + ";"))
+
+    def test_furnas_log2(self):
+        trees = [CompactTree.from_furnas_rank(n, rank) for n in range(1, 9) for rank in range(1, util.we(n) + 1)]
+        trees += [CompactTree.from_furnas_rank(n, util.we(n) // 3) for n in [150, 400]]
+        trees.append(CompactTree.from_newick("(((A,B),(C,D)),(((E,F),G),H));"))
+        for tree in trees:
+            ranks = util.furnas_ranks(tree)
+            log2_ranks = util.furnas_log2_ranks(tree)
+            for r, l in zip(ranks, log2_ranks):
+                self.assertAlmostEqual(l, math.log2(r), delta=1e-6 + 1e-12 * l)
+        # the caterpillar has rank 1 at every size
+        tree = CompactTree.from_newick("(" * 4999 + "A,B)" + ",A)" * 4998 + ";")
+        self.assertEqual(util.furnas_log2_ranks(tree)[0], 0)
+        log2_rank = util.furnas_log2_ranks(next(simulate("yule", 2000, seed=1)))[0]
+        self.assertTrue(0 < log2_rank < util.log2_we(2000))
+
+    def test_colijn_plazotta(self):
+        # distinct ranks for all shapes, ranks of mirrored trees are equal
+        for n in range(1, 10):
+            trees = [CompactTree.from_furnas_rank(n, rank) for rank in range(1, util.we(n) + 1)]
+            ranks = {util.colijn_plazotta_ranks(tree)[0] for tree in trees}
+            self.assertEqual(len(ranks), util.we(n))
+        newicks = ["(((A,B),(C,D)),(((E,F),G),H));", "((H,(G,(F,E))),((D,C),(B,A)));"]
+        ranks = [util.colijn_plazotta_ranks(CompactTree.from_newick(newick)) for newick in newicks]
+        self.assertEqual(ranks[0][0], ranks[1][0])
+        self.assertEqual(sorted(ranks[0]), sorted(ranks[1]))
+        # caterpillar with 22 leaves, the rank has about 330000 bits
+        n = 22
+        tree = CompactTree.from_newick("(" * (n - 1) + "A,B)" + ",A)" * (n - 2) + ";")
+        log2_ranks = util.colijn_plazotta_log2_ranks(tree)
+        with self.assertRaises(OverflowError):
+            util.colijn_plazotta_ranks(tree)
+        ranks = util.colijn_plazotta_ranks(tree, max_bits=1 << 20)
+        for r, l in zip(ranks, log2_ranks):
+            self.assertAlmostEqual(l, math.log2(r), delta=1e-9 * l)
+
+    def ancestors(self, tree, v):
+        res = [v]
+        while v:
+            v = int(tree.parent[v])
+            res.append(v)
+        return res
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,18 +2,15 @@ import treeshapy.util as util
 from treeshapy.tree_index import TreeIndex
 
 class MeanI(TreeIndex):
+    requires = ("clade_size",)
+
     def evaluate(self, tree, mode):
         if mode == "ARBITRARY":
             raise ValueError("mean_I is not defined for arbitrary trees")
-        try:
-            return tree.mean_I
-        except AttributeError:
-            if tree.is_leaf():
-                tree.add_feature("mean_I", 0)
-            else:
-                values = util.I_values(tree, "I")
-                tree.add_feature("mean_I", sum(values) / len(values))
-            return tree.mean_I
+        if tree.num_nodes == 1:
+            return 0
+        values = util.I_values(tree, "I")
+        return float(values.sum()) / len(values)
 
     def maximum(self, n, m, mode):
         return float("nan")
@@ -26,17 +23,18 @@ class MeanI(TreeIndex):
 
 
 class TotalI(TreeIndex):
+    requires = ("clade_size",)
+
+    @staticmethod
+    def split_term(n_l, n_r):
+        return util.I_split_term(n_l, n_r)
+
     def evaluate(self, tree, mode):
         if mode == "ARBITRARY":
             raise ValueError("total_I is not defined for arbitrary trees")
-        try:
-            return tree.total_I
-        except AttributeError:
-            if tree.is_leaf():
-                tree.add_feature("total_I", 0)
-            else:
-                tree.add_feature("total_I", sum(util.I_values(tree, "I")))
-            return tree.total_I
+        if tree.num_nodes == 1:
+            return 0
+        return float(util.I_values(tree, "I").sum())
 
     def maximum(self, n, m, mode):
         return float("nan")
@@ -49,18 +47,15 @@ class TotalI(TreeIndex):
 
 
 class MeanIPrime(TreeIndex):
+    requires = ("clade_size",)
+
     def evaluate(self, tree, mode):
         if mode == "ARBITRARY":
             raise ValueError("mean_I_prime is not defined for arbitrary trees")
-        try:
-            return tree.mean_I_prime
-        except AttributeError:
-            if tree.is_leaf():
-                tree.add_feature("mean_I_prime", 0)
-            else:
-                values = util.I_values(tree, "I_prime")
-                tree.add_feature("mean_I_prime", sum(values) / len(values))
-            return tree.mean_I_prime
+        if tree.num_nodes == 1:
+            return 0
+        values = util.I_values(tree, "I_prime")
+        return float(values.sum()) / len(values)
 
     def maximum(self, n, m, mode):
         return float("nan")
@@ -73,17 +68,18 @@ class MeanIPrime(TreeIndex):
 
 
 class TotalIPrime(TreeIndex):
+    requires = ("clade_size",)
+
+    @staticmethod
+    def split_term(n_l, n_r):
+        return util.I_split_term(n_l, n_r, prime=True)
+
     def evaluate(self, tree, mode):
         if mode == "ARBITRARY":
             raise ValueError("total_I_prime is not defined for arbitrary trees")
-        try:
-            return tree.total_I_prime
-        except AttributeError:
-            if tree.is_leaf():
-                tree.add_feature("total_I_prime", 0)
-            else:
-                tree.add_feature("total_I_prime", sum(util.I_values(tree, "I_prime")))
-            return tree.total_I_prime
+        if tree.num_nodes == 1:
+            return 0
+        return float(util.I_values(tree, "I_prime").sum())
 
     def maximum(self, n, m, mode):
         return float("nan")
@@ -96,19 +92,16 @@ class TotalIPrime(TreeIndex):
 
 
 class MeanIW(TreeIndex):
+    requires = ("clade_size",)
+
     def evaluate(self, tree, mode):
         if mode == "ARBITRARY":
             raise ValueError("mean_I_w is not defined for arbitrary trees")
-        try:
-            return tree.mean_I_w
-        except AttributeError:
-            if tree.is_leaf():
-                tree.add_feature("mean_I_w", 0)
-            else:
-                sw = util.I_weight_sum(tree)
-                values = util.I_values(tree, "I_w", sw)
-                tree.add_feature("mean_I_w", sum(values) / len(values))
-            return tree.mean_I_w
+        if tree.num_nodes == 1:
+            return 0
+        sw = util.I_weight_sum(tree)
+        values = util.I_values(tree, "I_w", sw)
+        return float(values.sum()) / len(values)
 
     def maximum(self, n, m, mode):
         return float("nan")
@@ -121,18 +114,15 @@ class MeanIW(TreeIndex):
 
 
 class TotalIW(TreeIndex):
+    requires = ("clade_size",)
+
     def evaluate(self, tree, mode):
         if mode == "ARBITRARY":
             raise ValueError("total_I_w is not defined for arbitrary trees")
-        try:
-            return tree.total_I_w
-        except AttributeError:
-            if tree.is_leaf():
-                tree.add_feature("total_I_w", 0)
-            else:
-                sw = util.I_weight_sum(tree)
-                tree.add_feature("total_I_w", sum(util.I_values(tree, "I_w", sw)))
-            return tree.total_I_w
+        if tree.num_nodes == 1:
+            return 0
+        sw = util.I_weight_sum(tree)
+        return float(util.I_values(tree, "I_w", sw).sum())
 
     def maximum(self, n, m, mode):
         return float("nan")
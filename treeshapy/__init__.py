@@ -0,0 +1,26 @@
+import importlib
+
+# public names and the modules providing them. They are imported on first
+# access, so that "import treeshapy" stays cheap for short-lived processes
+# (numpy and the index modules are only loaded when they are needed).
+EXPORTS = {
+    "TreeShape": "treeshapy.treeshapy",
+    "INDICES": "treeshapy.treeshapy",
+    "evaluate_many": "treeshapy.batch",
+    "iter_trees": "treeshapy.reader",
+    "iter_indices": "treeshapy.reader",
+    "IncrementalTree": "treeshapy.incremental",
+    "simulate": "treeshapy.simulation",
+}
+
+
+def __getattr__(name):
+    if name not in EXPORTS:
+        raise AttributeError(f"module 'treeshapy' has no attribute '{name}'")
+    value = getattr(importlib.import_module(EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(EXPORTS))
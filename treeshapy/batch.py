@@ -0,0 +1,136 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import treeshapy.profiling as profiling
+from treeshapy.compact_tree import CompactTree
+from treeshapy.store import open_store
+from treeshapy.treeshapy import TreeShape, INDICES
+
+
+KINDS = ["absolute", "relative", "relative_normalized", "standardized"]
+
+_pools = {}
+
+
+def get_pool(workers):
+    # pools stay alive between calls, so repeated batches do not pay the
+    # process start-up again
+    pool = _pools.get(workers)
+    if pool is None or pool._broken:
+        pool = ProcessPoolExecutor(workers)
+        _pools[workers] = pool
+    return pool
+
+
+def shutdown_pools():
+    for pool in _pools.values():
+        pool.shutdown()
+    _pools.clear()
+
+
+def payload(tree):
+    # what is sent to a worker: text is parsed there, ete3 trees are
+    # converted here since deep node objects do not pickle well
+    if isinstance(tree, (str, bytes, CompactTree)):
+        return tree
+    if hasattr(tree, "traverse"):
+        return CompactTree.from_ete3(tree)
+    return np.asarray(tree, dtype=np.int64)
+
+
+def tree_size(tree):
+    if isinstance(tree, CompactTree):
+        return tree.num_nodes
+    return len(tree)
+
+
+def index_list(indices):
+    index_names = INDICES if indices is None else list(indices)
+    for index_name in index_names:
+        if index_name not in INDICES:
+            raise ValueError(f"Unknown index: {index_name}")
+    return index_names
+
+
+def check_kind(kind):
+    if kind not in KINDS:
+        raise ValueError(f"Unknown kind of value: {kind}")
+
+
+def evaluate_row(tree, index_names, mode, kind="absolute", store=None, profile=None):
+    res = np.full(len(index_names), np.nan)
+    tb = TreeShape(tree, mode, store, profile)
+    tb.prepare(index_names)
+    value = getattr(tb, kind)
+    for j, index_name in enumerate(index_names):
+        try:
+            v = value(index_name)
+        except (ValueError, ArithmeticError):
+            continue
+        try:
+            res[j] = v
+        except OverflowError:
+            # exact ranks beyond the float range (TreeShape keeps the int)
+            # are written as their log2, the value of the *_log2 index
+            res[j] = math.log2(v)
+    return res
+
+
+def evaluate_chunk(trees, index_names, mode, kind="absolute", store=None, profile=None):
+    store = open_store(store)
+    res = np.full((len(trees), len(index_names)), np.nan)
+    for i, tree in enumerate(trees):
+        res[i] = evaluate_row(tree, index_names, mode, kind, store, profile)
+    if store is not None:
+        store.flush()
+    return res
+
+
+def profiled_chunk(trees, index_names, mode, kind="absolute", store=None):
+    # runs in a worker, the profile is sent back and merged by the caller
+    profile = profiling.Profile()
+    return evaluate_chunk(trees, index_names, mode, kind, store, profile), profile
+
+
+def evaluate_many(trees, indices=None, mode="ARBITRARY", workers=None, chunksize=None, kind="absolute", store=None, profile=None):
+    # one row per tree (in input order) and one column per index, indices
+    # that are not defined for a tree are nan. kind selects absolute,
+    # relative, relative_normalized or standardized values. Exact ranks
+    # that do not fit into a float (colijn_plazotta_rank of deep trees) are
+    # written as log2 of the rank, as colijn_plazotta_rank_log2. With a result
+    # store (see treeshapy.store), only values that are not stored yet are
+    # computed. Timings and cache statistics, also of the workers, are
+    # recorded into profile (or the active profile, see treeshapy.profiling).
+    index_names = index_list(indices)
+    check_kind(kind)
+    store = open_store(store)
+    profile = profiling.resolve(profile)
+    trees = [payload(tree) for tree in trees]
+    if workers is None:
+        workers = os.cpu_count()
+    if workers <= 1 or len(trees) <= 1:
+        return evaluate_chunk(trees, index_names, mode, kind, store, profile)
+
+    # largest trees first, so that the last chunks are the cheap ones
+    sizes = np.array([tree_size(tree) for tree in trees])
+    order = np.argsort(-sizes, kind="stable")
+    if chunksize is None:
+        chunksize = max(1, min(1000, len(trees) // (4 * workers)))
+    pool = get_pool(workers)
+    chunks = [order[i:i + chunksize] for i in range(0, len(trees), chunksize)]
+    if profile is None:
+        # False, workers may have inherited an active profile
+        futures = [pool.submit(evaluate_chunk, [trees[i] for i in chunk], index_names, mode, kind, store, False) for chunk in chunks]
+    else:
+        futures = [pool.submit(profiled_chunk, [trees[i] for i in chunk], index_names, mode, kind, store) for chunk in chunks]
+    res = np.empty((len(trees), len(index_names)))
+    for chunk, future in zip(chunks, futures):
+        if profile is None:
+            res[chunk] = future.result()
+        else:
+            res[chunk], worker_profile = future.result()
+            profile.merge(worker_profile)
+    return res
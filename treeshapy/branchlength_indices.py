@@ -4,22 +4,14 @@ import treeshapy.util as util
 from treeshapy.tree_index import TreeIndex
 
 class Treeness(TreeIndex):
+    uses_branch_lengths = True
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.treeness
-        except AttributeError:
-            if tree.is_leaf():
-                tree.add_feature("treeness", 0)
-            else:
-                all_brlens = 0
-                internal_brlens = 0
-                for node in tree.traverse("postorder"):
-                    brlen = node.dist
-                    all_brlens += brlen
-                    if not node.is_leaf():
-                        internal_brlens += brlen
-                tree.add_feature("treeness", internal_brlens / all_brlens)
-            return tree.treeness
+        if tree.num_nodes == 1:
+            return 0
+        all_brlens = float(tree.dist.sum())
+        internal_brlens = float(tree.dist[tree.inner_nodes].sum())
+        return internal_brlens / all_brlens
 
     def maximum(self, n, m, mode):
         if n == 1:
@@ -34,27 +26,17 @@ class Treeness(TreeIndex):
 
 
 class Stemminess(TreeIndex):
+    requires = ("sum_below",)
+    uses_branch_lengths = True
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.stemminess
-        except AttributeError:
-            if tree.is_leaf():
-                tree.add_feature("stemminess", 0)
-            else:
-                values = []
-                for node in tree.iter_descendants("postorder"):
-                    d = node.dist
-                    if node.is_leaf():
-                        node.add_feature("sum_below", d)
-                    else:
-                        c = node.children
-                        s = d + sum([child.sum_below for child in c])
-                        node.add_feature("sum_below", s)
-                        if s == 0:
-                            continue
-                        values.append(d / s)
-                tree.add_feature("stemminess", sum(values) / len(values))
-            return tree.stemminess
+        if tree.num_nodes == 1:
+            return 0
+        inner = tree.inner_nodes[1:] # the root is excluded
+        s = util.sum_below(tree)[inner]
+        d = tree.dist[inner][s != 0]
+        values = d / s[s != 0]
+        return float(values.sum()) / len(values)
 
     def maximum(self, n, m, mode):
         if n == 1:
@@ -0,0 +1,111 @@
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+
+import numpy as np
+
+import treeshapy.profiling as profiling
+from treeshapy.batch import index_list, KINDS
+from treeshapy.reader import iter_indices, count_sampled
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".json": "jsonl", ".npy": "npy"}
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="treeshapy", description="Compute tree shape indices for all trees in Newick or NEXUS files (optionally gzip, bz2 or xz compressed).")
+    parser.add_argument("files", nargs="+", help="tree files")
+    parser.add_argument("-i", "--indices", action="append", help="comma separated index names (default: all); exact ranks beyond the float range are written as log2 of the rank, as by the *_log2 indices")
+    parser.add_argument("-m", "--mode", choices=["BINARY", "ARBITRARY"], default="ARBITRARY")
+    parser.add_argument("-k", "--kind", choices=KINDS, default="absolute", help="kind of values to compute")
+    parser.add_argument("-o", "--output", default="-", help="output file, - for stdout (default)")
+    parser.add_argument("-f", "--format", choices=["csv", "jsonl", "npy"], help="output format (default: from the output file name, csv for stdout)")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="number of worker processes, 0 for one per core")
+    parser.add_argument("--burnin", type=float, default=0.0, help="fraction of the trees to skip at the start of every file")
+    parser.add_argument("--thin", type=int, default=1, help="keep only every k-th tree")
+    parser.add_argument("--store", help="SQLite result store, values of trees already in it are not computed again (default: $TREESHAPY_STORE)")
+    parser.add_argument("--profile", help="write timings and cache statistics as a Chrome trace (JSON) to this file")
+    args = parser.parse_args(argv)
+    if args.indices is not None:
+        args.indices = [name for names in args.indices for name in names.split(",") if name]
+    try:
+        args.indices = index_list(args.indices)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.format is None:
+        args.format = FORMATS.get(os.path.splitext(args.output)[1].lower(), "csv")
+    if args.workers == 0:
+        args.workers = None
+    return args
+
+
+def iter_rows(args):
+    for path in args.files:
+        rows = iter_indices(path, args.indices, args.mode, args.burnin, args.thin, args.kind, args.workers, store=args.store, profile=args.profiler)
+        for i, row in enumerate(rows):
+            yield path, i, row
+
+
+def number(v):
+    # integral values as ints, as long as the float holds them exactly
+    if v.is_integer() and abs(v) < 2 ** 53:
+        return int(v)
+    return float(v)
+
+
+def write_csv(args, out):
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(["file", "tree"] + args.indices)
+    for path, i, row in iter_rows(args):
+        writer.writerow([path, i] + [number(v) for v in row])
+
+
+def write_jsonl(args, out):
+    for path, i, row in iter_rows(args):
+        record = {"file": path, "tree": i}
+        for index_name, v in zip(args.indices, row):
+            record[index_name] = number(v) if math.isfinite(v) else None
+        out.write(json.dumps(record) + "\n")
+
+
+def write_npy(args, out):
+    # the header needs the number of rows, so the trees are counted first;
+    # the rows are then streamed without holding the matrix in memory
+    num_trees = sum(count_sampled(path, args.burnin, args.thin) for path in args.files)
+    header = {"descr": np.lib.format.dtype_to_descr(np.dtype(np.float64)),
+              "fortran_order": False,
+              "shape": (num_trees, len(args.indices))}
+    np.lib.format.write_array_header_1_0(out, header)
+    for _, _, row in iter_rows(args):
+        out.write(row.astype(np.float64).tobytes())
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    args.profiler = profiling.Profile() if args.profile else None
+    binary = args.format == "npy"
+    if args.output == "-":
+        out = sys.stdout.buffer if binary else sys.stdout
+        close = False
+    else:
+        out = open(args.output, "wb") if binary else open(args.output, "w", newline="")
+        close = True
+    try:
+        if args.format == "csv":
+            write_csv(args, out)
+        elif args.format == "jsonl":
+            write_jsonl(args, out)
+        else:
+            write_npy(args, out)
+        out.flush()
+    finally:
+        if close:
+            out.close()
+    if args.profile:
+        args.profiler.write_chrome_trace(args.profile)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import copy
+
+import numpy as np
+
+import treeshapy.util as util
+from treeshapy.newick import parse_newick
+
+
+class CompactTree:
+    # Nodes are numbered in preorder: the root is node 0 and every node has a
+    # larger id than its parent. Children of v are
+    # children[child_ptr[v]:child_ptr[v + 1]], in their original order.
+    def __init__(self, parent, dist=None):
+        parent = np.asarray(parent, dtype=np.int64)
+        num_nodes = len(parent)
+        if num_nodes == 0:
+            raise ValueError("Tree must contain at least one node")
+        self.parent = parent
+        if dist is None: # same default as ete3
+            dist = np.ones(num_nodes)
+            dist[0] = 0
+        self.dist = np.asarray(dist, dtype=np.float64)
+        counts = np.bincount(parent[1:], minlength=num_nodes)
+        self.child_ptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.child_ptr[1:])
+        self.children = np.argsort(parent[1:], kind="stable").astype(np.int64) + 1
+        self.outdegree = counts
+        self.is_leaf = counts == 0
+        self.leaves = np.flatnonzero(self.is_leaf)
+        self.inner_nodes = np.flatnonzero(~self.is_leaf)
+        self.preorder = np.arange(num_nodes, dtype=np.int64)
+        self.postorder = self._compute_postorder()
+        self.features = {}
+
+    def __len__(self):
+        return len(self.leaves)
+
+    @property
+    def num_nodes(self):
+        return len(self.parent)
+
+    def copy(self):
+        # shares the arrays, which are never modified, but starts with an
+        # empty feature cache
+        tree = copy.copy(self)
+        tree.features = {}
+        return tree
+
+    def child_list(self, v):
+        return self.children[self.child_ptr[v]:self.child_ptr[v + 1]]
+
+    def _compute_postorder(self):
+        # reversed preorder of the mirrored tree
+        child_ptr = self.child_ptr.tolist()
+        children = self.children.tolist()
+        order = []
+        stack = [0]
+        while stack:
+            v = stack.pop()
+            order.append(v)
+            stack.extend(children[child_ptr[v]:child_ptr[v + 1]])
+        order.reverse()
+        return np.array(order, dtype=np.int64)
+
+    @classmethod
+    def from_parents(cls, parent, dist=None):
+        parent = np.asarray(parent, dtype=np.int64)
+        roots = np.flatnonzero(parent < 0)
+        if len(roots) != 1:
+            raise ValueError("Parent vector must contain exactly one root")
+        num_nodes = len(parent)
+        child_parents = np.where(parent < 0, num_nodes, parent)
+        order = np.argsort(child_parents, kind="stable")
+        counts = np.bincount(child_parents, minlength=num_nodes + 1)
+        ptr = np.zeros(num_nodes + 2, dtype=np.int64)
+        np.cumsum(counts, out=ptr[1:])
+        ptr = ptr.tolist()
+        order = order.tolist()
+        preorder = []
+        stack = [int(roots[0])]
+        while stack:
+            v = stack.pop()
+            preorder.append(v)
+            stack.extend(reversed(order[ptr[v]:ptr[v + 1]]))
+        if len(preorder) != num_nodes:
+            raise ValueError("Parent vector does not describe a tree")
+        preorder = np.array(preorder, dtype=np.int64)
+        new_id = np.empty(num_nodes, dtype=np.int64)
+        new_id[preorder] = np.arange(num_nodes)
+        new_parent = parent[preorder]
+        new_parent[1:] = new_id[new_parent[1:]]
+        new_parent[0] = -1
+        if dist is not None:
+            dist = np.asarray(dist, dtype=np.float64)[preorder]
+        return cls(new_parent, dist)
+
+    @classmethod
+    def from_ete3(cls, tree):
+        index = {}
+        parent = []
+        dist = []
+        for i, node in enumerate(tree.traverse("preorder")):
+            index[id(node)] = i
+            parent.append(-1 if i == 0 else index[id(node.up)])
+            dist.append(node.dist)
+        return cls(parent, dist)
+
+    @classmethod
+    def from_furnas_rank(cls, n, rank):
+        return cls.from_parents(util.furnas_unrank(n, rank))
+
+    @classmethod
+    def from_newick(cls, newick):
+        parent, dist = parse_newick(newick)
+        return cls(parent, dist)
+
+
+def as_compact_tree(tree):
+    if isinstance(tree, CompactTree):
+        return tree
+    if isinstance(tree, (str, bytes)):
+        return CompactTree.from_newick(tree)
+    if hasattr(tree, "traverse"):
+        return CompactTree.from_ete3(tree)
+    return CompactTree.from_parents(tree)
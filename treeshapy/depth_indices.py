@@ -5,33 +5,29 @@ import treeshapy.util as util
 from treeshapy.tree_index import TreeIndex
 
 class AverageLeafDepth(TreeIndex):
+    requires = ("depth",)
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.average_leaf_depth
-        except AttributeError:
-            depths = util.leaf_depths(tree)
-            tree.add_feature("average_leaf_depth", sum(depths) / len(depths))
-            return tree.average_leaf_depth
+        depths = util.leaf_depths(tree)
+        return int(depths.sum()) / len(depths)
 
     def maximum(self, n, m, mode):
         return m - (((m - 1) * m) / (2 * n))
 
     def minimum(self, n, m, mode):
         k = n - m + 1
-        x = math.floor(math.log2(n / k))
-        return  x + 3 - (k / n) * math.pow(2, x + 1)
+        x = util.floor_log2(n // k)
+        return  x + 3 - (k / n) * 2 ** (x + 1)
 
     def imbalance(self):
         return 1
 
 
 class VarianceOfLeavesDepths(TreeIndex):
+    requires = ("depth",)
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.variance_of_leaves_depths
-        except AttributeError:
-            tree.add_feature("variance_of_leaves_depths", float(np.var(util.leaf_depths(tree))))
-            return tree.variance_of_leaves_depths
+        return float(np.var(util.leaf_depths(tree)))
 
     def maximum(self, n, m, mode):
         return ((n - 1) * (n - 2) * (n*n + 3*n -6)) / (12 * n * n)
@@ -47,35 +43,38 @@ class VarianceOfLeavesDepths(TreeIndex):
 
 
 class SackinIndex(TreeIndex):
-    def evaluate_only(self, tree, mode):
-        return sum(util.leaf_depths(tree))
+    requires = ("depth",)
+    split_coefficients = (0, 1, 0)
+
+    @staticmethod
+    def split_term(n_l, n_r):
+        return n_l + n_r
 
     def evaluate(self, tree, mode):
-        try:
-            return tree.sackin_index
-        except AttributeError:
-            tree.add_feature("sackin_index", sum(util.leaf_depths(tree)))
-            return tree.sackin_index
+        return int(util.leaf_depths(tree).sum())
 
     def maximum(self, n, m, mode):
         return (n * m) - (((m - 1) * m) / 2)
 
     def minimum(self, n, m, mode):
         k = n - m + 1
-        x = math.floor(math.log2(n / k))
-        return (x + 3) * n - k * math.pow(2, x + 1)
+        x = util.floor_log2(n // k)
+        return (x + 3) * n - k * 2 ** (x + 1)
 
     def imbalance(self):
         return 1
 
 
 class TotalPathLength(TreeIndex):
+    requires = ("depth",)
+    split_coefficients = (-2, 2, 0)
+
+    @staticmethod
+    def split_term(n_l, n_r):
+        return 2 * (n_l + n_r) - 2
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.total_path_length
-        except AttributeError:
-            tree.add_feature("total_path_length", sum([util.depth(tree, node) for node in tree.traverse("postorder")]))
-            return tree.total_path_length
+        return int(util.depths(tree).sum())
 
     def maximum(self, n, m, mode):
         return (n * n) - n
@@ -84,8 +83,8 @@ class TotalPathLength(TreeIndex):
         if n == 1:
             return 0
         if mode == "BINARY":
-            log_val = math.floor(math.log2(n))
-            return 2 * log_val * n - math.pow(2, log_val + 2) + 2 * n + 2
+            log_val = util.floor_log2(n)
+            return 2 * log_val * n - (1 << (log_val + 2)) + 2 * n + 2
         if mode == "ARBITRARY":
             return n
 
@@ -94,24 +93,23 @@ class TotalPathLength(TreeIndex):
 
 
 class TotalInternalPathLength(TreeIndex):
+    requires = ("depth",)
+    split_coefficients = (-2, 1, 0)
+
+    @staticmethod
+    def split_term(n_l, n_r):
+        return n_l + n_r - 2
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.total_internal_path_length
-        except AttributeError:
-            s = 0
-            for node in tree.iter_descendants("postorder"):
-                if not node.is_leaf():
-                    s += util.depth(tree, node)
-            tree.add_feature("total_internal_path_length", s)
-            return tree.total_internal_path_length
+        return int(util.depths(tree)[tree.inner_nodes].sum())
 
     def maximum(self, n, m, mode):
         return ((n - 1) * (n - 2)) / 2
 
     def minimum(self, n, m, mode):
         if mode == "BINARY":
-            log_val = math.floor(math.log2(n))
-            return log_val * n - math.pow(2, log_val + 1) + 2
+            log_val = util.floor_log2(n)
+            return log_val * n - (1 << (log_val + 1)) + 2
         if mode == "ARBITRARY":
             return 0
 
@@ -120,13 +118,11 @@ class TotalInternalPathLength(TreeIndex):
 
 
 class AverageVertexDepth(TreeIndex):
+    requires = ("depth",)
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.average_vertex_depth
-        except AttributeError:
-            depths = [util.depth(tree, node) for node in tree.traverse("postorder")]
-            tree.add_feature("average_vertex_depth", sum(depths) / len(depths))
-            return tree.average_vertex_depth
+        depths = util.depths(tree)
+        return int(depths.sum()) / len(depths)
 
     def maximum(self, n, m, mode):
         return ((n * n) - n) / (2 * n - 1)
@@ -135,8 +131,8 @@ class AverageVertexDepth(TreeIndex):
         if n == 1:
             return 0
         if mode == "BINARY":
-            log_val = math.floor(math.log2(n))
-            return (2 * log_val * n - math.pow(2, log_val + 2) + 2 * n + 2) / (2 * n - 1)
+            log_val = util.floor_log2(n)
+            return (2 * log_val * n - (1 << (log_val + 2)) + 2 * n + 2) / (2 * n - 1)
         if mode == "ARBITRARY":
             return n / (n + 1)
 
@@ -145,15 +141,10 @@ class AverageVertexDepth(TreeIndex):
 
 
 class MaximumDepth(TreeIndex):
-    def evaluate_only(self, tree, mode):
-        return max(util.leaf_depths(tree))
+    requires = ("depth",)
 
     def evaluate(self, tree, mode):
-        try:
-            return tree.maximum_depth
-        except AttributeError:
-            tree.add_feature("maximum_depth", max(util.leaf_depths(tree)))
-            return tree.maximum_depth
+        return int(util.leaf_depths(tree).max())
 
     def maximum(self, n, m, mode):
         return n - 1
@@ -162,7 +153,7 @@ class MaximumDepth(TreeIndex):
         if n == 1:
             return 0
         if mode == "BINARY":
-            return math.ceil(math.log2(n))
+            return util.ceil_log2(n)
         if mode == "ARBITRARY":
             return 1
 
@@ -170,22 +161,11 @@ class MaximumDepth(TreeIndex):
         return 1
 
 class B1Index(TreeIndex):
-    def evaluate(self, tree, mode):
-        try:
-            return tree.B_1_index
-        except AttributeError:
-            s = 0
-            try: #check if heights already precomputed
-                tree.height
-            except AttributeError:
-                util.precompute_heights(tree)
-            for node in tree.iter_descendants("postorder"):
-                if node.is_leaf():
-                    continue
-                s += 1/ node.height
-            tree.add_feature("B_1_index", s)
-            return tree.B_1_index
+    requires = ("height",)
 
+    def evaluate(self, tree, mode):
+        heights = util.heights(tree)[tree.inner_nodes]
+        return float((1 / heights[1:]).sum()) # the root is excluded
 
     def maximum(self, n, m, mode):
         return float('nan')
@@ -198,25 +178,17 @@ class B1Index(TreeIndex):
 
 
 class B2Index(TreeIndex):
+    requires = ("prob",)
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.B_2_index
-        except AttributeError:
-            s = 0
-            try: #check if probs are already precomputed
-                tree.prob
-            except AttributeError:
-                util.precompute_probs(tree)
-            for leaf in tree.iter_leaves():
-                p_leaf = leaf.prob
-                s += p_leaf * math.log2(p_leaf)
-            tree.add_feature("B_2_index", - s)
-            return tree.B_2_index
+        p_leaves = util.probs(tree)[tree.leaves]
+        p_leaves = p_leaves[p_leaves > 0] # deep leaves underflow, their terms vanish
+        return - float((p_leaves * np.log2(p_leaves)).sum())
 
     def maximum(self, n, m, mode):
         if mode == "BINARY":
-            x  = math.floor(math.log2(n))
-            pow_x = math.pow(2, x)
+            x  = util.floor_log2(n)
+            pow_x = 1 << x
             return x + ((n - pow_x) / pow_x)
         if mode == "ARBITRARY":
             return math.log2(n)
@@ -1,4 +1,3 @@
-import numpy as np
 import math
 
 import treeshapy.util as util
@@ -6,41 +5,24 @@ from treeshapy.tree_index import TreeIndex
 from treeshapy.depth_indices import SackinIndex
 
 class TotalCopheneticIndex(TreeIndex):
-    def evaluate_only(self, tree, mode):
-        s = 0
-        for node in tree.iter_descendants("postorder"):
-            if not node.is_leaf():
-                s += math.comb(util.clade_size(tree, node), 2)
-        return s
+    requires = ("clade_size",)
+
+    @staticmethod
+    def split_term(n_l, n_r):
+        return (n_l * (n_l - 1) + n_r * (n_r - 1)) // 2
 
     def evaluate(self, tree, mode):
-        try:
-            return tree.total_cophenetic_index
-        except AttributeError:
-            s = 0
-            for node in tree.iter_descendants("postorder"):
-                if not node.is_leaf():
-                    s += math.comb(util.clade_size(tree, node), 2)
-            tree.add_feature("total_cophenetic_index", s)
-            return tree.total_cophenetic_index
+        cs = util.clade_sizes(tree)[tree.inner_nodes[tree.inner_nodes > 0]]
+        return int((cs * (cs - 1) // 2).sum())
 
     def maximum(self, n, m, mode):
         return math.comb(n, 3)
 
     def minimum(self, n, m, mode):
         if mode == "BINARY":
-            factorial = 1
-            s = 0
-            for i in range(n):
-                a = 1
-                j = 0
-                if i != 0:
-                    factorial *= i
-                while (a * 2) <= factorial and factorial % (a * 2) == 0:
-                    a *= 2
-                    j += 1
-                s += j
-            return s
+            # sum of the 2-adic valuations of 0!, ..., (n - 1)!, where by
+            # Legendre's formula v_2(i!) = i - popcount(i)
+            return n * (n - 1) // 2 - util.popcount_sum(n)
         if mode == "ARBITRARY":
             return 0
 
@@ -48,15 +30,10 @@ class TotalCopheneticIndex(TreeIndex):
         return 1
 
 class Diameter(TreeIndex):
+    requires = ("height", "second_height")
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.diameter
-        except AttributeError:
-            if tree.is_leaf(): #single-node-tree
-                tree.add_feature("diameter", 0)
-            else:
-                tree.add_feature("diameter", util.diameter(tree))
-            return tree.diameter
+        return util.diameter(tree)
 
     def maximum(self, n, m, mode):
         return n
@@ -74,18 +51,15 @@ class Diameter(TreeIndex):
 
 
 class AreaPerPairIndex(TreeIndex):
+    requires = ("depth", "clade_size")
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.area_per_pair_index
-        except AttributeError:
-            n = util.clade_size(tree, tree)
-            if n == 1:
-                tree.add_feature("area_per_pair_index", 0)
-            else:
-                s = SackinIndex().evaluate_only(tree, mode)
-                c = TotalCopheneticIndex().evaluate_only(tree, mode)
-                tree.add_feature("area_per_pair_index", (2 / n) * s - (4 / (n * (n - 1))) * c)
-            return tree.area_per_pair_index
+        n = len(tree)
+        if n == 1:
+            return 0
+        s = SackinIndex().evaluate(tree, mode)
+        c = TotalCopheneticIndex().evaluate(tree, mode)
+        return (2 / n) * s - (4 / (n * (n - 1))) * c
 
     def maximum(self, n, m, mode):
         return float('nan')
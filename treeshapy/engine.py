@@ -0,0 +1,175 @@
+import numpy as np
+
+import treeshapy.kernels as kernels
+import treeshapy.profiling as profiling
+import treeshapy.util as util
+
+
+# per-node features computed by the engine and the features each of them is
+# derived from
+FEATURES = {"nodes_below": (),
+            "height": (),
+            "second_height": (),
+            "sum_below": (),
+            "ladder_length": (),
+            "clade_size": ("nodes_below",),
+            "depth": ("nodes_below",),
+            "farness": ("depth", "nodes_below"),
+            "prob": ("nodes_below",),
+            "bcent": ("nodes_below",),
+            "shape_id": ()}
+
+POSTORDER = {"nodes_below", "height", "second_height", "sum_below", "ladder_length"}
+
+
+def postorder_sweep(tree, features):
+    # nodes below and, as requested, the two largest child heights, branch
+    # length sums and (for bifurcating trees) ladder lengths in one bottom-up
+    # pass
+    num_nodes = tree.num_nodes
+    with_heights = "height" in features or "second_height" in features
+    with_sums = "sum_below" in features
+    with_ladders = "ladder_length" in features
+    if kernels.enabled(tree):
+        nb, h, h2, sb, ll = kernels.postorder(tree.parent, tree.child_ptr, tree.children, tree.dist, with_heights, with_sums, with_ladders)
+        return postorder_features(nb, h, h2, sb, ll, with_heights, with_sums, with_ladders)
+    parent = tree.parent.tolist()
+    child_ptr = tree.child_ptr.tolist()
+    children = tree.children.tolist()
+    nb = [1] * num_nodes
+    h = [0] * num_nodes
+    h2 = [0] * num_nodes
+    sb = tree.dist.tolist()
+    ll = [-1] * num_nodes
+    for v in range(num_nodes - 1, -1, -1):
+        if with_ladders and child_ptr[v] != child_ptr[v + 1]:
+            c0 = v + 1 # first child directly follows in preorder
+            c1 = children[child_ptr[v] + 1]
+            if ll[c0] == -1: # leaf
+                ll[v] = ll[c1] + 1
+            elif ll[c1] == -1:
+                ll[v] = ll[c0] + 1
+            else: #not part of a ladder
+                ll[v] = 0
+        if v:
+            p = parent[v]
+            nb[p] += nb[v]
+            if with_heights:
+                x = h[v] + 1
+                if x > h[p]:
+                    h2[p] = h[p]
+                    h[p] = x
+                elif x > h2[p]:
+                    h2[p] = x
+            if with_sums:
+                sb[p] += sb[v]
+    return postorder_features(nb, h, h2, sb, ll, with_heights, with_sums, with_ladders)
+
+
+def postorder_features(nb, h, h2, sb, ll, with_heights, with_sums, with_ladders):
+    res = {"nodes_below": np.asarray(nb, dtype=np.int64)}
+    if with_heights:
+        res["height"] = np.asarray(h, dtype=np.int64)
+        res["second_height"] = np.asarray(h2, dtype=np.int64)
+    if with_sums:
+        res["sum_below"] = np.asarray(sb, dtype=np.float64)
+    if with_ladders:
+        res["ladder_length"] = np.asarray(ll, dtype=np.int64)
+    return res
+
+
+def ancestor_sums(tree, nb, weights):
+    # sums of per-node weights over all proper ancestors of every node. With
+    # preorder ids the descendants of v are v + 1, ..., v + nb[v] - 1, so all
+    # ancestors are accumulated at once by a single prefix sum.
+    inner = tree.inner_nodes
+    diff = np.zeros((tree.num_nodes + 1,) + weights.shape[1:], dtype=weights.dtype)
+    diff[inner + 1] = weights
+    np.subtract.at(diff, inner + nb[inner], weights)
+    return np.cumsum(diff[:-1], axis=0)
+
+
+def preorder_sweep(tree, nb, features):
+    # depths, farness and leaf probabilities (as requested) in one top-down
+    # pass
+    res = {}
+    inner = tree.inner_nodes
+    if "depth" in features or "farness" in features:
+        num_nodes = tree.num_nodes
+        offsets = num_nodes - 2 * nb # farness(v) - farness(parent(v))
+        offsets[0] = 0
+        if "farness" in features:
+            weights = np.stack([np.ones(len(inner), dtype=np.int64), offsets[inner]], axis=1)
+            sums = ancestor_sums(tree, nb, weights)
+            depths = sums[:, 0]
+            res["farness"] = int(depths.sum()) + sums[:, 1] + offsets
+        else:
+            depths = ancestor_sums(tree, nb, np.ones(len(inner), dtype=np.int64))
+        res["depth"] = depths
+    if "prob" in features:
+        log_probs = ancestor_sums(tree, nb, np.log2(tree.outdegree[inner]))
+        res["prob"] = np.exp2(-log_probs)
+    return res
+
+
+def betweenness(tree, nb):
+    # sum over pairs of children c1 < c2 of nb[c1] * nb[c2]
+    num_nodes = tree.num_nodes
+    sq = np.zeros(num_nodes, dtype=np.int64)
+    np.add.at(sq, tree.parent[1:], nb[1:] * nb[1:])
+    s = nb - 1
+    b = (nb - 1) * (num_nodes - nb) + (s * s - sq) // 2
+    b[tree.is_leaf] = 0
+    return b
+
+
+def closure(features):
+    res = set()
+    stack = list(features)
+    while stack:
+        feature = stack.pop()
+        if feature not in res:
+            res.add(feature)
+            stack.extend(FEATURES[feature])
+    return res
+
+
+def precompute(tree, features=None, profile=None):
+    # computes the requested features (all if None) and everything they are
+    # derived from, skipping what the tree already has cached, with at most
+    # one loop over the nodes for all postorder quantities
+    binary = util.is_bifurcating(tree)
+    if features is None:
+        features = FEATURES
+    requested = closure(features)
+    if not binary:
+        requested.discard("ladder_length")
+    todo = requested - set(tree.features)
+    if profile is not None:
+        for feature in requested:
+            profile.count("feature", feature, feature not in todo)
+    if todo & POSTORDER or (todo - {"shape_id"} and "nodes_below" not in tree.features):
+        with profiling.span(profile, "precompute", "postorder_sweep"):
+            tree.features.update(postorder_sweep(tree, todo))
+    nb = tree.features.get("nodes_below")
+    if "clade_size" in todo:
+        with profiling.span(profile, "precompute", "clade_size"):
+            leaves_before = np.zeros(tree.num_nodes + 1, dtype=np.int64)
+            np.cumsum(tree.is_leaf, out=leaves_before[1:])
+            tree.features["clade_size"] = leaves_before[tree.preorder + nb] - leaves_before[tree.preorder]
+    if todo & {"depth", "farness", "prob"}:
+        with profiling.span(profile, "precompute", "preorder_sweep"):
+            tree.features.update(preorder_sweep(tree, nb, todo))
+    if "bcent" in todo:
+        with profiling.span(profile, "precompute", "bcent"):
+            tree.features["bcent"] = betweenness(tree, nb)
+    if "shape_id" in todo:
+        with profiling.span(profile, "precompute", "shape_id"):
+            tree.features["shape_id"] = util.compute_shape_ids(tree, {})
+
+
+def requirements(indices):
+    res = set()
+    for index in indices:
+        res.update(index.requires)
+    return res
@@ -0,0 +1,254 @@
+import treeshapy.util as util
+from treeshapy.compact_tree import CompactTree, as_compact_tree
+
+# indices kept up to date, all of them are sums of per-node contributions
+MAINTAINED = ["sackin_index",
+              "total_path_length",
+              "total_cophenetic_index",
+              "colless_index",
+              "quadratic_colless_index",
+              "cherry_index"]
+
+REMOVED = -2 # parent of nodes that are currently not part of the tree
+
+
+class IncrementalTree:
+    # A bifurcating tree that supports SPR, NNI and leaf prune/graft moves and
+    # keeps clade sizes and the MAINTAINED indices up to date. A move only
+    # revisits the nodes whose clade size or children change, i.e. the root
+    # paths at the pruning and regrafting points (a single node pair for NNI).
+    # Moves since the last commit() can be undone with rollback().
+    def __init__(self, tree):
+        source = tree
+        tree = as_compact_tree(tree)
+        if tree is source:
+            tree = tree.copy()
+        if not util.is_bifurcating(tree):
+            raise ValueError("Incremental updates are only possible for strictly bifurcating trees")
+        child_ptr = tree.child_ptr.tolist()
+        children = tree.children.tolist()
+        self.parent = tree.parent.tolist()
+        self.children = [children[child_ptr[v]:child_ptr[v + 1]] for v in range(tree.num_nodes)]
+        self.cs = util.clade_sizes(tree).tolist()
+        self.nb = util.nodes_below(tree).tolist()
+        self.root = 0
+        self.n = len(tree)
+        self.free = []
+        self.log = []
+        self.dirty = None
+        self.values = dict.fromkeys(MAINTAINED, 0)
+        for v in range(tree.num_nodes):
+            self.add(v, 1)
+
+    def contributions(self, v):
+        p = self.parent[v]
+        if p == REMOVED:
+            return 0, 0, 0, 0, 0, 0
+        cs = self.cs[v]
+        if p == -1:
+            sackin = tpl = cophenetic = 0
+        else:
+            sackin = cs
+            tpl = self.nb[v]
+            cophenetic = cs * (cs - 1) // 2
+        c = self.children[v]
+        if not c:
+            return sackin, tpl, cophenetic, 0, 0, 0
+        b = abs(self.cs[c[0]] - self.cs[c[1]])
+        cherry = int(not self.children[c[0]] and not self.children[c[1]])
+        return sackin, tpl, cophenetic, b, b * b, cherry
+
+    def add(self, v, sign):
+        for index_name, x in zip(MAINTAINED, self.contributions(v)):
+            self.values[index_name] += sign * x
+
+    def touch(self, v):
+        # takes the contribution of v out of the sums before v changes, it is
+        # added back with the final state of v when the move is complete
+        if v not in self.dirty:
+            self.add(v, -1)
+            self.dirty[v] = None
+
+    def touch_path(self, v):
+        while v != -1:
+            self.touch(v)
+            v = self.parent[v]
+
+    def apply(self, move, *args):
+        self.dirty = {}
+        inverse = move(*args)
+        for v in self.dirty:
+            self.add(v, 1)
+        self.dirty = None
+        return inverse
+
+    def sibling(self, v):
+        c = self.children[self.parent[v]]
+        return c[1] if c[0] == v else c[0]
+
+    def replace_child(self, p, old, new):
+        if p == -1:
+            self.root = new
+        else:
+            c = self.children[p]
+            c[c.index(old)] = new
+        self.parent[new] = p
+
+    def detach(self, s):
+        # removes s and its parent p, the sibling q of s takes the place of p
+        p = self.parent[s]
+        q = self.sibling(s)
+        self.touch_path(p)
+        self.touch(q)
+        g = self.parent[p]
+        self.replace_child(g, p, q)
+        v = g
+        while v != -1:
+            self.cs[v] -= self.cs[s]
+            self.nb[v] -= self.nb[s] + 1
+            v = self.parent[v]
+        self.children[p] = [s]
+        return p, q
+
+    def attach(self, s, p, t):
+        # inserts p with children t and s on the edge above t
+        a = self.parent[t]
+        self.touch(t)
+        self.touch(p)
+        self.touch_path(a)
+        self.replace_child(a, t, p)
+        self.children[p] = [t, s]
+        self.parent[t] = p
+        self.parent[s] = p
+        self.cs[p] = self.cs[t] + self.cs[s]
+        self.nb[p] = self.nb[t] + self.nb[s] + 1
+        v = a
+        while v != -1:
+            self.cs[v] += self.cs[s]
+            self.nb[v] += self.nb[s] + 1
+            v = self.parent[v]
+
+    def in_subtree(self, v, s):
+        while v != -1:
+            if v == s:
+                return True
+            v = self.parent[v]
+        return False
+
+    def check_node(self, v):
+        if not 0 <= v < len(self.parent) or self.parent[v] == REMOVED:
+            raise ValueError(f"Node {v} is not part of the tree")
+
+    def move_spr(self, s, t):
+        p, q = self.detach(s)
+        self.attach(s, p, t)
+        return ("spr", s, q)
+
+    def move_nni(self, v, c):
+        u = self.parent[v]
+        w = self.sibling(v)
+        self.touch(u)
+        self.touch(v)
+        cv = self.children[v]
+        cv[cv.index(c)] = w
+        cu = self.children[u]
+        cu[cu.index(w)] = c
+        self.parent[c] = u
+        self.parent[w] = v
+        self.cs[v] += self.cs[w] - self.cs[c]
+        self.nb[v] += self.nb[w] - self.nb[c]
+        return ("nni", v, w)
+
+    def move_prune(self, leaf):
+        p, q = self.detach(leaf)
+        self.touch(leaf)
+        self.parent[leaf] = REMOVED
+        self.parent[p] = REMOVED
+        self.children[p] = []
+        self.free += [leaf, p]
+        self.n -= 1
+        return ("graft", q)
+
+    def move_graft(self, t):
+        if self.free:
+            p = self.free.pop()
+            leaf = self.free.pop()
+        else:
+            leaf = len(self.parent)
+            p = leaf + 1
+            for v in [leaf, p]:
+                self.parent.append(REMOVED)
+                self.children.append([])
+                self.cs.append(0)
+                self.nb.append(0)
+        self.touch(leaf)
+        self.children[leaf] = []
+        self.cs[leaf] = 1
+        self.nb[leaf] = 1
+        self.attach(leaf, p, t)
+        self.n += 1
+        return ("prune", leaf)
+
+    def run(self, op):
+        name, *args = op
+        return self.apply(getattr(self, "move_" + name), *args)
+
+    def spr(self, s, t):
+        # prunes the subtree below s and regrafts it on the edge above t
+        self.check_node(s)
+        self.check_node(t)
+        if s == self.root:
+            raise ValueError("The root cannot be pruned")
+        if t == self.parent[s] or self.in_subtree(t, s):
+            raise ValueError("Cannot regraft onto the pruned subtree")
+        self.log.append(self.run(("spr", s, t)))
+
+    def nni(self, v, c):
+        # swaps the child c of v with the sibling of v
+        self.check_node(v)
+        if v == self.root or c not in self.children[v]:
+            raise ValueError("NNI needs an inner node v below the root and a child c of v")
+        self.log.append(self.run(("nni", v, c)))
+
+    def prune_leaf(self, leaf):
+        # removes a leaf together with its parent
+        self.check_node(leaf)
+        if self.children[leaf] or leaf == self.root:
+            raise ValueError(f"Node {leaf} is not a prunable leaf")
+        self.log.append(self.run(("prune", leaf)))
+
+    def graft_leaf(self, t):
+        # adds a new leaf on the edge above t and returns its id
+        self.check_node(t)
+        inverse = self.run(("graft", t))
+        self.log.append(inverse)
+        return inverse[1]
+
+    def commit(self):
+        self.log = []
+
+    def rollback(self):
+        # undoes all moves since the last commit
+        while self.log:
+            self.run(self.log.pop())
+
+    def depth(self, v):
+        d = 0
+        while self.parent[v] != -1:
+            v = self.parent[v]
+            d += 1
+        return d
+
+    def clade_size(self, v):
+        return self.cs[v]
+
+    def absolute(self, index_name):
+        if index_name not in self.values:
+            raise ValueError(f"{index_name} is not maintained incrementally")
+        return self.values[index_name]
+
+    def to_compact_tree(self):
+        nodes = [v for v in range(len(self.parent)) if self.parent[v] != REMOVED]
+        ids = {v: i for i, v in enumerate(nodes)}
+        ids[-1] = -1
+        return CompactTree.from_parents([ids[self.parent[v]] for v in nodes])
@@ -0,0 +1,177 @@
+import functools
+import importlib.util
+import math
+import os
+import warnings
+
+import numpy as np
+
+# Sequential per-node recurrences as loops over arrays, compiled with numba
+# (nopython, nogil, so that threads can evaluate different trees in
+# parallel). The "numpy" backend keeps the reference implementations in
+# engine, "numba" uses the kernels for every tree and "auto" (the
+# default, or TREESHAPY_BACKEND) only for large trees if numba is
+# installed. numba is imported when the first kernel runs, so processes
+# that only see small trees never pay for it.
+
+BACKENDS = ["auto", "numpy", "numba"]
+
+# smallest tree (in nodes) for which "auto" uses the kernels; below, the
+# import of numba and the loading of the compiled kernels (about 0.3 s)
+# costs more than it saves
+AUTO_MIN_NODES = 1 << 16
+
+backend = None
+_available = None
+
+
+def available():
+    # whether numba is installed, without importing it
+    global _available
+    if _available is None:
+        _available = importlib.util.find_spec("numba") is not None
+    return _available
+
+
+def set_backend(name):
+    global backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend: {name}")
+    if name == "numba" and not available():
+        raise ImportError("The numba backend requires numba")
+    backend = name
+
+
+def get_backend():
+    return backend
+
+
+def enabled(tree):
+    if backend == "numba":
+        return True
+    return backend == "auto" and tree.num_nodes >= AUTO_MIN_NODES and available()
+
+
+def kernel(function):
+    # compiled on the first call; the Python function stays available as
+    # py_func, as for numba's own dispatchers
+    compiled = None
+
+    @functools.wraps(function)
+    def wrapper(*args):
+        nonlocal compiled
+        if compiled is None:
+            import numba
+            compiled = numba.njit(nogil=True, cache=True)(function)
+        return compiled(*args)
+    wrapper.py_func = function
+    return wrapper
+
+
+@kernel
+def postorder(parent, child_ptr, children, dist, with_heights, with_sums, with_ladders):
+    # see engine.postorder_sweep, arrays that are not requested are empty
+    num_nodes = len(parent)
+    nb = np.ones(num_nodes, dtype=np.int64)
+    h = np.zeros(num_nodes if with_heights else 0, dtype=np.int64)
+    h2 = np.zeros(num_nodes if with_heights else 0, dtype=np.int64)
+    sb = dist.copy() if with_sums else np.zeros(0)
+    ll = np.full(num_nodes if with_ladders else 0, -1, dtype=np.int64)
+    for v in range(num_nodes - 1, -1, -1):
+        if with_ladders and child_ptr[v] != child_ptr[v + 1]:
+            c0 = v + 1
+            c1 = children[child_ptr[v] + 1]
+            if ll[c0] == -1:
+                ll[v] = ll[c1] + 1
+            elif ll[c1] == -1:
+                ll[v] = ll[c0] + 1
+            else:
+                ll[v] = 0
+        if v:
+            p = parent[v]
+            nb[p] += nb[v]
+            if with_heights:
+                x = h[v] + 1
+                if x > h[p]:
+                    h2[p] = h[p]
+                    h[p] = x
+                elif x > h2[p]:
+                    h2[p] = x
+            if with_sums:
+                sb[p] += sb[v]
+    return nb, h, h2, sb, ll
+
+
+@kernel
+def furnas_ranks(cs, child_ptr, children, prefix, w):
+    # see util.furnas_ranks, for trees whose ranks fit into int64;
+    # prefix[m, alpha] is util.furnas_prefix(m, alpha)
+    num_nodes = len(cs)
+    ranks = np.ones(num_nodes, dtype=np.int64)
+    for node in range(num_nodes - 1, -1, -1):
+        if child_ptr[node] == child_ptr[node + 1]:
+            continue
+        l = children[child_ptr[node]]
+        r = children[child_ptr[node] + 1]
+        if cs[l] > cs[r] or (cs[l] == cs[r] and ranks[l] > ranks[r]):
+            l, r = r, l
+        f_l = ranks[l]
+        f_r = ranks[r]
+        alpha = cs[l]
+        beta = cs[r]
+        s = prefix[cs[node], alpha] + (f_l - 1) * w[beta] + f_r
+        if alpha == beta:
+            s -= (f_l * f_l - f_l) // 2
+        ranks[node] = s
+    return ranks
+
+
+@kernel
+def colijn_plazotta_ranks(child_ptr, children):
+    # see util.colijn_plazotta_ranks, stops at the first rank that may not
+    # fit into int64 and returns False then
+    num_nodes = len(child_ptr) - 1
+    ranks = np.ones(num_nodes, dtype=np.int64)
+    for node in range(num_nodes - 1, -1, -1):
+        if child_ptr[node] == child_ptr[node + 1]:
+            continue
+        r0 = ranks[node + 1]
+        r1 = ranks[children[child_ptr[node] + 1]]
+        if r0 < r1:
+            r0, r1 = r1, r0
+        if r0 >= 1 << 31:
+            return ranks, False
+        ranks[node] = r0 * (r0 - 1) // 2 + r1 + 1
+    return ranks, True
+
+
+@kernel
+def colijn_plazotta_log2_ranks(child_ptr, children):
+    num_nodes = len(child_ptr) - 1
+    l = np.zeros(num_nodes)
+    for node in range(num_nodes - 1, -1, -1):
+        if child_ptr[node] == child_ptr[node + 1]:
+            continue
+        l0 = l[node + 1]
+        l1 = l[children[child_ptr[node] + 1]]
+        if l0 < l1:
+            l0, l1 = l1, l0
+        if l0 < 64:
+            r0 = 2.0 ** l0
+            l[node] = math.log2(0.5 * r0 * (r0 - 1) + 2.0 ** l1 + 1)
+        else:
+            l[node] = 2 * l0 - 1
+    return l
+
+
+def default_backend():
+    # TREESHAPY_BACKEND must not break the import of treeshapy, e.g. on a
+    # machine without numba
+    try:
+        set_backend(os.environ.get("TREESHAPY_BACKEND") or "auto")
+    except (ValueError, ImportError) as e:
+        warnings.warn(f"{e}, using the auto backend")
+        set_backend("auto")
+
+
+default_backend()
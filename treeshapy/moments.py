@@ -0,0 +1,225 @@
+import os
+
+import numpy as np
+
+from treeshapy.simulation import model_beta, log_g
+from treeshapy.treeshapy import TreeShape, INDICES
+
+# Mean and variance of the index values of random bifurcating trees under
+# the Yule or PDA model. They are exact and only available for the indices
+# with a split_term (see TreeIndex and exact_indices), simulating the other
+# indices for every n is too slow for a lookup. For split_coefficients
+# they take O(n log^2 n) time (seconds for 10^6 leaves), otherwise O(n^2).
+# One table per model and index with rows (mean, variance, 0) indexed by n;
+# rows that are not computed yet are nan, older versions stored the number
+# of simulated trees in the last column. Tables are kept in memory and, if
+# cache_dir is set (e.g. by TREESHAPY_CACHE_DIR), in .npy files shared by
+# all processes.
+
+cache_dir = os.environ.get("TREESHAPY_CACHE_DIR")
+tables = {}
+
+# leaves up to which the recurrence runs for indices without
+# split_coefficients, it takes O(n^2) time (about 1.5 s for 10^4 leaves)
+MAX_RECURRENCE_LEAVES = 10000
+
+# block size below which split_sums adds up the products directly
+SPLIT_BLOCK = 32
+
+
+def set_cache_dir(path):
+    global cache_dir
+    cache_dir = path
+
+
+def table_path(model, index_name):
+    return os.path.join(cache_dir, f"moments_{model}_{index_name}.npy")
+
+
+def merge(table, other):
+    # rows of other fill the rows of table that are not computed yet
+    if len(other) > len(table):
+        table, other = other.copy(), table
+    missing = np.isnan(table[:len(other), 2])
+    table[:len(other)][missing] = other[missing]
+    return table
+
+
+def load_table(model, index_name):
+    key = (model, index_name)
+    if key not in tables:
+        table = np.full((0, 3), np.nan)
+        if cache_dir is not None:
+            try:
+                table = np.load(table_path(model, index_name))
+            except FileNotFoundError:
+                pass
+        tables[key] = table
+    return tables[key]
+
+
+def store_table(model, index_name, table):
+    tables[(model, index_name)] = table
+    if cache_dir is None:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    path = table_path(model, index_name)
+    try:
+        table = merge(table.copy(), np.load(path))
+    except FileNotFoundError:
+        pass
+    # written to a temporary file first, readers never see a partial table
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, table)
+    os.replace(tmp, path)
+
+
+def grow(table, n):
+    if len(table) > n:
+        return table.copy()
+    return np.concatenate([table, np.full((n + 1 - len(table), 3), np.nan)])
+
+
+def recurrence(split_term, split_scale, beta, table, n):
+    # A tree with m leaves splits into independent random trees with i and
+    # m - i leaves with probability q_m(i) proportional to g(i) g(m - i), see
+    # simulation.split_sampler. For I = I_l + I_r + t(i, m - i) this gives
+    # E_m = sum_i q_m(i) (E_i + E_{m - i} + t(i, m - i)) and by the law of
+    # total variance
+    # V_m = sum_i q_m(i) (V_i + V_{m - i} + (E_i + E_{m - i} + t(i, m - i) - E_m)^2)
+    # With a split_scale c, the table holds the moments of c(m) I_m.
+    # Only rows from this recurrence (0 samples) count as computed, rows
+    # simulated by older versions are replaced.
+    computed = table[:, 2] == 0
+    start = max(len(table) if computed.all() else int(np.argmin(computed)), 2)
+    table = grow(table, n)
+    table[:2] = 0 # single leaf, row 0 is unused
+    c = np.ones(n + 1) if split_scale is None else split_scale(np.arange(n + 1))
+    mean_sum = table[:, 0] / c
+    var_sum = table[:, 1] / (c * c)
+    lg = log_g(beta, n)
+    for m in range(start, n + 1):
+        i = np.arange(1, m)
+        w = lg[i] + lg[m - i]
+        q = np.exp(w - w.max())
+        q /= q.sum()
+        e = mean_sum[i] + mean_sum[m - i] + split_term(i, m - i)
+        mean_sum[m] = q @ e
+        var_sum[m] = q @ (var_sum[i] + var_sum[m - i] + (e - mean_sum[m]) ** 2)
+        table[m] = c[m] * mean_sum[m], c[m] * c[m] * var_sum[m], 0
+    return table
+
+
+def split_sums(x, y, distance=False):
+    # s_m = sum_{i + j = m} x_i y_j (times |i - j| with distance) for
+    # m < len(x). Pairs within the same block of SPLIT_BLOCK are summed
+    # directly, every other pair in the smallest block [l, l + 2h) (h a
+    # power of two) with i and j in different halves, as a convolution of
+    # one half with the other, computed with FFTs for all blocks of one
+    # size at once. Rounding errors are then relative to the
+    # products in each sum and not to the largest products overall, the
+    # sequences span many orders of magnitude. O(n log^2 n).
+    n = len(x)
+    size = max(SPLIT_BLOCK, 1 << (n - 1).bit_length())
+    x = np.concatenate([x, np.zeros(size - n)])
+    y = np.concatenate([y, np.zeros(size - n)])
+    k = np.arange(size, dtype=float)
+    res = np.zeros(2 * size)
+    # blocks with 2 l >= n only add to sums that are not needed
+    rows = -(-n // (2 * SPLIT_BLOCK))
+    i = np.arange(SPLIT_BLOCK)
+    weight = np.abs(i[:, None] - i[None, :]) if distance else np.ones((SPLIT_BLOCK, SPLIT_BLOCK))
+    X = x.reshape(-1, SPLIT_BLOCK)[:rows]
+    Y = y.reshape(-1, SPLIT_BLOCK)[:rows]
+    pos = 2 * SPLIT_BLOCK * np.arange(rows)[:, None, None] + i[:, None] + i[None, :]
+    res[:2 * SPLIT_BLOCK * rows] = np.bincount(pos.ravel(), (X[:, :, None] * Y[:, None, :] * weight).ravel(), 2 * SPLIT_BLOCK * rows)
+    kx, ky = k * x, k * y
+    s = 2 * SPLIT_BLOCK
+    while s <= size:
+        h = s // 2
+        rows = -(-n // (2 * s))
+        spectrum = lambda v, start: np.fft.rfft(v.reshape(-1, s)[:rows, start:start + h], s)
+        if distance:
+            # |i - j| = j - i for i in the first half, i - j otherwise
+            block = (spectrum(x, 0) * spectrum(ky, h) - spectrum(kx, 0) * spectrum(y, h)
+                     + spectrum(kx, h) * spectrum(y, 0) - spectrum(x, h) * spectrum(ky, 0))
+        else:
+            block = spectrum(x, 0) * spectrum(y, h) + spectrum(x, h) * spectrum(y, 0)
+        # the sums of the block at l start at 2 l + h
+        level = np.zeros((rows, 2 * s))
+        level[:, h:h + s] = np.fft.irfft(block, s)
+        res[:2 * s * rows] += level.ravel()
+        s *= 2
+    return res[:n]
+
+
+def clade_sums(r, w, beta):
+    # X_n = sum_k N_{n,k} r_k for all n, with N_{n,k} the expected number of
+    # clades with k leaves in a tree with n leaves: 2 n / (k (k + 1)) for
+    # k < n under the Yule model and g(k) (n - k + 1) g(n - k + 1) / g(n)
+    # under the PDA model, with w = g as in log_g. X solves
+    # X_m = sum_i q_m(i) (X_i + X_{m - i}) + r_m, see recurrence.
+    k = np.arange(len(r), dtype=float)
+    if beta == 0:
+        s = np.cumsum(r / np.maximum(k * (k + 1), 1))
+        return r + 2 * k * np.concatenate([[0], s[:-1]])
+    return split_sums(r * w, np.append(w[1:] * k[1:], 0)) / np.where(k > 0, w, 1)
+
+
+def linear_moments(coefficients, beta, n):
+    # mean and variance for all m <= n for the split term
+    # t = c + a m + b |i - j| of a split of m leaves into i and j. With
+    # w = g, the splits of m have weights w_i w_j and all sums over them
+    # that the recurrence needs are split_sums. E is the clade sum of the
+    # mean of t and V the clade sum of the variance of E_i + E_j + t.
+    c, a, b = coefficients
+    m = np.arange(n + 1, dtype=float)
+    w = np.exp(log_g(beta, n))
+    alpha = c + a * m
+    Z = split_sums(w, w)
+    Z[:2] = 1 # no splits
+    A = split_sums(w, w, True) if b else 0
+    mean = (alpha * Z + b * A) / Z
+    mean[:2] = 0
+    E = clade_sums(mean, w, beta)
+    wE = w * E
+    # sums of w_i w_j (E_i + E_j + t)^2
+    square = 2 * split_sums(wE * E, w) + 2 * split_sums(wE, wE)
+    if a or c:
+        square += alpha * (4 * split_sums(wE, w) + alpha * Z)
+    if b:
+        Q = 2 * split_sums(w * m * m, w) - 2 * split_sums(w * m, w * m)
+        square += b * (4 * split_sums(wE, w, True) + 2 * alpha * A + b * Q)
+    var = square / Z - E * E
+    var[:2] = 0
+    return E, clade_sums(var, w, beta)
+
+
+def exact_indices():
+    return [index_name for index_name in INDICES if TreeShape.index_instance(index_name).split_term is not None]
+
+
+def moments(index_name, n, model="yule"):
+    # mean and variance of index_name for random trees with n leaves
+    beta = model_beta(model)
+    instance = TreeShape.index_instance(index_name)
+    if instance is None:
+        raise ValueError(f"Unknown index: {index_name}")
+    if instance.split_term is None:
+        raise ValueError(f"No exact moments for {index_name}, it is not a sum of split terms")
+    if n < 1:
+        raise ValueError("Trees must have at least one leaf")
+    table = load_table(model, index_name)
+    if n >= len(table) or table[n, 2] != 0:
+        if instance.split_coefficients is not None:
+            # at least doubled, so that growing tables cost O(n log^2 n)
+            size = max(n, 2 * (len(table) - 1))
+            E, V = linear_moments(instance.split_coefficients, beta, size)
+            table = np.stack([E, V, np.zeros(size + 1)], axis=1)
+        elif n > MAX_RECURRENCE_LEAVES:
+            raise ValueError(f"Exact moments of {index_name} are only available up to {MAX_RECURRENCE_LEAVES} leaves")
+        else:
+            table = recurrence(instance.split_term, instance.split_scale, beta, table, n)
+        store_table(model, index_name, table)
+    return float(table[n, 0]), float(table[n, 1])
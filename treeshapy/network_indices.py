@@ -6,18 +6,15 @@ from treeshapy.depth_indices import SackinIndex
 from treeshapy.distance_indices import TotalCopheneticIndex
 
 class WienerIndex(TreeIndex):
+    requires = ("depth", "clade_size")
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.wiener_index
-        except AttributeError:
-            n = util.clade_size(tree, tree)
-            if n == 1:
-                tree.add_feature("wiener_index", 0)
-            else:
-                s = SackinIndex().evaluate_only(tree, mode)
-                c = TotalCopheneticIndex().evaluate_only(tree, mode)
-                tree.add_feature("wiener_index", (n - 1) * s - 2 * c)
-            return tree.wiener_index
+        n = len(tree)
+        if n == 1:
+            return 0
+        s = SackinIndex().evaluate(tree, mode)
+        c = TotalCopheneticIndex().evaluate(tree, mode)
+        return (n - 1) * s - 2 * c
 
     def maximum(self, n, m, mode):
         return float("nan")
@@ -29,16 +26,10 @@ class WienerIndex(TreeIndex):
         return 0
 
 class MinimumFarness(TreeIndex):
+    requires = ("farness",)
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.minimum_farness
-        except AttributeError:
-            try:
-                tree.farness
-            except AttributeError:
-                util.precompute_farness(tree)
-            tree.add_feature("minimum_farness", min([node.farness for node in tree.traverse()]))
-            return tree.minimum_farness
+        return int(util.farness(tree).min())
 
     def maximum(self, n, m, mode):
         return float("nan")
@@ -50,16 +41,10 @@ class MinimumFarness(TreeIndex):
         return 0
 
 class MaximumFarness(TreeIndex):
+    requires = ("farness",)
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.maximum_farness
-        except AttributeError:
-            try:
-                tree.farness
-            except AttributeError:
-                util.precompute_farness(tree)
-            tree.add_feature("maximum_farness", max([node.farness for node in tree.traverse()]))
-            return tree.maximum_farness
+        return int(util.farness(tree).max())
 
     def maximum(self, n, m, mode):
         return float("nan")
@@ -71,16 +56,10 @@ class MaximumFarness(TreeIndex):
         return 0
 
 class TotalFarness(TreeIndex):
+    requires = ("farness",)
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.total_farness
-        except AttributeError:
-            try:
-                tree.farness
-            except AttributeError:
-                util.precompute_farness(tree)
-            tree.add_feature("total_farness", sum([node.farness for node in tree.traverse()]))
-            return tree.total_farness
+        return int(util.farness(tree).sum())
 
     def maximum(self, n, m, mode):
         return float("nan")
@@ -92,19 +71,12 @@ class TotalFarness(TreeIndex):
         return 0
 
 class MinimumBCent(TreeIndex):
+    requires = ("bcent",)
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.minimum_bcent
-        except AttributeError:
-            if tree.is_leaf():
-                tree.add_feature("minimum_bcent", 0)
-            else:
-                try:
-                    tree.bcent
-                except AttributeError:
-                    util.precompute_bcent(tree)
-                tree.add_feature("minimum_bcent", min([node.bcent for node in tree.traverse() if not node.is_leaf()]))
-            return tree.minimum_bcent
+        if tree.num_nodes == 1:
+            return 0
+        return int(util.bcent(tree)[tree.inner_nodes].min())
 
     def maximum(self, n, m, mode):
         return float("nan")
@@ -116,19 +88,12 @@ class MinimumBCent(TreeIndex):
         return 0
 
 class MaximumBCent(TreeIndex):
+    requires = ("bcent",)
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.maximum_bcent
-        except AttributeError:
-            if tree.is_leaf():
-                tree.add_feature("maximum_bcent", 0)
-            else:
-                try:  
-                    tree.bcent
-                except AttributeError:
-                    util.precompute_bcent(tree)
-                tree.add_feature("maximum_bcent", max([node.bcent for node in tree.traverse() if not node.is_leaf()]))
-            return tree.maximum_bcent
+        if tree.num_nodes == 1:
+            return 0
+        return int(util.bcent(tree)[tree.inner_nodes].max())
 
     def maximum(self, n, m, mode):
         return float("nan")
@@ -140,20 +105,13 @@ class MaximumBCent(TreeIndex):
         return 0
 
 class MeanBCent(TreeIndex):
+    requires = ("bcent",)
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.mean_bcent
-        except AttributeError:
-            if tree.is_leaf():
-                tree.add_feature("mean_bcent", 0)
-            else:
-                try:
-                    tree.bcent
-                except AttributeError:
-                    util.precompute_bcent(tree)
-                bcents = [node.bcent for node in tree.traverse() if not node.is_leaf()]
-                tree.add_feature("mean_bcent", sum(bcents) / len(bcents))
-            return tree.mean_bcent
+        if tree.num_nodes == 1:
+            return 0
+        bcents = util.bcent(tree)[tree.inner_nodes]
+        return int(bcents.sum()) / len(bcents)
 
     def maximum(self, n, m, mode):
         return float("nan")
@@ -165,20 +123,12 @@ class MeanBCent(TreeIndex):
         return 0
 
 class BCentVariance(TreeIndex):
+    requires = ("bcent",)
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.bcent_variance
-        except AttributeError:
-            if tree.is_leaf():
-                tree.add_feature("bcent_variance", 0)
-            else:
-                try:
-                    tree.bcent
-                except AttributeError:
-                    util.precompute_bcent(tree)
-                bcents = [node.bcent for node in tree.traverse() if not node.is_leaf()]
-                tree.add_feature("bcent_variance", np.var(bcents))
-            return tree.bcent_variance
+        if tree.num_nodes == 1:
+            return 0
+        return float(np.var(util.bcent(tree)[tree.inner_nodes]))
 
     def maximum(self, n, m, mode):
         return float("nan")
@@ -190,15 +140,10 @@ class BCentVariance(TreeIndex):
         return 0
 
 class BCentRoot(TreeIndex):
+    requires = ("bcent",)
+
     def evaluate(self, tree, mode):
-        try:
-            tree.bcent
-        except AttributeError:
-            if tree.is_leaf():
-                tree.add_feature("bcent", 0)
-            else:
-                util.precompute_bcent(tree)
-        return tree.bcent
+        return int(util.bcent(tree)[0])
 
     def maximum(self, n, m, mode):
         return float("nan")
@@ -0,0 +1,115 @@
+import numpy as np
+
+OPEN, CLOSE, COMMA, COLON, SEMICOLON, QUOTE, COMMENT_OPEN, COMMENT_CLOSE = b"(),:;'[]"
+
+
+def as_bytes_array(data):
+    if isinstance(data, str):
+        data = data.encode()
+    return np.frombuffer(data, dtype=np.uint8)
+
+
+def structure(chars):
+    # masks of the characters outside of quoted labels and of [comments]
+    quote = chars == QUOTE
+    quoted = (np.cumsum(quote, dtype=np.int32) % 2 == 1) | quote
+    brackets = np.where(quoted, 0, (chars == COMMENT_OPEN).astype(np.int32) - (chars == COMMENT_CLOSE))
+    comment = (np.cumsum(brackets, dtype=np.int32) > 0) | ((chars == COMMENT_CLOSE) & ~quoted)
+    return ~quoted & ~comment, comment
+
+
+def parse_newick(data):
+    # returns parent and branch length arrays of the first tree in data, with
+    # nodes numbered in preorder
+    chars = as_bytes_array(data)
+    if np.any((chars == QUOTE) | (chars == COMMENT_OPEN)):
+        outside, comment = structure(chars)
+        end = np.flatnonzero(outside & (chars == SEMICOLON))
+    else: # plain Newick, every character is structural
+        outside = comment = None
+        end = np.flatnonzero(chars == SEMICOLON)
+    end = int(end[0]) if len(end) else len(chars)
+    chars = chars[:end]
+    if outside is not None:
+        outside = outside[:end]
+        comment = comment[:end]
+    is_token = (chars == OPEN) | (chars == CLOSE) | (chars == COMMA)
+    if outside is not None:
+        is_token &= outside
+    tokens = np.flatnonzero(is_token)
+    kinds = chars[tokens]
+    if len(tokens) == 0:
+        # single node tree
+        parent = np.array([-1], dtype=np.int64)
+        return parent, lengths(chars, outside, comment, tokens, np.array([0]), 1)
+
+    step = np.where(kinds == OPEN, 1, np.where(kinds == CLOSE, -1, 0))
+    depth_after = np.cumsum(step)
+    if depth_after[-1] != 0 or np.any(depth_after < 0) or kinds[0] != OPEN:
+        raise ValueError("Unbalanced parentheses in Newick string")
+    depth_before = depth_after - step
+    if np.any(depth_after[:-1] == 0):
+        raise ValueError("Newick string contains more than one root")
+
+    # nodes start at an opening parenthesis (inner nodes) or right after
+    # '(' or ',' if the next token is ',' or ')' (leaves)
+    starts_leaf = (kinds[:-1] != CLOSE) & (kinds[1:] != OPEN)
+    opens = np.flatnonzero(kinds == OPEN)
+    leaf_tokens = np.flatnonzero(starts_leaf)
+    starts = np.concatenate([tokens[opens], tokens[leaf_tokens] + 1])
+    levels = np.concatenate([depth_before[opens], depth_after[leaf_tokens]])
+    order = np.argsort(starts, kind="stable")
+    starts = starts[order]
+    levels = levels[order]
+    is_inner = order < len(opens)
+    num_nodes = len(starts)
+
+    # the parent is the last '(' before the node which opened at level - 1
+    inner_ids = np.flatnonzero(is_inner)
+    key_base = len(chars) + 1
+    open_order = np.argsort(depth_before[opens], kind="stable")
+    open_keys = depth_before[opens][open_order] * key_base + tokens[opens][open_order]
+    queries = (levels[1:] - 1) * key_base + starts[1:]
+    parent = np.empty(num_nodes, dtype=np.int64)
+    parent[0] = -1
+    parent[1:] = inner_ids[open_order[np.searchsorted(open_keys, queries) - 1]]
+
+    # the label and length of a node follow the token right before it, for
+    # inner nodes this is the matching ')'
+    closes = np.flatnonzero(kinds == CLOSE)
+    close_order = np.argsort(depth_after[closes], kind="stable")
+    owners = np.full(len(tokens), -1, dtype=np.int64)
+    owners[closes[close_order]] = inner_ids[open_order]
+    owners[leaf_tokens] = np.flatnonzero(~is_inner)
+    return parent, lengths(chars, outside, comment, tokens, owners, num_nodes)
+
+
+def lengths(chars, outside, comment, tokens, owners, num_nodes):
+    dist = np.ones(num_nodes)
+    dist[0] = 0 # same default as ete3
+    is_colon = chars == COLON
+    if outside is not None:
+        is_colon &= outside
+    colons = np.flatnonzero(is_colon)
+    if len(colons) == 0:
+        return dist
+    # each length runs from its colon to the next token (or the end)
+    next_token = np.searchsorted(tokens, colons)
+    ends = np.concatenate([tokens, [len(chars)]])[next_token]
+    zones = np.zeros(len(chars) + 1, dtype=np.int8)
+    zones[colons + 1] = 1
+    np.subtract.at(zones, ends, 1)
+    keep = np.cumsum(zones[:-1], dtype=np.int8) > 0
+    if comment is not None:
+        keep &= ~comment
+    text = np.where(keep, chars, np.uint8(ord(" ")))
+    text[colons] = ord(",")
+    values = text.tobytes().decode().split(",")[1:]
+    owners = owners[next_token - 1]
+    if np.any(owners < 0):
+        raise ValueError("Branch length without a node in Newick string")
+    try:
+        dist[owners] = [float(v) for v in values]
+    except ValueError:
+        raise ValueError("Invalid branch length in Newick string") from None
+    return dist
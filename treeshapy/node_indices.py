@@ -1,28 +1,21 @@
 import math
+import numpy as np
 
 import treeshapy.util as util
 from treeshapy.tree_index import TreeIndex
 
 class CollessIndex(TreeIndex):
-    def evaluate_only(self, tree, mode):
-        s = 0
-        for node in tree.traverse("postorder"):
-            if not node.is_leaf():
-                s += util.balance_index(tree, node)
-        return s
+    requires = ("clade_size",)
+    split_coefficients = (0, 0, 1)
+
+    @staticmethod
+    def split_term(n_l, n_r):
+        return np.abs(n_l - n_r)
 
     def evaluate(self, tree, mode):
         if mode == "ARBITRARY":
             raise ValueError("colless_index is not defined for arbitrary trees")
-        try:
-            return tree.colless_index
-        except AttributeError:
-            s = 0
-            for node in tree.traverse("postorder"):
-                if not node.is_leaf():
-                    s += util.balance_index(tree, node)
-            tree.add_feature("colless_index", s)
-            return tree.colless_index
+        return int(util.balance_values(tree).sum())
 
     def maximum(self, n, m, mode):
         if mode == "BINARY":
@@ -32,13 +25,7 @@ class CollessIndex(TreeIndex):
 
     def minimum(self, n, m, mode):
         if mode == "BINARY":
-            sum_bound = math.ceil(math.log2(n))
-            s = 0
-            for j in range(1, sum_bound):
-                x = math.pow(2, -j) * n
-                triangle_wave = min(math.ceil(x) - x, x - math.floor(x))
-                s += math.pow(2, j) * triangle_wave
-            return s
+            return util.balanced_colless(n)
         if mode == "ARBITRARY":
             return float("nan")
 
@@ -47,18 +34,15 @@ class CollessIndex(TreeIndex):
 
 
 class CorrectedCollessIndex(TreeIndex):
+    requires = ("clade_size",)
+
     def evaluate(self, tree, mode):
         if mode == "ARBITRARY":
             raise ValueError("corrected_colless_index is not defined for arbitrary trees")
-        try:
-            return tree.corrected_colless_index
-        except AttributeError:
-            if tree.is_leaf():
-                tree.add_feature("corrected_colless_index", 0)
-            else:
-                n = util.clade_size(tree, tree)
-                tree.add_feature("corrected_colless_index", (2 * CollessIndex().evaluate_only(tree, mode)) / ((n-1) * (n-2)))
-            return tree.corrected_colless_index
+        if tree.num_nodes == 1:
+            return 0
+        n = len(tree)
+        return (2 * CollessIndex().evaluate(tree, mode)) / ((n-1) * (n-2))
 
     def maximum(self, n, m, mode):
         if mode == "BINARY":
@@ -81,19 +65,17 @@ class CorrectedCollessIndex(TreeIndex):
 
 
 class QuadraticCollessIndex(TreeIndex):
+    requires = ("clade_size",)
+
+    @staticmethod
+    def split_term(n_l, n_r):
+        return (n_l - n_r) ** 2
+
     def evaluate(self, tree, mode):
         if mode == "ARBITRARY":
             raise ValueError("quadratic_colless_index is not defined for arbitrary trees")
-        try:
-            return tree.quadratic_colless_index
-        except AttributeError:
-            s = 0
-            for node in tree.traverse("postorder"):
-                if not node.is_leaf():
-                    b = util.balance_index(tree, node)
-                    s += b * b
-            tree.add_feature("quadratic_colless_index", s)
-            return tree.quadratic_colless_index
+        b = util.balance_values(tree)
+        return int((b * b).sum())
 
     def maximum(self, n, m, mode):
         if mode == "BINARY":
@@ -103,13 +85,7 @@ class QuadraticCollessIndex(TreeIndex):
 
     def minimum(self, n, m, mode):
         if mode == "BINARY":
-            sum_bound = math.ceil(math.log2(n))
-            s = 0
-            for j in range(1, sum_bound):
-                x = math.pow(2, -j) * n
-                triangle_wave = min(math.ceil(x) - x, x - math.floor(x))
-                s += math.pow(2, j) * triangle_wave
-            return s
+            return util.balanced_colless(n)
         if mode == "ARBITRARY":
             return float("nan")
 
@@ -118,24 +94,18 @@ class QuadraticCollessIndex(TreeIndex):
 
 
 class I2Index(TreeIndex):
+    requires = ("clade_size",)
+
     def evaluate(self, tree, mode):
         if mode == "ARBITRARY":
             raise ValueError("I_2_index is not defined for arbitrary trees")
-        try:
-            return tree.I_2_index
-        except AttributeError:
-            n = util.clade_size(tree, tree)
-            if n <= 2:
-                tree.add_feature("I_2_index", 0)
-            else:
-                s = 0
-                for node in tree.traverse("postorder"):
-                    n_v = util.clade_size(tree, node)
-                    if n_v > 2:
-                        b = util.balance_index(tree, node)
-                        s += b / (n_v - 2)
-                tree.add_feature("I_2_index", s / (n - 2))
-            return tree.I_2_index
+        n = len(tree)
+        if n <= 2:
+            return 0
+        n_v = util.clade_sizes(tree)[tree.inner_nodes]
+        b = util.balance_values(tree)
+        mask = n_v > 2
+        return float((b[mask] / (n_v[mask] - 2)).sum()) / (n - 2)
 
     def maximum(self, n, m, mode):
         if mode == "BINARY":
@@ -153,17 +123,20 @@ class I2Index(TreeIndex):
 
 
 class Stairs1(TreeIndex):
+    requires = ("clade_size",)
+
+    split_scale = staticmethod(util.stairs_scale)
+
+    @staticmethod
+    def split_term(n_l, n_r):
+        return n_l != n_r
+
     def evaluate(self, tree, mode):
         if mode == "ARBITRARY":
             raise ValueError("stairs1 is not defined for arbitrary trees")
-        try:
-            return tree.stairs1
-        except AttributeError:
-            if tree.is_leaf():
-                return tree.add_feature("stairs1", 0)
-            else:
-                tree.add_feature("stairs1", RogersJIndex().evaluate_only(tree, mode) /  (util.clade_size(tree, tree)- 1))
-            return tree.stairs1
+        if tree.num_nodes == 1:
+            return 0
+        return RogersJIndex().evaluate(tree, mode) / (len(tree) - 1)
 
     def maximum(self, n, m, mode):
         if mode == "BINARY":
@@ -186,26 +159,25 @@ class Stairs1(TreeIndex):
 
 
 class Stairs2(TreeIndex):
+    requires = ("clade_size",)
+
+    split_scale = staticmethod(util.stairs_scale)
+
+    @staticmethod
+    def split_term(n_l, n_r):
+        return np.minimum(n_l, n_r) / np.maximum(n_l, n_r)
+
     def evaluate(self, tree, mode):
         if mode == "ARBITRARY":
             raise ValueError("stairs2 is not defined for arbitrary trees")
-        try:
-            return tree.stairs2
-        except AttributeError:
-            if tree.is_leaf():
-                tree.add_feature("stairs2", 0)
-            else:
-                s = 0
-                for node in tree.traverse("postorder"):
-                    if node.is_leaf():
-                        continue
-                    c = node.children
-                    assert (len(c) == 2)
-                    n0 = util.clade_size(tree, c[0])
-                    n1 = util.clade_size(tree, c[1])
-                    s += min(n0, n1) / max(n0, n1)
-                tree.add_feature("stairs2", s / (util.clade_size(tree, tree) - 1))
-            return tree.stairs2
+        if tree.num_nodes == 1:
+            return 0
+        cs = util.clade_sizes(tree)
+        c0, c1 = util.child_pairs(tree)
+        n0 = cs[c0]
+        n1 = cs[c1]
+        s = float((np.minimum(n0, n1) / np.maximum(n0, n1)).sum())
+        return s / (len(tree) - 1)
 
     def maximum(self, n, m, mode):
         return float('nan')
@@ -218,29 +190,16 @@ class Stairs2(TreeIndex):
 
 
 class RogersJIndex(TreeIndex):
-    def evaluate_only(self, tree, mode):
-        s = 0
-        for node in tree.traverse("postorder"):
-            if not node.is_leaf():
-                if util.balance_index(tree, node) != 0:
-                    s += 1
-        return s 
-
+    requires = ("clade_size",)
 
+    @staticmethod
+    def split_term(n_l, n_r):
+        return n_l != n_r
 
     def evaluate(self, tree, mode):
         if mode == "ARBITRARY":
             raise ValueError("rogers_j_index is not defined for arbitrary trees")
-        try:
-            return tree.rogers_j_index
-        except AttributeError:
-            s = 0
-            for node in tree.traverse("postorder"):
-                if not node.is_leaf():
-                    if util.balance_index(tree, node) != 0:
-                        s += 1
-            tree.add_feature("rogers_j_index", s)
-            return tree.rogers_j_index
+        return int((util.balance_values(tree) != 0).sum())
 
     def maximum(self, n, m, mode):
         if mode == "BINARY":
@@ -261,21 +220,14 @@ class RogersJIndex(TreeIndex):
 
 
 class SymmetryNodesIndex(TreeIndex):
+    requires = ("shape_id",)
+
     def evaluate(self, tree, mode):
         if mode == "ARBITRARY":
             raise ValueError("symmetry_nodes_index is not defined for arbitrary trees")
-        try:
-            return tree.symmetry_nodes_index
-        except AttributeError:
-            cnt = 0
-            for node in tree.traverse("postorder"):
-                if not node.is_leaf():
-                    c = node.children
-                    assert (len(c) == 2)
-                    if not util.isomorphic(c[0], c[1]):
-                        cnt += 1
-            tree.add_feature("symmetry_nodes_index", cnt)
-            return tree.symmetry_nodes_index
+        ids = util.shape_ids(tree)
+        c0, c1 = util.child_pairs(tree)
+        return int((ids[c0] != ids[c1]).sum())
 
     def maximum(self, n, m, mode):
         if mode == "BINARY":
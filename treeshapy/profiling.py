@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Opt-in instrumentation: wall time and number of calls of spans (index
+# evaluations, precompute phases, bounds) and hits and misses of the caches
+# (per-node features, bounds, result store), grouped by category and name.
+# A TreeShape records into the profile it is given, or into the active
+# profile installed by enable(), e.g.
+#   profile = profiling.enable()
+#   ... evaluate many trees ...
+#   profiling.disable()
+#   profile.to_dict() or profile.write_chrome_trace("trace.json")
+
+# spans kept for the Chrome trace, later ones only count towards the totals
+MAX_EVENTS = 1 << 20
+
+active = None
+
+
+class Profile:
+    def __init__(self, max_events=MAX_EVENTS):
+        self.spans = {} # (category, name) -> [calls, seconds]
+        self.counters = {} # (category, name) -> [hits, misses]
+        self.events = []
+        self.max_events = max_events
+        self.dropped = 0
+        # trace timestamps are wall clock times, so that the events of
+        # several processes line up
+        self.epoch = time.time() - time.perf_counter()
+
+    @contextmanager
+    def span(self, category, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(category, name, start, time.perf_counter() - start)
+
+    def add(self, category, name, start, seconds):
+        entry = self.spans.get((category, name))
+        if entry is None:
+            self.spans[(category, name)] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+        if len(self.events) < self.max_events:
+            self.events.append((category, name, self.epoch + start, seconds, os.getpid(), threading.get_ident()))
+        else:
+            self.dropped += 1
+
+    def count(self, category, name, hit):
+        entry = self.counters.get((category, name))
+        if entry is None:
+            entry = self.counters[(category, name)] = [0, 0]
+        entry[0 if hit else 1] += 1
+
+    def merge(self, other):
+        # adds the totals and events of another profile, e.g. of a worker
+        for key, (calls, seconds) in other.spans.items():
+            entry = self.spans.setdefault(key, [0, 0.0])
+            entry[0] += calls
+            entry[1] += seconds
+        for key, (hits, misses) in other.counters.items():
+            entry = self.counters.setdefault(key, [0, 0])
+            entry[0] += hits
+            entry[1] += misses
+        space = max(0, self.max_events - len(self.events))
+        self.events.extend(other.events[:space])
+        self.dropped += other.dropped + max(0, len(other.events) - space)
+
+    def to_dict(self):
+        # {"spans": {category: {name: {"calls", "seconds"}}},
+        #  "counters": {category: {name: {"hits", "misses"}}}}
+        spans = {}
+        for (category, name), (calls, seconds) in sorted(self.spans.items()):
+            spans.setdefault(category, {})[name] = {"calls": calls, "seconds": seconds}
+        counters = {}
+        for (category, name), (hits, misses) in sorted(self.counters.items()):
+            counters.setdefault(category, {})[name] = {"hits": hits, "misses": misses}
+        return {"spans": spans, "counters": counters}
+
+    def chrome_trace(self):
+        # trace event format as read by chrome://tracing and Perfetto, the
+        # totals are included as metadata
+        events = [{"name": name, "cat": category, "ph": "X",
+                   "ts": start * 1e6, "dur": seconds * 1e6, "pid": pid, "tid": tid}
+                  for category, name, start, seconds, pid, tid in self.events]
+        other = self.to_dict()
+        other["dropped_events"] = self.dropped
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": other}
+
+    def write_chrome_trace(self, path):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+
+def enable(profile=None):
+    # installs a profile (a new one for None) that is used by every
+    # TreeShape without a profile of its own, and returns it
+    global active
+    active = Profile() if profile is None else profile
+    return active
+
+
+def disable():
+    global active
+    profile, active = active, None
+    return profile
+
+
+def resolve(profile):
+    # the profile to record into: a new one for True, none for False and
+    # the active one for None
+    if profile is None:
+        return active
+    if profile is True:
+        return Profile()
+    if profile is False:
+        return None
+    return profile
+
+
+def span(profile, category, name):
+    return nullcontext() if profile is None else profile.span(category, name)
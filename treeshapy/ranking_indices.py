@@ -6,10 +6,27 @@ class ColijnPlazottaRank(TreeIndex):
         if mode == "ARBITRARY":
             raise ValueError("colijn_plazotta_rank is not defined for arbitrary trees")
         try:
-            return tree.colijn_plazotta_rank
-        except AttributeError:
-            util.colijn_plazotta_recursive(tree)
-            return tree.colijn_plazotta_rank
+            return util.colijn_plazotta_ranks(tree)[0]
+        except OverflowError:
+            raise ValueError(f"colijn_plazotta_rank is only computed for ranks of at most {util.CP_MAX_BITS} bits, see colijn_plazotta_rank_log2")
+
+    def maximum(self, n, m, mode):
+        return float('nan')
+
+    def minimum(self, n, m, mode):
+        return float('nan')
+
+    def imbalance(self):
+        return 1
+
+
+class ColijnPlazottaRankLog2(TreeIndex):
+    # log2 of colijn_plazotta_rank, also for trees whose exact rank is too
+    # large, inf once the log2 itself exceeds the float range
+    def evaluate(self, tree, mode):
+        if mode == "ARBITRARY":
+            raise ValueError("colijn_plazotta_rank_log2 is not defined for arbitrary trees")
+        return float(util.colijn_plazotta_log2_ranks(tree)[0])
 
     def maximum(self, n, m, mode):
         return float('nan')
@@ -22,19 +39,21 @@ class ColijnPlazottaRank(TreeIndex):
 
 
 class FurnasRank(TreeIndex):
+    requires = ("clade_size",)
+
     def evaluate(self, tree, mode):
         if mode == "ARBITRARY":
             raise ValueError("furnas_rank is not defined for arbitrary trees")
-        try:
-            return tree.furnas_rank #check if furnas ranks already precomputed
-        except AttributeError:
-            util.furnas_ranks(tree)
-            return tree.furnas_rank
+        if util.log2_we(len(tree)) > util.FURNAS_MAX_BITS:
+            raise ValueError(f"furnas_rank is only computed for trees with at most 2^{util.FURNAS_MAX_BITS} shapes (up to 792 leaves), see furnas_rank_log2")
+        return util.furnas_ranks(tree)[0]
 
     def maximum(self, n, m, mode):
         if mode == "BINARY":
+            if util.log2_we(n) > util.FURNAS_MAX_BITS:
+                return float("nan")
             return util.we(n)
-        if mode == "ABITRARY":
+        if mode == "ARBITRARY":
             return float("nan")
 
     def minimum(self, n, m, mode):
@@ -45,3 +64,28 @@ class FurnasRank(TreeIndex):
 
     def imbalance(self):
         return -1
+
+
+class FurnasRankLog2(TreeIndex):
+    # log2 of furnas_rank, also for trees whose exact rank is too large
+    requires = ("clade_size",)
+
+    def evaluate(self, tree, mode):
+        if mode == "ARBITRARY":
+            raise ValueError("furnas_rank_log2 is not defined for arbitrary trees")
+        return float(util.furnas_log2_ranks(tree)[0])
+
+    def maximum(self, n, m, mode):
+        if mode == "BINARY":
+            return float(util.log2_we(n))
+        if mode == "ARBITRARY":
+            return float("nan")
+
+    def minimum(self, n, m, mode):
+        if mode == "BINARY":
+            return 0.0
+        if mode == "ARBITRARY":
+            return float("nan")
+
+    def imbalance(self):
+        return -1
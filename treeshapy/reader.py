@@ -0,0 +1,137 @@
+import bz2
+import gzip
+import lzma
+import os
+import re
+from itertools import chain, islice
+
+import treeshapy.profiling as profiling
+from treeshapy.batch import index_list, check_kind, evaluate_row, evaluate_many
+from treeshapy.compact_tree import CompactTree
+from treeshapy.store import open_store
+
+BLOCK_SIZE = 1 << 20
+
+MAGIC = [(b"\x1f\x8b", gzip.open),
+         (b"BZh", bz2.open),
+         (b"\xfd7zXZ\x00", lzma.open)]
+
+# 'tree name [comments] =', the name may be quoted and the comments (e.g.
+# BEAST's [&lnP=...,posterior=...]) may contain '='
+NEXUS_TREE = re.compile(rb"\s*u?tree\s+(?:\*\s*)?(?:'[^']*(?:''[^']*)*'|[^\s=\[;]+)\s*(?:\[[^\]]*\]\s*)*=", re.IGNORECASE)
+
+# characters that end a statement or start a quoted label or a comment
+SPECIAL = re.compile(rb"[;'\[]")
+
+
+def open_tree_file(path):
+    # compression is detected from the first bytes, not the file name
+    with open(path, "rb") as f:
+        head = f.read(6)
+    for magic, opener in MAGIC:
+        if head.startswith(magic):
+            return opener(path, "rb")
+    return open(path, "rb")
+
+
+def iter_statements(path):
+    # the text between consecutive ';' outside of quoted labels and [...]
+    # comments, one statement at a time; only the current block of the
+    # decompressed stream is held in memory
+    with open_tree_file(path) as f:
+        text = b""
+        pos = 0 # text before pos is scanned
+        while True:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                break
+            text += block
+            start = 0
+            while True:
+                match = SPECIAL.search(text, pos)
+                if match is None:
+                    pos = len(text)
+                    break
+                if match.group() == b";":
+                    yield text[start:match.end()]
+                    start = pos = match.end()
+                    continue
+                end = text.find(b"'" if match.group() == b"'" else b"]", match.end())
+                if end == -1: # closed in a later block
+                    pos = match.start()
+                    break
+                pos = end + 1
+            text = text[start:]
+            pos -= start
+        if text.strip():
+            yield text
+
+
+def iter_newick(path):
+    # raw Newick strings of all trees in a Newick or NEXUS file. In NEXUS
+    # files these are the 'tree name = ...' statements, any translate table
+    # is irrelevant for the shape.
+    statements = iter_statements(path)
+    for first in statements:
+        if first.lstrip()[:6].upper() != b"#NEXUS":
+            yield first
+            yield from statements
+            return
+        for statement in chain([first], statements):
+            match = NEXUS_TREE.match(statement)
+            if match:
+                yield statement[match.end():]
+
+
+def count_trees(path):
+    return sum(1 for _ in iter_newick(path))
+
+
+def sample_range(num_trees, burnin, thin):
+    if not 0 <= burnin < 1:
+        raise ValueError("burnin must be a fraction in [0, 1)")
+    if thin < 1:
+        raise ValueError("thin must be a positive integer")
+    return range(int(burnin * num_trees), num_trees, thin)
+
+
+def count_sampled(path, burnin=0.0, thin=1):
+    return len(sample_range(count_trees(path), burnin, thin))
+
+
+def iter_sampled_newick(path, burnin=0.0, thin=1):
+    # drops the first burnin fraction of the trees and then keeps every
+    # thin-th tree, skipped trees are never parsed
+    skip = sample_range(count_trees(path) if burnin > 0 else 0, burnin, thin).start
+    for i, newick in enumerate(iter_newick(path)):
+        if i >= skip and (i - skip) % thin == 0:
+            yield newick
+
+
+def iter_trees(path, burnin=0.0, thin=1):
+    for newick in iter_sampled_newick(path, burnin, thin):
+        yield CompactTree.from_newick(newick)
+
+
+def iter_indices(path, indices=None, mode="ARBITRARY", burnin=0.0, thin=1, kind="absolute", workers=1, batch_size=None, store=None, profile=None):
+    # one row per tree, in the order of indices (all indices if None), nan
+    # where an index is undefined for a tree. With several workers, batches
+    # of batch_size trees are evaluated by evaluate_many.
+    index_names = index_list(indices)
+    check_kind(kind)
+    store = open_store(store)
+    profile = profiling.resolve(profile)
+    if workers == 1:
+        for tree in iter_trees(path, burnin, thin):
+            yield evaluate_row(tree, index_names, mode, kind, store, profile)
+        if store is not None:
+            store.flush()
+        return
+    if batch_size is None:
+        batch_size = 256 * (workers or os.cpu_count())
+    newicks = iter_sampled_newick(path, burnin, thin)
+    while True:
+        batch = list(islice(newicks, batch_size))
+        if not batch:
+            break
+        yield from evaluate_many(batch, index_names, mode, workers, kind=kind, store=store, profile=profile)
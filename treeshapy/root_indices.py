@@ -4,19 +4,17 @@ import treeshapy.util as util
 from treeshapy.tree_index import TreeIndex
 
 class RootImbalance(TreeIndex):
+    requires = ("clade_size",)
+
     def evaluate(self, tree, mode):
         if mode == "ARBITRARY":
             raise ValueError("root_imbalance is not defined for arbitrary trees")
-        try:
-            return tree.root_imbalance
-        except AttributeError:
-            if tree.is_leaf(): #single-node-tree
-                tree.add_feature("root_imbalance", 0)
-            else:
-                c = tree.children
-                assert (len(c) == 2)
-                tree.add_feature("root_imbalance", max(util.clade_size(tree, c[0]), util.clade_size(tree, c[1])) / util.clade_size(tree, tree))
-            return tree.root_imbalance
+        if tree.num_nodes == 1: #single-node-tree
+            return 0
+        cs = util.clade_sizes(tree)
+        c = tree.child_list(0)
+        assert (len(c) == 2)
+        return int(max(cs[c[0]], cs[c[1]])) / len(tree)
 
     def maximum(self, n, m, mode):
         if mode == "BINARY":
@@ -37,17 +35,14 @@ class RootImbalance(TreeIndex):
 
 
 class IRoot(TreeIndex):
+    requires = ("clade_size",)
+
     def evaluate(self, tree, mode):
         if mode == "ARBITRARY":
             raise ValueError("I_root is not defined for arbitrary trees")
-        try:
-            return tree.I_root
-        except AttributeError:
-            if tree.is_leaf(): #single-node-tree
-                tree.add_feature("I_root", 0)
-            else:
-                tree.add_feature("I_root", util.I_value(tree, tree))
-            return tree.I_root
+        if tree.num_nodes == 1: #single-node-tree
+            return 0
+        return float(util.I_value(tree, 0))
 
     def maximum(self, n, m, mode):
         if mode == "BINARY":
@@ -0,0 +1,178 @@
+import argparse
+import json
+import math
+import os
+
+import numpy as np
+
+import treeshapy.util as util
+from treeshapy.batch import evaluate_many
+from treeshapy.compact_tree import CompactTree, as_compact_tree
+from treeshapy.simulation import model_beta, log_g
+from treeshapy.treeshapy import INDICES
+
+# Tables of all bifurcating shapes with n leaves for n = 1..max_n, one set
+# of .npy files per n in a directory:
+#   values_{n}.npy  index values, row r - 1 is the shape with Furnas rank r
+#   probs_{n}.npy   probability of every shape under each model in MODELS
+#   sorted_{n}.npy  values of every index sorted (nan last)
+#   cdf_{n}.npy     cumulative probabilities along sorted_{n} per model
+# The shapes have unit branch lengths, as the trees of the simulator.
+
+MODELS = ["yule", "pda"]
+
+CHUNK_SIZE = 4096 # shapes evaluated at once while building
+
+
+def split_log_probabilities(beta, n):
+    # log q_m(i), the probability that a tree with m leaves splits into
+    # subtrees with i and m - i leaves (in this order), for i < m <= n
+    lg = log_g(beta, n)
+    lq = np.full((n + 1, n + 1), -np.inf)
+    for m in range(2, n + 1):
+        i = np.arange(1, m)
+        w = lg[i] + lg[m - i]
+        lq[m, 1:m] = w - np.logaddexp.reduce(w)
+    return lq
+
+
+def shape_probabilities(trees, model, n):
+    # both orders of the children give the same shape unless the two
+    # subtrees are isomorphic
+    lq = split_log_probabilities(model_beta(model), n)
+    res = np.empty(len(trees))
+    for j, tree in enumerate(trees):
+        if tree.num_nodes == 1:
+            res[j] = 1
+            continue
+        cs = util.clade_sizes(tree)
+        ids = util.shape_ids(tree)
+        c0, c1 = util.child_pairs(tree)
+        log_p = lq[cs[tree.inner_nodes], cs[c0]].sum() + math.log(2) * int((ids[c0] != ids[c1]).sum())
+        res[j] = math.exp(log_p)
+    return res
+
+
+def build_table(directory, n, workers=None):
+    num_shapes = util.we(n)
+    values = np.lib.format.open_memmap(os.path.join(directory, f"values_{n}.npy"), mode="w+", shape=(num_shapes, len(INDICES)))
+    probs = np.lib.format.open_memmap(os.path.join(directory, f"probs_{n}.npy"), mode="w+", shape=(num_shapes, len(MODELS)))
+    for start in range(0, num_shapes, CHUNK_SIZE):
+        ranks = range(start + 1, min(start + CHUNK_SIZE, num_shapes) + 1)
+        trees = [CompactTree.from_furnas_rank(n, rank) for rank in ranks]
+        values[start:start + len(trees)] = evaluate_many(trees, INDICES, "BINARY", workers)
+        for k, model in enumerate(MODELS):
+            probs[start:start + len(trees), k] = shape_probabilities(trees, model, n)
+    order = np.argsort(values, axis=0, kind="stable").T
+    sorted_values = np.take_along_axis(np.asarray(values).T, order, axis=1)
+    cdf = np.cumsum(np.asarray(probs).T[:, order], axis=2)
+    np.save(os.path.join(directory, f"sorted_{n}.npy"), sorted_values)
+    np.save(os.path.join(directory, f"cdf_{n}.npy"), cdf)
+    values.flush()
+    probs.flush()
+
+
+def build_shape_tables(directory, max_n=20, workers=None):
+    # tables for all n up to max_n; sizes that are already complete (for the
+    # same list of indices) are kept, so an interrupted build can resume
+    os.makedirs(directory, exist_ok=True)
+    meta_path = os.path.join(directory, "tables.json")
+    meta = {"indices": INDICES, "models": MODELS, "max_n": 0}
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            old = json.load(f)
+        if old["indices"] == INDICES and old["models"] == MODELS:
+            meta = old
+    for n in range(meta["max_n"] + 1, max_n + 1):
+        build_table(directory, n, workers)
+        meta["max_n"] = n
+        with open(meta_path, "w") as f:
+            json.dump(meta, f)
+
+
+class ShapeTable:
+    # read access to tables written by build_shape_tables, the arrays are
+    # memory-mapped and only the pages that are used are read
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "tables.json")) as f:
+            meta = json.load(f)
+        self.max_n = meta["max_n"]
+        self.columns = {index_name: j for j, index_name in enumerate(meta["indices"])}
+        self.models = {model: k for k, model in enumerate(meta["models"])}
+        self.arrays = {}
+
+    def array(self, name, n):
+        if not 1 <= n <= self.max_n:
+            raise ValueError(f"No shape table for {n} leaves")
+        key = (name, n)
+        if key not in self.arrays:
+            self.arrays[key] = np.load(os.path.join(self.directory, f"{name}_{n}.npy"), mmap_mode="r")
+        return self.arrays[key]
+
+    def column(self, index_name):
+        if index_name not in self.columns:
+            raise ValueError(f"Unknown index: {index_name}")
+        return self.columns[index_name]
+
+    def model(self, model):
+        if model not in self.models:
+            raise ValueError(f"Unknown model: {model}")
+        return self.models[model]
+
+    def values(self, index_name, n):
+        # value for every shape, in the order of the Furnas ranks
+        return self.array("values", n)[:, self.column(index_name)]
+
+    def probabilities(self, n, model="yule"):
+        return self.array("probs", n)[:, self.model(model)]
+
+    def row(self, tree):
+        # values of all indices for the shape of a bifurcating tree
+        tree = as_compact_tree(tree)
+        if not util.is_bifurcating(tree):
+            raise ValueError("shape tables only cover binary trees")
+        return self.array("values", len(tree))[util.furnas_ranks(tree)[0] - 1]
+
+    def num_defined(self, index_name, n):
+        # number of shapes with a (non-nan) value, these come first in sorted order
+        sorted_values = self.array("sorted", n)[self.column(index_name)]
+        return int(np.searchsorted(sorted_values, np.inf, side="right"))
+
+    def minimum(self, index_name, n):
+        return float(self.array("sorted", n)[self.column(index_name), 0])
+
+    def maximum(self, index_name, n):
+        k = self.num_defined(index_name, n)
+        return float(self.array("sorted", n)[self.column(index_name), k - 1])
+
+    def cdf(self, index_name, n, value, model="yule"):
+        # probability of a value <= value
+        j = self.column(index_name)
+        i = np.searchsorted(self.array("sorted", n)[j], value, side="right")
+        return float(self.array("cdf", n)[self.model(model), j, i - 1]) if i else 0.0
+
+    def sf(self, index_name, n, value, model="yule"):
+        # probability of a value >= value
+        j = self.column(index_name)
+        k = self.model(model)
+        cdf = self.array("cdf", n)[k, j]
+        num_defined = self.num_defined(index_name, n)
+        if not num_defined:
+            return 0.0
+        i = np.searchsorted(self.array("sorted", n)[j], value, side="left")
+        below = float(cdf[i - 1]) if i else 0.0
+        return float(cdf[num_defined - 1]) - below
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="treeshapy-tables", description="Enumerate all bifurcating tree shapes up to a number of leaves and store their index values and Yule/PDA probabilities.")
+    parser.add_argument("directory", help="output directory")
+    parser.add_argument("--max-n", type=int, default=20, help="largest number of leaves (default: 20)")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="number of worker processes, 0 for one per core")
+    args = parser.parse_args(argv)
+    build_shape_tables(args.directory, args.max_n, args.workers or None)
+
+
+if __name__ == "__main__":
+    main()
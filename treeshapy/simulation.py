@@ -0,0 +1,132 @@
+import os
+from itertools import islice
+
+import numpy as np
+
+from treeshapy.batch import index_list, check_kind, evaluate_many
+from treeshapy.compact_tree import CompactTree
+
+# Aldous' beta-splitting model contains the Yule (beta = 0) and the PDA
+# (beta = -3/2) model, the beta of "beta" is passed to simulate
+MODELS = {"yule": 0.0, "pda": -1.5, "beta": None}
+
+# nodes generated at once, bounds the memory of one batch of parent vectors
+BATCH_NODES = 1 << 22
+
+
+def model_beta(model, beta=None):
+    if model not in MODELS:
+        raise ValueError(f"Unknown model: {model}")
+    if MODELS[model] is not None:
+        return MODELS[model]
+    if beta is None or not beta > -2:
+        raise ValueError("The beta-splitting model needs a parameter beta > -2")
+    return float(beta)
+
+
+def log_g(beta, n):
+    # log g(k) - log g(1) for k = 0..n, with g(k) = Gamma(beta + k + 1) / Gamma(k + 1)
+    k = np.arange(2, n + 1)
+    return np.concatenate([[-np.inf, 0.0], np.cumsum(np.log((beta + k) / k))])
+
+
+def split_sampler(beta, n):
+    # returns a function drawing the number of leaves of the first subtree
+    # for subtrees with m (>= 2) leaves. The split of m leaves into i and
+    # m - i has probability proportional to g(i) g(m - i) with
+    # g(k) = Gamma(beta + k + 1) / Gamma(k + 1).
+    if beta == 0:
+        return lambda rng, m: rng.integers(1, m)
+    if beta > 0:
+        # binomial split of the leaves by a Beta(beta + 1, beta + 1)
+        # distributed fraction, conditioned on both sides being non-empty
+        def sample(rng, m):
+            res = np.empty_like(m)
+            todo = np.arange(len(m))
+            while len(todo):
+                x = rng.beta(beta + 1, beta + 1, len(todo))
+                i = rng.binomial(m[todo], x)
+                ok = (i > 0) & (i < m[todo])
+                res[todo[ok]] = i[ok]
+                todo = todo[~ok]
+            return res
+        return sample
+
+    # g is decreasing for beta < 0: the smaller side k is proposed from g(k)
+    # on 1..m // 2 and accepted with probability c(k) g(m - k) / (2 g(m - m // 2)),
+    # where c(k) = 2 counts both orders of an unequal split
+    lg = log_g(beta, n)
+    cdf = np.cumsum(np.exp(lg[1:]))
+    def sample(rng, m):
+        res = np.empty_like(m)
+        todo = np.arange(len(m))
+        while len(todo):
+            mt = m[todo]
+            h = mt // 2
+            k = np.searchsorted(cdf, rng.random(len(todo)) * cdf[h - 1], side="right") + 1
+            k = np.minimum(k, h)
+            log_w = lg[mt - k] - lg[mt - h] - np.log(2) * (2 * k == mt)
+            ok = np.log(rng.random(len(todo))) < log_w
+            res[todo[ok]] = k[ok]
+            todo = todo[~ok]
+        return res
+    return sample
+
+
+def simulate_parents(n, size, sample, rng):
+    # parent vectors (one row per tree) of bifurcating trees with n leaves,
+    # built top-down directly in preorder: a subtree with m leaves rooted at
+    # v spans v .. v + 2m - 2, so for a split into k and m - k leaves the
+    # children of v are v + 1 and v + 2k. The pending subtrees of all trees
+    # are split at once.
+    num_nodes = 2 * n - 1
+    parent = np.empty((size, num_nodes), dtype=np.int64)
+    parent[:, 0] = -1
+    flat = parent.reshape(-1)
+    base = np.arange(size, dtype=np.int64) * num_nodes
+    v = np.zeros(size, dtype=np.int64)
+    m = np.full(size, n, dtype=np.int64)
+    if n == 1:
+        return parent
+    while len(m):
+        k = sample(rng, m)
+        right = v + 2 * k
+        flat[base + v + 1] = v
+        flat[base + right] = v
+        split_left = k > 1
+        split_right = m - k > 1
+        base = np.concatenate([base[split_left], base[split_right]])
+        v = np.concatenate([v[split_left] + 1, right[split_right]])
+        m = np.concatenate([k[split_left], (m - k)[split_right]])
+    return parent
+
+
+def simulate(model, n, size=1, seed=None, beta=None):
+    # size random trees with n leaves under the Yule, PDA or beta-splitting
+    # model. The trees are generated in batches and yielded one at a time;
+    # all branch lengths are 1.
+    if n < 1:
+        raise ValueError("Trees must have at least one leaf")
+    sample = split_sampler(model_beta(model, beta), n)
+    rng = np.random.default_rng(seed)
+    batch_size = max(1, BATCH_NODES // (2 * n - 1))
+    for start in range(0, size, batch_size):
+        parent = simulate_parents(n, min(batch_size, size - start), sample, rng)
+        for row in parent:
+            yield CompactTree(row.copy())
+
+
+def simulate_indices(model, n, size, indices=None, mode="BINARY", kind="absolute", seed=None, beta=None, workers=None, batch_size=None):
+    # index values of size simulated trees, one row per tree as in
+    # evaluate_many, e.g. to compare an observed value with its null
+    # distribution
+    index_names = index_list(indices)
+    check_kind(kind)
+    if batch_size is None:
+        batch_size = 256 * (workers or os.cpu_count())
+    trees = simulate(model, n, size, seed, beta)
+    res = np.empty((size, len(index_names)))
+    for start in range(0, size, batch_size):
+        batch = list(islice(trees, batch_size))
+        res[start:start + len(batch)] = evaluate_many(batch, index_names, mode, workers, kind=kind)
+    return res
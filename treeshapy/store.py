@@ -0,0 +1,118 @@
+import atexit
+import math
+import os
+import sqlite3
+
+# Index values of already seen trees in an SQLite database, keyed by the
+# canonical shape digest, a branch length digest (empty for indices that
+# only depend on the shape), the mode and the index name. The database is
+# in WAL mode, so any number of processes can read while one writes; each
+# process opens its own connection.
+
+SCHEMA = """CREATE TABLE IF NOT EXISTS results (
+    shape BLOB NOT NULL,
+    lengths BLOB NOT NULL,
+    mode TEXT NOT NULL,
+    index_name TEXT NOT NULL,
+    value,
+    PRIMARY KEY (shape, lengths, mode, index_name)
+) WITHOUT ROWID"""
+
+# rows written at once, pending rows are also written by flush() and at exit
+FLUSH_SIZE = 4096
+
+INT64_MAX = (1 << 63) - 1
+
+_stores = {}
+
+
+def encode(value):
+    # ints beyond 64 bits (e.g. ranks) are stored as text, nan as NULL
+    if isinstance(value, int) or hasattr(value, "dtype") and value.dtype.kind in "iu":
+        value = int(value)
+        return value if -INT64_MAX <= value <= INT64_MAX else str(value)
+    value = float(value)
+    return None if value != value else value
+
+
+def decode(value):
+    if value is None:
+        return math.nan
+    if isinstance(value, str):
+        return int(value)
+    return value
+
+
+class ResultStore:
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        self.connection = None
+        self.pid = None
+        self.pending = {}
+        self.num_pending = 0
+        atexit.register(self.flush)
+
+    def __reduce__(self):
+        # sent to worker processes by path, every process connects itself
+        return open_store, (self.path,)
+
+    def connect(self):
+        if self.pid != os.getpid():
+            # a connection inherited through fork must not be used
+            self.connection = sqlite3.connect(self.path, timeout=60)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.execute(SCHEMA)
+            self.connection.commit()
+            self.pid = os.getpid()
+            self.pending = {}
+            self.num_pending = 0
+        return self.connection
+
+    def get(self, shape, lengths, mode):
+        # all stored values of a tree as {index_name: value}
+        res = {}
+        rows = self.connect().execute("SELECT index_name, value FROM results WHERE shape = ? AND lengths = ? AND mode = ?", (shape, lengths, mode))
+        for index_name, value in rows:
+            res[index_name] = decode(value)
+        for index_name, value in self.pending.get((shape, lengths, mode), {}).items():
+            res[index_name] = decode(value)
+        return res
+
+    def put(self, shape, lengths, mode, index_name, value):
+        self.connect()
+        self.pending.setdefault((shape, lengths, mode), {})[index_name] = encode(value)
+        self.num_pending += 1
+        if self.num_pending >= FLUSH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.pending or self.pid != os.getpid():
+            return
+        rows = [key + (index_name, value) for key, values in self.pending.items() for index_name, value in values.items()]
+        with self.connection:
+            self.connection.executemany("INSERT OR IGNORE INTO results VALUES (?, ?, ?, ?, ?)", rows)
+        self.pending = {}
+        self.num_pending = 0
+
+    def close(self):
+        self.flush()
+        if self.connection is not None and self.pid == os.getpid():
+            self.connection.close()
+        self.connection = None
+        self.pid = None
+
+
+def open_store(store=None):
+    # a ResultStore for a path (one per path and process), the store given
+    # by TREESHAPY_STORE for None, or no store if that is not set either
+    if store is None:
+        store = os.environ.get("TREESHAPY_STORE")
+        if not store:
+            return None
+    if isinstance(store, ResultStore):
+        return store
+    path = os.fspath(store)
+    if path not in _stores:
+        _stores[path] = ResultStore(path)
+    return _stores[path]
@@ -1,17 +1,15 @@
 import math
-from collections import Counter
+import numpy as np
 
 import treeshapy.util as util
 from treeshapy.tree_index import TreeIndex
 
 
 class RootedQuartetIndex(TreeIndex):
+    requires = ("clade_size", "nodes_below")
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.rooted_quartet_index #check if rqis already precomputed
-        except AttributeError:
-            util.precompute_rqi(tree)
-            return tree.rooted_quartet_index
+        return util.precompute_rqi(tree)
 
     def maximum(self, n, m, mode):
         if mode == "BINARY":
@@ -26,19 +24,20 @@ class RootedQuartetIndex(TreeIndex):
         return -1
 
 class SShape(TreeIndex):
+    requires = ("clade_size",)
+
+    @staticmethod
+    def split_term(n_l, n_r):
+        return np.log2(n_l + n_r - 1)
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.s_shape
-        except AttributeError:
-            s = 0
-            for node in tree.traverse("postorder"):
-                if not node.is_leaf():
-                    s += math.log2(util.clade_size(tree, node) - 1)
-            tree.add_feature("s_shape", s)
-            return tree.s_shape
+        cs = util.clade_sizes(tree)[tree.inner_nodes]
+        return float(np.log2(cs - 1).sum())
 
     def maximum(self, n, m, mode):
-        return math.log2(math.factorial(n - 1))
+        if n <= 1000: # exact, so that it matches the minimum for small n
+            return math.log2(math.factorial(n - 1))
+        return math.lgamma(n) / math.log(2)
 
     def minimum(self, n, m, mode):
         if mode == "BINARY":
@@ -52,23 +51,19 @@ class SShape(TreeIndex):
         return 1
 
 class DIndex(TreeIndex):
+    requires = ("clade_size",)
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.d_index
-        except AttributeError:
-            n = util.clade_size(tree, tree)
-            if n == 1:
-                tree.add_feature("d_index", 0)
-            else:
-                f_n = Counter([util.clade_size(tree, node) for node in tree.traverse()])
-                num_inner_nodes = len([_ for _ in tree.traverse()]) - n
-                s = 0
-                for z in range(2, n):
-                    p_n = (n / (n - 1)) * (2 / (z * (z + 1)))
-                    s += z * abs(f_n[z] / num_inner_nodes - p_n)
-                s += n * abs(f_n[n] / num_inner_nodes - (1 / (n - 1)))
-                tree.add_feature("d_index", s)
-            return tree.d_index
+        n = len(tree)
+        if n == 1:
+            return 0
+        f_n = np.bincount(util.clade_sizes(tree), minlength=n + 1)
+        num_inner_nodes = len(tree.inner_nodes)
+        z = np.arange(2, n)
+        p_n = (n / (n - 1)) * (2 / (z * (z + 1)))
+        s = float((z * np.abs(f_n[2:n] / num_inner_nodes - p_n)).sum())
+        s += n * abs(f_n[n] / num_inner_nodes - (1 / (n - 1)))
+        return s
 
     def maximum(self, n, m, mode):
         return float("nan")
@@ -80,28 +75,12 @@ class DIndex(TreeIndex):
         return 0
 
 class LadderLength(TreeIndex):
+    requires = ("ladder_length",)
+
     def evaluate(self, tree, mode):
         if mode == "ARBITRARY":
             raise ValueError("ladder_length is not defined for arbitrary trees")
-        try:
-            return tree.ladder_length
-        except AttributeError:
-            for node in tree.traverse("postorder"):
-                if node.is_leaf():
-                    node.add_feature("ladder_length", -1)
-                    continue
-                c = node.children
-                if c[0].is_leaf():
-                    node.add_feature("ladder_length", c[1].ladder_length + 1)
-                elif c[1].is_leaf():
-                    node.add_feature("ladder_length", c[0].ladder_length + 1)
-                else: #not part of a ladder
-                    node.add_feature("ladder_length", 0)
-            max_ladder = 0
-            for node in tree.traverse("postorder"):
-                max_ladder = max(max_ladder, node.ladder_length)
-            tree.add_feature("ladder_length", max_ladder)
-            return tree.ladder_length
+        return int(max(util.ladder_lengths(tree).max(), 0))
 
     def maximum(self, n, m, mode):
         return float("nan")
@@ -113,16 +92,12 @@ class LadderLength(TreeIndex):
         return 0
 
 class ILNumber(TreeIndex):
+    @staticmethod
+    def split_term(n_l, n_r):
+        return (n_l == 1) != (n_r == 1)
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.IL_number
-        except AttributeError:
-            cnt = 0
-            for node in tree.traverse("postorder"):
-                if len([c for c in node.children if c.is_leaf()]) == 1:
-                    cnt += 1
-            tree.add_feature("IL_number", cnt)
-            return tree.IL_number
+        return int((util.leaf_children(tree) == 1).sum())
 
     def maximum(self, n, m, mode):
         return float("nan")
@@ -4,29 +4,13 @@ import treeshapy.util as util
 from treeshapy.tree_index import TreeIndex
 
 class CherryIndex(TreeIndex):
-    def evaluate_only(self, tree, mode):
-        cnt = 0
-        for node in tree.traverse("postorder"):
-            if node.is_leaf():
-                continue
-            direct_leaves = len([child for child in node.children if child.is_leaf()])
-            if direct_leaves >= 2:
-                cnt += math.comb(direct_leaves, 2)
-        return  cnt
+    @staticmethod
+    def split_term(n_l, n_r):
+        return (n_l == 1) & (n_r == 1)
 
     def evaluate(self, tree, mode):
-        try:
-            return tree.cherry_index
-        except AttributeError:
-            cnt = 0
-            for node in tree.traverse("postorder"):
-                if node.is_leaf():
-                    continue
-                direct_leaves = len([child for child in node.children if child.is_leaf()])
-                if direct_leaves >= 2:
-                    cnt += math.comb(direct_leaves, 2)
-            tree.add_feature("cherry_index", cnt)
-            return tree.cherry_index
+        direct_leaves = util.leaf_children(tree)
+        return int((direct_leaves * (direct_leaves - 1) // 2).sum())
 
     def maximum(self, n, m, mode):
         if mode == "BINARY":
@@ -47,11 +31,7 @@ class ModifiedCherryIndex(TreeIndex):
     def evaluate(self, tree, mode):
         if mode == "ARBITRARY":
             raise ValueError("modified_cherry_index is not defined for arbitrary trees")
-        try:
-            return tree.modified_cherry_index
-        except AttributeError:
-            tree.add_feature("modified_cherry_index", util.clade_size(tree, tree) - 2 * CherryIndex().evaluate_only(tree, mode))
-            return tree.modified_cherry_index
+        return len(tree) - 2 * CherryIndex().evaluate(tree, mode)
 
     def maximum(self, n, m, mode):
         if mode == "BINARY":
@@ -71,16 +51,14 @@ class ModifiedCherryIndex(TreeIndex):
         return 0
 
 class Pitchforks(TreeIndex):
+    requires = ("clade_size",)
+
+    @staticmethod
+    def split_term(n_l, n_r):
+        return n_l + n_r == 3
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.pitchforks
-        except AttributeError:
-            cnt = 0
-            for node in tree.traverse():
-                if util.is_pitchfork(tree, node):
-                    cnt += 1
-            tree.add_feature("pitchforks", cnt)
-            return tree.pitchforks
+        return int(util.pitchfork_mask(tree).sum())
 
     def maximum(self, n, m, mode):
         return float("nan")
@@ -92,16 +70,14 @@ class Pitchforks(TreeIndex):
         return 0
 
 class FourCaterpillars(TreeIndex):
+    requires = ("clade_size",)
+
+    @staticmethod
+    def split_term(n_l, n_r):
+        return ((n_l == 1) & (n_r == 3)) | ((n_l == 3) & (n_r == 1))
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.four_caterpillars
-        except AttributeError:
-            cnt = 0
-            for node in tree.traverse():
-                if util.is_4caterpillar(tree, node):
-                    cnt += 1
-            tree.add_feature("four_caterpillars", cnt)
-            return tree.four_caterpillars
+        return int(util.fourcaterpillar_mask(tree).sum())
 
     def maximum(self, n, m, mode):
         return float("nan")
@@ -113,16 +89,14 @@ class FourCaterpillars(TreeIndex):
         return 0
 
 class DoubleCherries(TreeIndex):
+    requires = ("clade_size",)
+
+    @staticmethod
+    def split_term(n_l, n_r):
+        return (n_l == 2) & (n_r == 2)
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.double_cherries
-        except AttributeError:
-            cnt = 0
-            for node in tree.traverse():
-                if util.is_double_cherry(tree, node):
-                    cnt += 1
-            tree.add_feature("double_cherries", cnt)
-            return tree.double_cherries
+        return int(util.double_cherry_mask(tree).sum())
 
     def maximum(self, n, m, mode):
         return float("nan")
@@ -1,4 +1,26 @@
 class TreeIndex:
+    # per-node features (keys of tree.features) that evaluate reads, so
+    # that they can be computed together before evaluation
+    requires = ()
+
+    # for indices whose value on bifurcating trees is the sum over all inner
+    # nodes of a term that only depends on the clade sizes of the two
+    # children: the term for arrays of both sizes. Moments under the Yule and
+    # PDA models then follow from a recurrence over n.
+    split_term = None
+
+    # for such indices that are divided by a function of the number of
+    # leaves (e.g. n - 1): that factor for an array of n, the value is
+    # split_scale(n) times the sum of the split terms
+    split_scale = None
+
+    # for split terms c + a (n_l + n_r) + b |n_l - n_r|: (c, a, b), the
+    # moments then follow from convolutions for any n (see moments.py)
+    split_coefficients = None
+
+    # whether the value depends on branch lengths and not only on the shape
+    uses_branch_lengths = False
+
     def evaluate(self, tree, mode):
         raise NotImplementedError
 
@@ -1,94 +1,129 @@
+import importlib
 import math
+from functools import lru_cache
 
-import treeshapy.depth_indices as depth_indices
-import treeshapy.width_indices as width_indices
-import treeshapy.structure_indices as structure_indices
-import treeshapy.subgraph_indices as subgraph_indices
-import treeshapy.distance_indices as distance_indices
-import treeshapy.network_indices as network_indices
-import treeshapy.root_indices as root_indices
-import treeshapy.node_indices as node_indices
-import treeshapy.Ibased_indices as Ibased_indices
-import treeshapy.ranking_indices as ranking_indices
-import treeshapy.branchlength_indices as branchlength_indices
 import treeshapy.util as util
+import treeshapy.engine as engine
+import treeshapy.profiling as profiling
+from treeshapy.compact_tree import as_compact_tree
+from treeshapy.store import open_store
 
 
-INDICES =[
-          "average_leaf_depth",
-          "variance_of_leaves_depths",
-          "sackin_index",
-          "total_path_length",
-          "total_internal_path_length",
-          "average_vertex_depth",
-          "colless_index",
-          "corrected_colless_index",
-          "quadratic_colless_index",
-          "s_shape",
-          "d_index",
-          "total_cophenetic_index",
-          "B_1_index",
-          "B_2_index",
-          "maximum_depth",
-          "maximum_width",
-          "maxdiff_widths",
-          "modified_maxdiff_widths",
-          "max_width_over_max_depth",
-          "cherry_index",
-          "modified_cherry_index",
-          "IL_number",
-          "pitchforks",
-          "four_caterpillars",
-          "double_cherries",
-          "ladder_length",
-          "diameter",
-          "area_per_pair_index",
-          "wiener_index",
-          "minimum_farness",
-          "maximum_farness",
-          "total_farness",
-          "minimum_bcent",
-          "maximum_bcent",
-          "mean_bcent",
-          "bcent_variance",
-          "bcent_root",
-          "root_imbalance",
-          "I_root",
+# index name -> (module, class), modules are only imported when an index
+# of theirs is first used
+INDEX_CLASSES = {
+    "average_leaf_depth": ("depth_indices", "AverageLeafDepth"),
+    "variance_of_leaves_depths": ("depth_indices", "VarianceOfLeavesDepths"),
+    "sackin_index": ("depth_indices", "SackinIndex"),
+    "total_path_length": ("depth_indices", "TotalPathLength"),
+    "total_internal_path_length": ("depth_indices", "TotalInternalPathLength"),
+    "average_vertex_depth": ("depth_indices", "AverageVertexDepth"),
+    "colless_index": ("node_indices", "CollessIndex"),
+    "corrected_colless_index": ("node_indices", "CorrectedCollessIndex"),
+    "quadratic_colless_index": ("node_indices", "QuadraticCollessIndex"),
+    "s_shape": ("structure_indices", "SShape"),
+    "d_index": ("structure_indices", "DIndex"),
+    "total_cophenetic_index": ("distance_indices", "TotalCopheneticIndex"),
+    "B_1_index": ("depth_indices", "B1Index"),
+    "B_2_index": ("depth_indices", "B2Index"),
+    "maximum_depth": ("depth_indices", "MaximumDepth"),
+    "maximum_width": ("width_indices", "MaximumWidth"),
+    "maxdiff_widths": ("width_indices", "MaxdiffWidths"),
+    "modified_maxdiff_widths": ("width_indices", "ModifiedMaxdiffWidths"),
+    "max_width_over_max_depth": ("width_indices", "MaxWidthOverMaxDepth"),
+    "cherry_index": ("subgraph_indices", "CherryIndex"),
+    "modified_cherry_index": ("subgraph_indices", "ModifiedCherryIndex"),
+    "IL_number": ("structure_indices", "ILNumber"),
+    "pitchforks": ("subgraph_indices", "Pitchforks"),
+    "four_caterpillars": ("subgraph_indices", "FourCaterpillars"),
+    "double_cherries": ("subgraph_indices", "DoubleCherries"),
+    "ladder_length": ("structure_indices", "LadderLength"),
+    "diameter": ("distance_indices", "Diameter"),
+    "area_per_pair_index": ("distance_indices", "AreaPerPairIndex"),
+    "wiener_index": ("network_indices", "WienerIndex"),
+    "minimum_farness": ("network_indices", "MinimumFarness"),
+    "maximum_farness": ("network_indices", "MaximumFarness"),
+    "total_farness": ("network_indices", "TotalFarness"),
+    "minimum_bcent": ("network_indices", "MinimumBCent"),
+    "maximum_bcent": ("network_indices", "MaximumBCent"),
+    "mean_bcent": ("network_indices", "MeanBCent"),
+    "bcent_variance": ("network_indices", "BCentVariance"),
+    "bcent_root": ("network_indices", "BCentRoot"),
+    "root_imbalance": ("root_indices", "RootImbalance"),
+    "I_root": ("root_indices", "IRoot"),
 
-          "rogers_j_index",
-          "symmetry_nodes_index",
+    "rogers_j_index": ("node_indices", "RogersJIndex"),
+    "symmetry_nodes_index": ("node_indices", "SymmetryNodesIndex"),
 
-          "stairs1",
-          "stairs2",
-          "I_2_index",
-          "mean_I",
-          "total_I",
-          "mean_I_prime",
-          "total_I_prime",
-          "mean_I_w",
-          "total_I_w",
+    "stairs1": ("node_indices", "Stairs1"),
+    "stairs2": ("node_indices", "Stairs2"),
+    "I_2_index": ("node_indices", "I2Index"),
+    "mean_I": ("Ibased_indices", "MeanI"),
+    "total_I": ("Ibased_indices", "TotalI"),
+    "mean_I_prime": ("Ibased_indices", "MeanIPrime"),
+    "total_I_prime": ("Ibased_indices", "TotalIPrime"),
+    "mean_I_w": ("Ibased_indices", "MeanIW"),
+    "total_I_w": ("Ibased_indices", "TotalIW"),
 
-          "rooted_quartet_index",
-          "colijn_plazotta_rank",
-          "furnas_rank",
-          "treeness",
-          "stemminess"]
+    "rooted_quartet_index": ("structure_indices", "RootedQuartetIndex"),
+    "colijn_plazotta_rank": ("ranking_indices", "ColijnPlazottaRank"),
+    "colijn_plazotta_rank_log2": ("ranking_indices", "ColijnPlazottaRankLog2"),
+    "furnas_rank": ("ranking_indices", "FurnasRank"),
+    "furnas_rank_log2": ("ranking_indices", "FurnasRankLog2"),
+    "treeness": ("branchlength_indices", "Treeness"),
+    "stemminess": ("branchlength_indices", "Stemminess")
+}
+
+INDICES = list(INDEX_CLASSES)
+
+
+@lru_cache(maxsize=4096)
+def bounds(index_name, n, m, mode):
+    # bounds only depend on the index, n, m and mode and are shared by all
+    # trees of the same size
+    instance = TreeShape.index_instance(index_name)
+    if instance is None:
+        raise ValueError(f"Unknown index: {index_name}")
+    return instance.minimum(n, m, mode), instance.maximum(n, m, mode)
 
 
 class TreeShape:
-    def __init__(self, tree, mode):
+    def __init__(self, tree, mode, store=None, profile=None):
         if mode not in ["BINARY", "ARBITRARY"]:
             raise ValueError(f"Unknown mode: {mode}")
-        if mode == "BINARY" and not util.is_bifurcating(tree):
-            raise ValueError("BINARY mode only possible for strictly bifurcating trees")
         self.mode = mode
+        self.source = tree
+        self.indices = {}
+        self.store = open_store(store)
+        # see treeshapy.profiling, None records into the active profile
+        self.profile = profiling.resolve(profile)
+        with profiling.span(self.profile, "tree", "load"):
+            self.load()
+
+    def load(self):
+        # all per-node features and index values are cached on a tree owned
+        # by this object, the input tree is never modified
+        tree = as_compact_tree(self.source)
+        if tree is self.source:
+            tree = tree.copy()
+        if self.mode == "BINARY" and not util.is_bifurcating(tree):
+            raise ValueError("BINARY mode only possible for strictly bifurcating trees")
         self.tree = tree
         self.n = len(tree)
-        if mode == "BINARY":
+        if self.mode == "BINARY":
             self.m = self.n - 1
         else:
-            self.m = len([node for node in tree.traverse()]) - self.n
-        self.indices = {}
+            self.m = tree.num_nodes - self.n
+        self.values = {}
+        self.digests = {}
+        self.stored = {}
+        # indices already looked up in the store, each is counted once
+        self.looked_up = set()
+
+    def invalidate(self):
+        # drops all cached values and reads the input tree again, e.g. after
+        # it has been edited
+        self.load()
 
     def index(self, index_name):
         if index_name not in self.indices:
@@ -98,14 +133,64 @@ class TreeShape:
             self.indices[index_name] = instance
         return self.indices[index_name]
 
+    def digest(self, lengths):
+        if lengths not in self.digests:
+            self.digests[lengths] = util.canonical_digest(self.tree, lengths)
+        return self.digests[lengths]
+
+    def store_key(self, index_name):
+        # canonical digest of the shape and, for indices that depend on
+        # them, of the branch lengths
+        lengths = self.digest(True) if self.index(index_name).uses_branch_lengths else b""
+        return self.digest(False), lengths
+
+    def lookup(self, index_name):
+        # whether the value is cached, values found in the store are cached
+        if index_name in self.values:
+            return True
+        if self.store is None or index_name in self.looked_up:
+            return False
+        self.looked_up.add(index_name)
+        shape, lengths = self.store_key(index_name)
+        if lengths not in self.stored:
+            self.stored[lengths] = self.store.get(shape, lengths, self.mode)
+        found = index_name in self.stored[lengths]
+        if self.profile is not None:
+            self.profile.count("store", index_name, found)
+        if found:
+            self.values[index_name] = self.stored[lengths][index_name]
+        return found
+
+    def evaluate(self, index_name):
+        if self.profile is None:
+            return self.index(index_name).evaluate(self.tree, self.mode)
+        # features an index computes itself were not prepared
+        cached = set(self.tree.features)
+        with self.profile.span("index", index_name):
+            value = self.index(index_name).evaluate(self.tree, self.mode)
+        for feature in self.tree.features.keys() - cached:
+            self.profile.count("feature", feature, False)
+        return value
+
     def absolute(self, index_name):
-        return self.index(index_name).evaluate(self.tree, self.mode)
+        if self.lookup(index_name):
+            return self.values[index_name]
+        value = self.evaluate(index_name)
+        self.values[index_name] = value
+        if self.store is not None:
+            self.store.put(*self.store_key(index_name), self.mode, index_name, value)
+        return value
 
     def relative(self, index_name):
         v = self.absolute(index_name)
-        min_v = self.index(index_name).minimum(self.n, self.m, self.mode)
-        max_v = self.index(index_name).maximum(self.n, self.m, self.mode)
-        if math.isnan(min_v) or math.isnan(max_v):
+        if self.profile is None:
+            min_v, max_v = bounds(index_name, self.n, self.m, self.mode)
+        else:
+            misses = bounds.cache_info().misses
+            with self.profile.span("bounds", index_name):
+                min_v, max_v = bounds(index_name, self.n, self.m, self.mode)
+            self.profile.count("bounds", index_name, bounds.cache_info().misses == misses)
+        if min_v != min_v or max_v != max_v: # nan, bounds may also be ints beyond float range
             raise ValueError(index_name + " cannot be normalized for " + self.mode.lower() + " trees")
         if min_v == max_v:
             raise ValueError("Minimum equals maximum for " + index_name +  " for " + self.mode.lower() + " trees")
@@ -115,13 +200,51 @@ class TreeShape:
             raise ArithmeticError("Value below minimum for " + index_name)
         return (v - min_v) / (max_v - min_v)
 
+    def standardized(self, index_name, model="yule"):
+        # z-score of the value among random trees with the same number of
+        # leaves under the Yule or PDA model
+        from treeshapy.moments import moments
+        if self.mode != "BINARY":
+            raise ValueError("Standardized values are only available for binary trees")
+        v = self.absolute(index_name)
+        with profiling.span(self.profile, "moments", index_name):
+            mean, var = moments(index_name, self.n, model)
+        if not var > 0: # nan for undefined values
+            raise ValueError(f"{index_name} cannot be standardized for {self.n} leaves under the {model} model")
+        return (v - mean) / math.sqrt(var)
+
+    def prepare(self, index_names):
+        # computes the union of the per-node features the indices need in
+        # as few passes as possible, skipping indices whose values are cached
+        # or stored
+        missing = [index_name for index_name in index_names if not self.lookup(index_name)]
+        engine.precompute(self.tree, engine.requirements(self.index(index_name) for index_name in missing), self.profile)
+
+    def compute(self, index_names):
+        self.prepare(index_names)
+        res = {}
+        for index_name in index_names:
+            res[index_name] = self.absolute(index_name)
+        if self.store is not None:
+            self.store.flush()
+        return res
+
     def all_absolute(self):
+        # indices that are not defined for the tree are nan, as in
+        # all_relative
+        self.prepare(INDICES)
         res = {}
         for index_name in INDICES:
-            res[index_name] = self.absolute(index_name)
+            try:
+                res[index_name] = self.absolute(index_name)
+            except ValueError:
+                res[index_name] = float("nan")
+        if self.store is not None:
+            self.store.flush()
         return res
 
     def all_relative(self):
+        self.prepare(INDICES)
         res = {}
         for index_name in INDICES:
             try:
@@ -142,117 +265,12 @@ class TreeShape:
         return rel # index is an imbalance index
 
 
-    def index_instance(self, index_name):
-        match index_name:
-            case "average_leaf_depth":
-                return depth_indices.AverageLeafDepth()
-            case "variance_of_leaves_depths":
-                return depth_indices.VarianceOfLeavesDepths()
-            case "sackin_index":
-                return depth_indices.SackinIndex()
-            case "total_path_length":
-                return depth_indices.TotalPathLength()
-            case "total_internal_path_length":
-                return depth_indices.TotalInternalPathLength()
-            case "average_vertex_depth":
-                return depth_indices.AverageVertexDepth()
-            case "maximum_depth":
-                return depth_indices.MaximumDepth()
-            case "B_1_index":
-                return depth_indices.B1Index()
-            case "B_2_index":
-                return depth_indices.B2Index()
-            case "maximum_width":
-                return width_indices.MaximumWidth()
-            case "maxdiff_widths":
-                return width_indices.MaxdiffWidths()
-            case "modified_maxdiff_widths":
-                return width_indices.ModifiedMaxdiffWidths()
-            case "max_width_over_max_depth":
-                return width_indices.MaxWidthOverMaxDepth()
-            case "s_shape":
-                return structure_indices.SShape()
-            case "d_index":
-                return structure_indices.DIndex()
-            case "rooted_quartet_index":
-                return structure_indices.RootedQuartetIndex()
-            case "ladder_length":
-                return structure_indices.LadderLength()
-            case "IL_number":
-                return structure_indices.ILNumber()
-            case "cherry_index":
-                return subgraph_indices.CherryIndex()
-            case "modified_cherry_index":
-                return subgraph_indices.ModifiedCherryIndex()
-            case "pitchforks":
-                return subgraph_indices.Pitchforks()
-            case "four_caterpillars":
-                return subgraph_indices.FourCaterpillars()
-            case "double_cherries":
-                return subgraph_indices.DoubleCherries()
-            case "total_cophenetic_index":
-                return distance_indices.TotalCopheneticIndex()
-            case "diameter":
-                return distance_indices.Diameter()
-            case "area_per_pair_index":
-                return distance_indices.AreaPerPairIndex()
-            case "wiener_index":
-                return network_indices.WienerIndex()
-            case "minimum_farness":
-                return network_indices.MinimumFarness()
-            case "maximum_farness":
-                return network_indices.MaximumFarness()
-            case "total_farness":
-                return network_indices.TotalFarness()
-            case "minimum_bcent":
-                return network_indices.MinimumBCent()
-            case "maximum_bcent":
-                return network_indices.MaximumBCent()
-            case "mean_bcent":
-                return network_indices.MeanBCent()
-            case "bcent_variance":
-                return network_indices.BCentVariance()
-            case "bcent_root":
-                return network_indices.BCentRoot()
-            case "root_imbalance":
-                return root_indices.RootImbalance()
-            case "I_root":
-                return root_indices.IRoot()
-            case "colless_index":
-                return node_indices.CollessIndex()
-            case "corrected_colless_index":
-                return node_indices.CorrectedCollessIndex()
-            case "quadratic_colless_index":
-                return node_indices.QuadraticCollessIndex()
-            case "I_2_index":
-                return node_indices.I2Index()
-            case "stairs1":
-                return node_indices.Stairs1()
-            case "stairs2":
-                return node_indices.Stairs2()
-            case "rogers_j_index":
-                return node_indices.RogersJIndex()
-            case "symmetry_nodes_index":
-                return node_indices.SymmetryNodesIndex()
-            case "mean_I":
-                return Ibased_indices.MeanI()
-            case "total_I":
-                return Ibased_indices.TotalI()
-            case "mean_I_prime":
-                return Ibased_indices.MeanIPrime()
-            case "total_I_prime":
-                return Ibased_indices.TotalIPrime()
-            case "mean_I_w":
-                return Ibased_indices.MeanIW()
-            case "total_I_w":
-                return Ibased_indices.TotalIW()
-            case "colijn_plazotta_rank":
-                return ranking_indices.ColijnPlazottaRank()
-            case "furnas_rank":
-                return ranking_indices.FurnasRank()
-            case "treeness":
-                return branchlength_indices.Treeness()
-            case "stemminess":
-                return branchlength_indices.Stemminess()
-
-        return None
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def index_instance(index_name):
+        # indices are stateless, one instance per name is shared
+        if index_name not in INDEX_CLASSES:
+            return None
+        module_name, class_name = INDEX_CLASSES[index_name]
+        module = importlib.import_module("treeshapy." + module_name)
+        return getattr(module, class_name)()
@@ -1,365 +1,505 @@
+import hashlib
 import math
+from bisect import bisect_left
+from operator import mul
 import numpy as np
-import json
-import pkg_resources
-from collections import Counter
 
-we_dict = None
+import treeshapy.engine as engine
+import treeshapy.kernels as kernels
+
+# Wedderburn-Etherington numbers, extended on demand by extend_we
+we_numbers = [0, 1]
+# Furnas rank offsets per number of leaves, see furnas_prefix
+furnas_prefixes = {}
+# furnas_prefix(m, alpha) for all m <= n as int64 arrays, per n
+furnas_tables = {}
+# largest exact Colijn-Plazotta rank computed by default, in bits
+CP_MAX_BITS = 1 << 16
+# largest exact Furnas rank computed by default, in bits. W(n) has about
+# 1.31 n bits and extend_we(n) needs O(n^2) products of such numbers.
+FURNAS_MAX_BITS = 1 << 10
+# W(n) ~ WE_C WE_ALPHA^n n^(-3/2) (Otter's constants)
+WE_ALPHA = 2.4832535361726368
+WE_C = 0.31877662586408387
 
 def leaf_depths(tree):
-    return [depth(tree, leaf) for leaf in tree.iter_leaves()]
+    return depths(tree)[tree.leaves]
 
-def clade_size(tree, v):
+def feature(tree, name):
+    # per-node features are computed by the engine on first use
     try:
-        return v.clade_size
-    except AttributeError:
-        precompute_clade_sizes(tree)
-        return v.clade_size
+        return tree.features[name]
+    except KeyError:
+        engine.precompute(tree, [name])
+        return tree.features[name]
 
-def depth(tree, v):
-    try:
-        return v.depth
-    except AttributeError:
-        precompute_depths(tree)
-        return v.depth
-
-def precompute_clade_sizes(tree):
-    for node in tree.traverse("postorder"):
-        if node.is_leaf():
-            node.add_feature("clade_size", 1)
-            continue
-        c = node.children
-        node.add_feature("clade_size", sum([child.clade_size for child in c]))
+def clade_sizes(tree):
+    return feature(tree, "clade_size")
 
+def depths(tree):
+    return feature(tree, "depth")
 
-def precompute_depths(tree):
-    tree.add_feature("depth", 0)
-    depths_recursive(tree)
+def heights(tree):
+    return feature(tree, "height")
 
-def depths_recursive(tree):
-    c = tree.children
-    d = tree.depth + 1
-    for child in c:
-        child.add_feature("depth", d)
-        if not child.is_leaf():
-            depths_recursive(child)
+def second_heights(tree):
+    return feature(tree, "second_height")
 
-def widths(tree):
-    return Counter([depth(tree, v) for v in tree.traverse("postorder")])
-
-def connecting_path_length(tree, v1, v2):
-    ancestor = tree.get_common_ancestor(v1, v2)
-    return depth(tree, v1) + depth(tree, v2) - 2 * depth(tree, ancestor)
-
-def inner_nodes(tree):
-    inner_nodes = []
-    for v in tree.traverse("postorder"):
-        if not v.is_leaf():
-            inner_nodes.append(v)
-    return inner_nodes
-
-def find_distant_node(tree):
-    max_depth = 0
-    distant_node = None
-    for node in tree.iter_descendants():
-        if node.name == "dummy":
-            continue
-        if node.depth > max_depth:
-            max_depth = node.depth
-            distant_node = node.name
-    return max_depth, distant_node
+def nodes_below(tree):
+    return feature(tree, "nodes_below")
 
-def diameter(tree):
-    _, distant_node = find_distant_node(tree)
-    tree_copy = tree.copy("newick")
-    tree_copy.add_child(name="dummy") # required to keep the root node
-    tree_copy.set_outgroup(tree_copy&distant_node)
-    precompute_depths(tree_copy)
-    dist, distant_node2 = find_distant_node(tree_copy)
-    return dist
-
-def precompute_nodes_below(tree):
-    for node in tree.traverse("postorder"):
-        node.add_feature("nodes_below", 1)
-        if node.is_leaf():
-            continue
-        for c in node.children:
-            node.nodes_below += c.nodes_below
+def probs(tree):
+    return feature(tree, "prob")
 
-def precompute_farness(tree):
-    try:
-        tree.nodes_below
-    except AttributeError:
-        precompute_nodes_below(tree)
-    num_nodes = tree.nodes_below
-    tree.add_feature("farness", sum([depth(tree, node) for node in tree.traverse()]))
-    for node in tree.traverse("preorder"):
-        if node.is_leaf():
-            continue
-        for c in node.children:
-            c.add_feature("farness", node.farness - c.nodes_below + (num_nodes - c.nodes_below))
+def farness(tree):
+    return feature(tree, "farness")
 
-def precompute_bcent(tree):
-    try:
-        tree.nodes_below
-    except AttributeError:
-        precompute_nodes_below(tree)
-    num_nodes = tree.nodes_below
-    for node in tree.traverse():
-        if node.is_leaf():
-            continue
-        node.add_feature("bcent", (node.nodes_below - 1) * (num_nodes - node.nodes_below))
-        cs = node.children
-        for i, c1 in enumerate(cs):
-            for j in range(i + 1, len(cs)):
-                c2 = cs[j]
-                node.bcent += c1.nodes_below * c2.nodes_below
-
-
-def precompute_ladder_lengths(tree):
-    for node in tree.traverse("postorder"):
-        if node.is_leaf():
-            node.add_feature("ladder_length", -1)
-            continue
-        c = node.children
-        assert len(c)==2 #only defined for bifurcating trees
-        if c[0].is_leaf():
-            node.add_feature("ladder_length", c[1].ladder_length + 1)
-        elif c[1].is_leaf():
-            node.add_feature("ladder_length", c[0].ladder_length + 1)
-        else: #not part of a ladder
-            node.add_feature("ladder_length", 0)
-
-def is_pitchfork(tree, node):
-    return clade_size(tree, node) == 3 and len(node.children) == 2
-
-def is_4caterpillar(tree, node):
-    if clade_size(tree, node) != 4:
-        return False
-    c = node.children
-    if len(c) != 2:
-        return False
-    return (c[0].is_leaf() and is_pitchfork(tree, c[1])) or (c[1].is_leaf() and is_pitchfork(tree, c[0]))
-
-def is_double_cherry(tree, node):
-    if clade_size(tree, node) != 4:
-        return False
-    c = node.children
-    if len(c) != 2:
-        return False
-    return (not c[0].is_leaf()) and (not c[1].is_leaf())
-
-
-def balance_index(tree, v):
-    if v.is_leaf():
-        return 0
-    c = v.children
-    assert (len(c) == 2)
-    return abs(clade_size(tree, c[0]) - clade_size(tree, c[1]))
+def bcent(tree):
+    return feature(tree, "bcent")
 
-def precompute_probs(tree):
-    tree.add_feature("prob", 1)
-    probs_recursive(tree)
+def sum_below(tree):
+    return feature(tree, "sum_below")
 
-def probs_recursive(tree):
-    if tree.is_leaf():
-        return
-    c = tree.children
-    p = tree.prob / len(c)
-    for child in c:
-        child.add_feature("prob", p)
-        if not child.is_leaf():
-            probs_recursive(child)
-
-def precompute_heights(tree):
-    for node in tree.iter_descendants("postorder"):
-        if node.is_leaf():
-            node.add_feature("height", 0)
-            continue
-        c = node.children
-        h = 1 + max([child.height for child in c])
-        node.add_feature("height", h)
-
-def read_we():
-    global we_dict
-    if we_dict is not None:
-        return
-    stream = pkg_resources.resource_stream(__name__, 'resources/we.json')
-    we_dict = json.loads(stream.read())
-    we_dict = {int(k): int(v) for k, v in we_dict.items()}
+def ladder_lengths(tree):
+    assert is_bifurcating(tree) #only defined for bifurcating trees
+    return feature(tree, "ladder_length")
+
+def widths(tree):
+    return np.bincount(depths(tree))
+
+def child_pairs(tree):
+    # first and second child of every inner node of a bifurcating tree
+    assert np.all(tree.outdegree[tree.inner_nodes] == 2)
+    first = tree.child_ptr[tree.inner_nodes]
+    return tree.children[first], tree.children[first + 1]
+
+def leaf_children(tree):
+    return np.bincount(tree.parent[tree.leaves[tree.leaves > 0]], minlength=tree.num_nodes)
+
+def diameter(tree):
+    # the longest path turns at some node v and descends into its two deepest subtrees
+    return int((heights(tree) + second_heights(tree)).max())
+
+def pitchfork_mask(tree):
+    return (clade_sizes(tree) == 3) & (tree.outdegree == 2)
+
+def fourcaterpillar_mask(tree):
+    cs = clade_sizes(tree)
+    mask = (cs == 4) & (tree.outdegree == 2)
+    candidates = np.flatnonzero(mask)
+    c0 = tree.children[tree.child_ptr[candidates]]
+    c1 = tree.children[tree.child_ptr[candidates] + 1]
+    pitchfork = pitchfork_mask(tree)
+    mask[candidates] = (tree.is_leaf[c0] & pitchfork[c1]) | (tree.is_leaf[c1] & pitchfork[c0])
+    return mask
+
+def double_cherry_mask(tree):
+    cs = clade_sizes(tree)
+    mask = (cs == 4) & (tree.outdegree == 2)
+    candidates = np.flatnonzero(mask)
+    c0 = tree.children[tree.child_ptr[candidates]]
+    c1 = tree.children[tree.child_ptr[candidates] + 1]
+    mask[candidates] = ~tree.is_leaf[c0] & ~tree.is_leaf[c1]
+    return mask
+
+def balance_values(tree):
+    # balance value of every inner node of a bifurcating tree
+    cs = clade_sizes(tree)
+    c0, c1 = child_pairs(tree)
+    return np.abs(cs[c0] - cs[c1])
+
+def extend_we(n):
+    # W(k) = sum_{i < k / 2} W(i) W(k - i), plus W(k / 2) (W(k / 2) + 1) / 2
+    # for even k, in exact integers
+    a = we_numbers
+    for k in range(len(a), n + 1):
+        m = (k + 1) // 2
+        s = sum(map(mul, a[1:m], a[k - 1:k - m:-1]))
+        if k % 2 == 0:
+            h = a[k // 2]
+            s += h * (h + 1) // 2
+        a.append(s)
+    return a
 
 def we(n):
-    read_we()
-    if not n in we_dict:
-        return float("nan")
-    return we_dict[n]
-
-def furnas_ranks(tree):
-    read_we()
-    for node in tree.traverse("postorder"):
-        if node.is_leaf():
-            node.add_feature("furnas_rank", 1)
+    return extend_we(n)[n]
+
+def log2_we(n):
+    # log2 W(n) without computing W(n) for large n; the 1/n terms are fitted
+    # to the exact values, the error is below 1e-6 from n = 200 on
+    if n < 200:
+        return math.log2(we(n))
+    return n * math.log2(WE_ALPHA) - 1.5 * math.log2(n) + math.log2(WE_C) + 0.92247 / n + 1.38664 / (n * n)
+
+def furnas_prefix(n, alpha):
+    # number of shapes with n leaves whose lighter root subtree has less than
+    # alpha leaves. The prefix sums of W(i) W(n - i) are kept per n and
+    # shared by all nodes (and trees) with n leaves below.
+    p = furnas_prefixes.setdefault(n, [0, 0])
+    if len(p) <= alpha:
+        w = extend_we(n)
+        for i in range(len(p) - 1, alpha):
+            p.append(p[-1] + w[i] * w[n - i])
+    return p[alpha]
+
+def furnas_table(n):
+    if n not in furnas_tables:
+        table = np.zeros((n + 1, n // 2 + 1), dtype=np.int64)
+        for m in range(2, n + 1):
+            table[m, :m // 2 + 1] = [furnas_prefix(m, alpha) for alpha in range(m // 2 + 1)]
+        furnas_tables[n] = table
+    return furnas_tables[n]
+
+def furnas_ranks(tree, max_bits=FURNAS_MAX_BITS):
+    # left-light rank of every subtree, with subtrees of equal size ordered by
+    # rank so that each shape has exactly one rank. OverflowError is raised
+    # for trees whose ranks may exceed max_bits.
+    n = len(tree)
+    if log2_we(n) > max_bits:
+        raise OverflowError(f"Furnas rank exceeds {max_bits} bits")
+    w = extend_we(n)
+    if kernels.enabled(tree) and w[n] < 1 << 61: # the products stay below 2^63
+        return kernels.furnas_ranks(clade_sizes(tree), tree.child_ptr, tree.children, furnas_table(n), np.array(w[:n + 1], dtype=np.int64)).tolist()
+    cs = clade_sizes(tree).tolist()
+    child_ptr = tree.child_ptr.tolist()
+    children = tree.children.tolist()
+    ranks = [1] * tree.num_nodes
+    for node in tree.postorder.tolist():
+        if child_ptr[node] == child_ptr[node + 1]:
             continue
-        c = node.children
+        c = children[child_ptr[node]:child_ptr[node + 1]]
         assert (len(c) == 2)
-        if clade_size(tree, c[0]) <= clade_size(tree, c[1]):
-            f_l = c[0].furnas_rank
-            alpha = clade_size(tree, c[0])
-            f_r = c[1].furnas_rank
-            beta = clade_size(tree, c[1])
-        else:
-            f_l = c[1].furnas_rank
-            alpha = clade_size(tree, c[1])
-            f_r = c[0].furnas_rank
-            beta = clade_size(tree, c[0])
-        s = 0
-        for i in range(1, alpha):
-            j = clade_size(tree, node) - i
-            if i in we_dict and j in we_dict:
-                s += we_dict[i] * we_dict[j]
+        l, r = c
+        if cs[l] > cs[r] or (cs[l] == cs[r] and ranks[l] > ranks[r]):
+            l, r = r, l
+        f_l = ranks[l]
+        f_r = ranks[r]
+        alpha = cs[l]
+        beta = cs[r]
+        s = furnas_prefix(cs[node], alpha) + (f_l - 1) * w[beta] + f_r
+        if alpha == beta:
+            s -= (f_l * f_l - f_l) // 2
+        ranks[node] = s
+    return ranks
+
+def log2_add(a, b):
+    # log2(2^a + 2^b)
+    if a < b:
+        a, b = b, a
+    if b == -math.inf:
+        return a
+    return a + math.log1p(2.0 ** (b - a)) / math.log(2)
+
+def log2_we_array(n):
+    # log2_we(k) for k = 0, ..., n, -inf for k = 0
+    lw = np.empty(n + 1)
+    lw[0] = -np.inf
+    k = min(n + 1, 200)
+    lw[1:k] = [math.log2(we(i)) for i in range(1, k)]
+    i = np.arange(k, n + 1, dtype=np.float64)
+    lw[k:] = i * math.log2(WE_ALPHA) - 1.5 * np.log2(i) + math.log2(WE_C) + 0.92247 / i + 1.38664 / (i * i)
+    return lw
+
+def furnas_log2_ranks(tree):
+    # log2 of the Furnas rank of every subtree, for trees whose exact ranks
+    # are too large to compute. The offset of a node is a log-sum over the
+    # sizes of its lighter subtree, so all offsets together take O(n log n)
+    # terms.
+    lw = log2_we_array(len(tree))
+    cs = clade_sizes(tree).tolist()
+    child_ptr = tree.child_ptr.tolist()
+    children = tree.children.tolist()
+    l = [0.0] * tree.num_nodes
+    for node in range(tree.num_nodes - 1, -1, -1):
+        if child_ptr[node] == child_ptr[node + 1]:
+            continue
+        assert child_ptr[node + 1] - child_ptr[node] == 2
+        a = node + 1
+        b = children[child_ptr[node] + 1]
+        if cs[a] > cs[b] or (cs[a] == cs[b] and l[a] > l[b]):
+            a, b = b, a
+        alpha = cs[a]
+        beta = cs[b]
+        m = cs[node]
+        offset = -math.inf
+        if alpha > 1:
+            offset = float(np.logaddexp2.reduce(lw[1:alpha] + lw[m - 1:m - alpha:-1]))
+        # (f_l - 1) W(beta), or (f_l - 1) (W(beta) - f_l / 2) for equal sizes
+        s = -math.inf
+        if l[a] > 0:
+            s = l[a] + math.log2(-math.expm1(-l[a] * math.log(2)))
+            if alpha == beta:
+                s += lw[beta] + math.log2(-math.expm1((l[a] - 1 - lw[beta]) * math.log(2)))
             else:
-                node.add_feature("furnas_rank", float("nan"))
-                continue
-        if beta in we_dict:
-            s += (f_l - 1) * we_dict[beta] + f_r
+                s += lw[beta]
+        l[node] = log2_add(offset, log2_add(s, l[b]))
+    return np.array(l)
+
+def furnas_unrank(n, rank):
+    # parent vector of the shape with n leaves and the given Furnas rank, the
+    # inverse of furnas_ranks; uniform random ranks give uniform shapes
+    w = extend_we(n)
+    if not 1 <= rank <= w[n]:
+        raise ValueError(f"Furnas rank must be between 1 and {w[n]} for {n} leaves")
+    parent = [-1]
+    stack = [(0, n, rank)]
+    while stack:
+        v, m, r = stack.pop()
+        if m == 1:
+            continue
+        h = m // 2
+        furnas_prefix(m, h)
+        p = furnas_prefixes[m]
+        alpha = bisect_left(p, r, 1, h + 1) - 1
+        beta = m - alpha
+        r -= p[alpha]
+        if alpha < beta:
+            f_l = (r - 1) // w[beta] + 1
+            f_r = (r - 1) % w[beta] + 1
         else:
-            node.add_feature("furnas_rank", float("nan"))
+            # the pairs f_l <= f_r are ordered by f_l first
+            x = w[alpha] + 1
+            lo, hi = 1, w[alpha]
+            while lo < hi:
+                mid = (lo + hi + 1) // 2
+                if (mid - 1) * x - (mid - 1) * mid // 2 < r:
+                    lo = mid
+                else:
+                    hi = mid - 1
+            f_l = lo
+            f_r = r - ((f_l - 1) * x - (f_l - 1) * f_l // 2) + f_l - 1
+        parent += [v, v]
+        stack.append((len(parent) - 1, beta, f_r))
+        stack.append((len(parent) - 2, alpha, f_l))
+    return parent
+
+
+def shape_ids(tree):
+    return feature(tree, "shape_id")
+
+def compute_shape_ids(tree, classes):
+    # AHU-style hash-consing: two subtrees get the same id iff they are
+    # isomorphic. Ids are assigned by classes, so ids of trees labelled with a
+    # shared dict are comparable across trees.
+    child_ptr = tree.child_ptr.tolist()
+    children = tree.children.tolist()
+    ids = [0] * tree.num_nodes # leaves have id 0
+    for v in range(tree.num_nodes - 1, -1, -1):
+        lo = child_ptr[v]
+        hi = child_ptr[v + 1]
+        if lo == hi:
             continue
-        if alpha == beta:
-            s -= (f_l * f_l - f_l) / 2
-        node.add_feature("furnas_rank", s)
-
-
-def isomorphic(v1, v2):
-    if v1.is_leaf():
-        return v2.is_leaf()
-    if v2.is_leaf():
-        return False
-    c1 = v1.children
-    assert (len(c1) == 2)
-    c2 = v2.children
-    assert (len(c2) == 2)
-    return (isomorphic(c1[0], c2[0]) and isomorphic(c1[1], c2[1])) or (isomorphic(c1[0], c2[1]) and isomorphic(c1[1], c2[0]))
+        if hi - lo == 2:
+            a = ids[children[lo]]
+            b = ids[children[lo + 1]]
+            key = (a, b) if a <= b else (b, a)
+        else:
+            key = tuple(sorted([ids[c] for c in children[lo:hi]]))
+        ids[v] = classes.setdefault(key, len(classes) + 1)
+    return np.array(ids, dtype=np.int64)
+
+def isomorphic(tree, v1, v2):
+    ids = shape_ids(tree)
+    return ids[v1] == ids[v2]
+
+def canonical_digest(tree, lengths=False):
+    # digest of the tree shape that does not depend on the order of the
+    # children (and, unlike shape ids, not on the process either): every
+    # node hashes the sorted digests of its children. With lengths, the
+    # branch length of every node is hashed as well.
+    child_ptr = tree.child_ptr.tolist()
+    children = tree.children.tolist()
+    dist = tree.dist.tolist()
+    digests = [None] * tree.num_nodes
+    for v in range(tree.num_nodes - 1, -1, -1):
+        h = hashlib.blake2b(digest_size=16)
+        if lengths:
+            h.update(float(dist[v]).hex().encode() + b";")
+        for d in sorted(digests[c] for c in children[child_ptr[v]:child_ptr[v + 1]]):
+            h.update(d)
+        digests[v] = h.digest()
+    return digests[0]
 
 
 
 def I_value(tree, v):
-    c = v.children
+    cs = clade_sizes(tree)
+    c = tree.child_list(v)
     assert (len(c) == 2)
-    n_v1 = max(clade_size(tree, c[0]), clade_size(tree, c[1]))
-    n_v = clade_size(tree, v)
+    n_v1 = max(cs[c[0]], cs[c[1]])
+    n_v = cs[v]
     half = math.ceil(n_v / 2.0)
     if (n_v - 1 - half) == 0:
         return 0
     return (n_v1 - half) / (n_v - 1 - half)
 
-def I_prime(tree, v):
-    I_v = I_value(tree, v)
-    n_v = clade_size(tree, v)
-    if n_v > 0 and n_v % 2 == 0:
-        I_v *= (n_v - 1) / n_v
-    return I_v
-
+def I_nodes(tree):
+    # nodes with at least four leaves below, the I-based indices are defined on those
+    cs = clade_sizes(tree)
+    c0, c1 = child_pairs(tree)
+    mask = cs[tree.inner_nodes] >= 4
+    n_v = cs[tree.inner_nodes][mask]
+    n_v1 = np.maximum(cs[c0], cs[c1])[mask]
+    return n_v, n_v1
+
+def I_raw(n_v, n_v1):
+    half = (n_v + 1) // 2
+    return (n_v1 - half) / (n_v - 1 - half)
 
-def I_weight(tree, v):
-    n_v = clade_size(tree, v)
-    if n_v % 2 == 1:
-        return 1
-    if n_v == 0:
-        return 0
-    I_v = I_value(tree, v)
-    if I_v == 0:
-        return (2 * (n_v - 1)) / n_v
-    return (n_v - 1) / n_v
+def I_split_term(n_l, n_r, prime=False):
+    # I value (or I' value) of a node whose children have n_l and n_r leaves,
+    # 0 for nodes with less than four leaves where it is not defined
+    n_v = n_l + n_r
+    half = (n_v + 1) // 2
+    I_v = (np.maximum(n_l, n_r) - half) / np.maximum(n_v - 1 - half, 1)
+    if prime:
+        I_v = np.where(n_v % 2 == 0, I_v * (n_v - 1) / n_v, I_v)
+    return np.where(n_v >= 4, I_v, 0.0)
 
-def I_weight_sum(tree):
-    weights = []
-    for node in tree.traverse("postorder"):
-        if clade_size(tree, node) >= 4:
-            weights.append(I_weight(tree, node))
-    return sum(weights) / len(weights)
+def stairs_scale(n):
+    # 1 / (n - 1), 1 for a single leaf
+    return 1 / np.maximum(n - 1, 1)
 
-def I_w(tree, v, sw):
-    return (I_weight(tree, v) * I_value(tree, v)) / sw
+def I_weights(n_v, I_v):
+    w = np.where(I_v == 0, (2 * (n_v - 1)) / n_v, (n_v - 1) / n_v)
+    return np.where(n_v % 2 == 1, 1.0, w)
 
+def I_weight_sum(tree):
+    n_v, n_v1 = I_nodes(tree)
+    weights = I_weights(n_v, I_raw(n_v, n_v1))
+    return float(weights.sum()) / len(weights)
 
 def I_values(tree, mode, sw = 0):
     assert(mode in ["I", "I_prime", "I_w"])
-    values = []
-    for node in tree.traverse("postorder"):
-        if clade_size(tree, node) >= 4:
-            if mode == "I":
-                values.append(I_value(tree, node))
-            elif mode == "I_prime":
-                values.append(I_prime(tree, node))
-            elif mode == "I_w":
-                values.append(I_w(tree, node, sw))
-    return values
-
-def E_l(n, Xset):
-    if n > len(Xset):
-        return 0
-    if n == len(Xset):
-        return math.prod(Xset)
-    if n == 1:
-        return sum(Xset)
-    P = [sum([math.pow(val, x) for val in Xset]) for x in range(1, n+1)]
-    mat = [[0 for _ in range(n)] for __ in range(n)]
-    for x in range(n):
-        mat[x][:x + 1] = P[:x+1][::-1]
-    for x in range(n - 1):
-        mat[x][x+1] = x + 1
-    return np.linalg.det(mat) / math.factorial(n)
+    n_v, n_v1 = I_nodes(tree)
+    I_v = I_raw(n_v, n_v1)
+    if mode == "I":
+        return I_v
+    if mode == "I_prime":
+        return np.where(n_v % 2 == 0, I_v * (n_v - 1) / n_v, I_v)
+    return (I_weights(n_v, I_v) * I_v) / sw
+
+def elementary_symmetric(tree, values, k, dtype):
+    # E_0, ..., E_k of the values at the children of every inner node, from
+    # the power sums of each child segment by Newton's identities (the
+    # divisions are exact)
+    starts = tree.child_ptr[tree.inner_nodes]
+    x = values[tree.children].astype(dtype)
+    p = [None] + [np.add.reduceat(x ** j, starts) for j in range(1, k + 1)]
+    e = [np.ones(len(starts), dtype=dtype)]
+    for m in range(1, k + 1):
+        s = e[m - 1] * p[1]
+        for i in range(2, m + 1):
+            s = s + (-1) ** (i - 1) * e[m - i] * p[i]
+        e.append(s // m)
+    return e
 
 def precompute_rqi(tree):
-    q = range(5)
-    q = [q[0]] + [q[i] - q[0] for i in range(1, 5)]
-    for node in tree.traverse("postorder"):
-        if node.is_leaf():
-            node.add_feature("ypsilon", 0)
-            node.add_feature("rooted_quartet_index", 0)
+    # sum over the inner nodes of the quartets whose shape is determined
+    # there, weighted by q = 0 (caterpillar), ..., 4 (star)
+    n = len(tree)
+    if n < 4:
+        return 0
+    dtype = np.int64 if n ** 4 < 2 ** 62 else object # exact in both cases
+    cs = clade_sizes(tree)
+    nb = nodes_below(tree)
+    inner = tree.inner_nodes
+    _, E1, _, E3, E4 = elementary_symmetric(tree, cs, 4, dtype)
+    pairs = elementary_symmetric(tree, cs * (cs - 1) // 2, 2, dtype)[2]
+    # ypsilon: number of leaf triples resolved as a star at or below a node
+    triples = np.zeros(tree.num_nodes, dtype=dtype)
+    triples[inner] = E3
+    below = np.concatenate([np.zeros(1, dtype=dtype), np.cumsum(triples)])
+    ypsilon = below[tree.preorder + nb] - below[tree.preorder]
+    c = tree.children
+    w = (cs[tree.parent[c]] - cs[c]).astype(dtype) * ypsilon[c]
+    pitchforks = np.add.reduceat(w, tree.child_ptr[inner])
+    rqi = 4 * E4 #star
+    rqi = rqi + 3 * pairs #fully balanced
+    rqi = rqi + 2 * pitchforks #3-pitchfork + 1
+    rqi = rqi + (E3 * (E1 - 3)) // 2 - 2 * E4 # cherry + 2
+    return int(rqi.sum())
+
+
+def cp_child_pairs(tree):
+    # (node, first child, second child) for all inner nodes in postorder
+    child_ptr = tree.child_ptr.tolist()
+    children = tree.children.tolist()
+    for node in range(tree.num_nodes - 1, -1, -1):
+        if child_ptr[node] == child_ptr[node + 1]:
             continue
-        n_v = clade_size(tree, node)
-        c = node.children
-        ccs = [clade_size(tree, child) for child in c]
-        E3 = E_l(3, ccs)
-        E4 = E_l(4, ccs)
-        node.add_feature("ypsilon", sum([child.ypsilon for child in c]) + E3)
-        rqi = sum([child.rooted_quartet_index for child in c])
-        rqi += q[4] * E4 #star
-        rqi += q[3] * E_l(2, [math.comb(cs, 2) for cs in ccs]) #fully balanced
-        rqi += q[2] * (clade_size(tree, node) * (node.ypsilon - E3) - \
-                sum([clade_size(tree, child) * child.ypsilon for child in c])) #3-pitchfork  + 1
-        rqi += q[1] * (0.5 * E3 * E_l(1, ccs) - 2 * E4 - 1.5 * E3) # cherry + 2
-        node.add_feature("rooted_quartet_index", rqi)
-    tree.rooted_quartet_index = tree.rooted_quartet_index + q[0] * math.comb(clade_size(tree, tree), 4)
-
-
-def colijn_plazotta_recursive(node):
-    if node.is_leaf():
-        node.add_feature("colijn_plazotta_rank", 1)
-        return
-    c = node.children
-    assert len(c) == 2
-    colijn_plazotta_recursive(c[0])
-    colijn_plazotta_recursive(c[1])
-    if c[0].colijn_plazotta_rank >= c[1].colijn_plazotta_rank:
-        node.add_feature("colijn_plazotta_rank", 0.5 * c[0].colijn_plazotta_rank * (c[0].colijn_plazotta_rank - 1) + c[1].colijn_plazotta_rank + 1)
-    else:
-        node.add_feature("colijn_plazotta_rank", 0.5 * c[1].colijn_plazotta_rank * (c[1].colijn_plazotta_rank - 1) + c[0].colijn_plazotta_rank + 1)
+        assert child_ptr[node + 1] - child_ptr[node] == 2
+        yield node, node + 1, children[child_ptr[node] + 1]
+
+def colijn_plazotta_ranks(tree, max_bits=CP_MAX_BITS):
+    # exact rank of every subtree as a Python int, ranks of isomorphic
+    # subtrees are equal, also across trees. The number of bits roughly
+    # doubles with every level, OverflowError is raised once a rank would
+    # exceed max_bits.
+    if kernels.enabled(tree) and max_bits >= 62:
+        ranks, exact = kernels.colijn_plazotta_ranks(tree.child_ptr, tree.children)
+        if exact:
+            return ranks.tolist()
+    ranks = [1] * tree.num_nodes
+    for node, c0, c1 in cp_child_pairs(tree):
+        r0 = ranks[c0]
+        r1 = ranks[c1]
+        if r0 < r1:
+            r0, r1 = r1, r0
+        if 2 * r0.bit_length() > max_bits:
+            raise OverflowError(f"Colijn-Plazotta rank exceeds {max_bits} bits")
+        ranks[node] = r0 * (r0 - 1) // 2 + r1 + 1
+    return ranks
+
+def colijn_plazotta_log2_ranks(tree):
+    # log2 of the rank of every subtree, for trees whose exact ranks are too
+    # large to compute
+    if kernels.enabled(tree):
+        return kernels.colijn_plazotta_log2_ranks(tree.child_ptr, tree.children)
+    l = [0.0] * tree.num_nodes
+    for node, c0, c1 in cp_child_pairs(tree):
+        l0 = l[c0]
+        l1 = l[c1]
+        if l0 < l1:
+            l0, l1 = l1, l0
+        if l0 < 64:
+            r0 = 2.0 ** l0
+            l[node] = math.log2(0.5 * r0 * (r0 - 1) + 2.0 ** l1 + 1)
+        else:
+            # the terms besides r0^2 / 2 are below double precision
+            l[node] = 2 * l0 - 1
+    return np.array(l)
 
 
 def is_bifurcating(tree):
-    try: #check if heights already precomputed
-        return tree.bifurcating
-    except AttributeError:
-        tree.add_feature("bifurcating", bifurcating_recursive(tree))
-        return tree.bifurcating
+    return bool(np.all((tree.outdegree == 0) | (tree.outdegree == 2)))
 
-def bifurcating_recursive(tree):
-    c = tree.children
-    if len(c) == 2:
-        return bifurcating_recursive(c[0]) and bifurcating_recursive(c[1])
-    if len(c) == 0:
-        return True
-    return False
+
+def floor_log2(x):
+    # exact for positive integers of any size
+    return x.bit_length() - 1
+
+
+def ceil_log2(x):
+    return (x - 1).bit_length()
+
+
+def popcount_sum(n):
+    # number of set bits over all of 0, ..., n - 1, bit by bit
+    s = 0
+    b = 0
+    while (1 << b) < n:
+        period = 1 << (b + 1)
+        s += (n // period) * (1 << b) + max(0, n % period - (1 << b))
+        b += 1
+    return s
+
+
+def balanced_colless(n):
+    # Colless index of the maximally balanced tree: sum over j of
+    # 2^j * triangle_wave(n / 2^j), with r = n mod 2^j in integers
+    s = 0
+    for j in range(1, ceil_log2(n)):
+        r = n % (1 << j)
+        s += min(r, (1 << j) - r)
+    return s
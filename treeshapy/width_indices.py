@@ -1,17 +1,14 @@
+import numpy as np
+
 import treeshapy.util as util
 from treeshapy.tree_index import TreeIndex
 from treeshapy.depth_indices import MaximumDepth
 
 class MaximumWidth(TreeIndex):
-    def evaluate_only(self, tree, mode):
-        return max(util.widths(tree).values())
+    requires = ("depth",)
 
     def evaluate(self, tree, mode):
-        try:
-            return tree.maximum_width
-        except AttributeError:
-            tree.add_feature("maximum_width", max(util.widths(tree).values()))
-            return tree.maximum_width
+        return int(util.widths(tree).max())
 
     def maximum(self, n, m, mode):
         if mode == "BINARY":
@@ -30,17 +27,11 @@ class MaximumWidth(TreeIndex):
 
 
 class MaxdiffWidths(TreeIndex):
+    requires = ("depth",)
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.maxdiff_widths
-        except AttributeError:
-            w = util.widths(tree)
-            res = 0
-            for i in range(len(w) - 1):
-                diff = abs(w[i + 1] - w[i])
-                res = max(res, diff)
-            tree.add_feature("maxdiff_widths", res)
-            return tree.maxdiff_widths
+        diffs = np.abs(np.diff(util.widths(tree)))
+        return int(diffs.max(initial=0))
 
     def maximum(self, n, m, mode):
         if mode == "BINARY":
@@ -59,17 +50,11 @@ class MaxdiffWidths(TreeIndex):
 
 
 class ModifiedMaxdiffWidths(TreeIndex):
+    requires = ("depth",)
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.modified_maxdiff_widths
-        except AttributeError:
-            w = util.widths(tree)
-            res = 0
-            for i in range(len(w) - 1):
-                diff = w[i + 1] - w[i]
-                res = max(res, diff)
-            tree.add_feature("modified_maxdiff_widths", res)
-            return tree.modified_maxdiff_widths
+        diffs = np.diff(util.widths(tree))
+        return int(diffs.max(initial=0))
 
     def maximum(self, n, m, mode):
         if mode == "BINARY":
@@ -88,16 +73,13 @@ class ModifiedMaxdiffWidths(TreeIndex):
 
 
 class MaxWidthOverMaxDepth(TreeIndex):
+    requires = ("depth",)
+
     def evaluate(self, tree, mode):
-        try:
-            return tree.max_width_over_max_depth
-        except AttributeError:
-            h = MaximumDepth().evaluate_only(tree, mode)
-            if h == 0:
-                tree.add_feature("max_width_over_max_depth", 0)
-            else:
-                tree.add_feature("max_width_over_max_depth", MaximumWidth().evaluate_only(tree, mode) / h)
-            return tree.max_width_over_max_depth
+        h = MaximumDepth().evaluate(tree, mode)
+        if h == 0:
+            return 0
+        return MaximumWidth().evaluate(tree, mode) / h
 
     def maximum(self, n, m, mode):
         return float('nan')